@@ -3,10 +3,13 @@ import numpy as np
 import os
 from pathlib import Path
 
-def analyze_excel_files():
+from excel_readers import read_excel
+from paths import RAW_DIR
+
+def analyze_excel_files(base_path: Path = RAW_DIR):
     """Analyze the structure and content of the Excel files"""
     
-    base_path = Path("/home/sky/Projects/Moli-PWA/backend/data/raw")
+    base_path = Path(base_path)
     
     # File paths (handling exact names with spaces)
     billing_file = base_path / "Listado_de_Facturación_de_Molinos.xlsx"
@@ -35,7 +38,7 @@ def analyze_excel_files():
     
     try:
         # Read billing data
-        billing_df = pd.read_excel(billing_file)
+        billing_df = read_excel(billing_file)
         
         print(f"📈 Shape: {billing_df.shape[0]:,} rows × {billing_df.shape[1]} columns")
         print(f"📅 Date Range: {billing_df.columns}")
@@ -66,7 +69,7 @@ def analyze_excel_files():
     
     try:
         # Read sales data
-        sales_df = pd.read_excel(sales_file)
+        sales_df = read_excel(sales_file)
         
         print(f"📈 Shape: {sales_df.shape[0]:,} rows × {sales_df.shape[1]} columns")
         print(f"🏗️  Columns: {list(sales_df.columns)}")
@@ -0,0 +1,126 @@
+"""
+Basket Analysis for Moli PWA
+Builds a sparse invoice × product incidence matrix and derives product
+co-occurrence, support, confidence and lift from a single sparse product
+"""
+
+import time
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Lines sharing these values belong to one invoice (numbers restart per mill)
+INVOICE_COLUMNS = ['codigo_molino', 'comprobante']
+
+TOP_ASSOCIATIONS = 10
+MIN_CO_OCCURRENCES = 3
+
+
+def incidence_matrix(df: pd.DataFrame) -> tuple[sparse.csr_matrix, np.ndarray]:
+    """Binary invoice × product matrix and the product labels of its columns"""
+    invoice_codes = df.groupby(INVOICE_COLUMNS, sort=False, dropna=False).ngroup().to_numpy()
+    product_codes, products = pd.factorize(df['producto_limpio'], sort=True)
+    present = product_codes >= 0
+
+    incidence = sparse.csr_matrix(
+        (np.ones(int(present.sum()), dtype='float32'), (invoice_codes[present], product_codes[present])),
+        shape=(int(invoice_codes.max()) + 1 if len(invoice_codes) else 0, len(products)),
+    )
+    # Duplicate lines of a product on one invoice are summed on construction; clip to presence
+    incidence.data[:] = 1.0
+    return incidence, np.asarray(products, dtype=object)
+
+
+def co_occurrence(incidence: sparse.csr_matrix) -> sparse.csr_matrix:
+    """Invoices containing both products, for every product pair"""
+    return (incidence.T @ incidence).tocsr()
+
+
+def association_rules(co: sparse.csr_matrix, n_invoices: int, products: np.ndarray,
+                      top_n: int = TOP_ASSOCIATIONS, min_count: int = MIN_CO_OCCURRENCES) -> pd.DataFrame:
+    """Top associated products per product, ranked by lift"""
+    counts = co.diagonal()
+    pairs = co.tocoo()
+    keep = (pairs.row != pairs.col) & (pairs.data >= min_count)
+    rows, cols, both = pairs.row[keep], pairs.col[keep], pairs.data[keep].astype('float64')
+
+    rules = pd.DataFrame({
+        'product_code': rows,
+        'producto_limpio': products[rows],
+        'associated_product': products[cols],
+        'co_occurrences': both.astype('int64'),
+        'support': both / n_invoices,
+        'confidence': both / counts[rows],
+        'lift': both * n_invoices / (counts[rows] * counts[cols]),
+    })
+
+    # Rank within each product by lift, ties broken by co-occurrence count
+    rules = rules.sort_values(['product_code', 'lift', 'co_occurrences'],
+                              ascending=[True, False, False], kind='stable')
+    rules['rank'] = rules.groupby('product_code').cumcount() + 1
+    rules = rules[rules['rank'] <= top_n].drop(columns='product_code').reset_index(drop=True)
+    return rules.round({'support': 6, 'confidence': 4, 'lift': 4})
+
+
+def generate_basket_analysis(df: pd.DataFrame, top_n: int = TOP_ASSOCIATIONS,
+                             min_count: int = MIN_CO_OCCURRENCES) -> Dict[str, pd.DataFrame]:
+    """Basket stage: co-occurrence matrix and top associations per product"""
+    print("\n🧺 Analyzing invoice baskets...")
+
+    incidence, products = incidence_matrix(df)
+    co = co_occurrence(incidence)
+    n_invoices = incidence.shape[0]
+    rules = association_rules(co, n_invoices, products, top_n=top_n, min_count=min_count)
+
+    dense = co.toarray().astype('int64')
+    matrix = pd.DataFrame(dense, index=pd.Index(products, name='producto_limpio'), columns=[str(p) for p in products])
+
+    multi = int((np.diff(incidence.indptr) > 1).sum())
+    print(f"✅ {n_invoices:,} invoices × {len(products):,} products, {multi:,} with 2+ products")
+    if len(rules):
+        best = rules.loc[rules['lift'].idxmax()]
+        print(f"   • Strongest pair: {best['producto_limpio']} + {best['associated_product']} (lift {best['lift']:.2f})")
+    return {'product_co_occurrence': matrix, 'product_associations': rules}
+
+
+def benchmark_baskets(n_invoices: int = 1_000_000, lines_per_invoice: int = 3,
+                      n_products: int = 300, seed: int = 0):
+    """Time incidence build, sparse product and rule extraction on synthetic invoices"""
+    n_lines = n_invoices * lines_per_invoice
+    print(f"⏱️  Basket benchmark: {n_lines:,} lines, {n_products} products")
+
+    rng = np.random.default_rng(seed)
+    popularity = rng.zipf(1.5, n_products).astype('float64')
+    df = pd.DataFrame({
+        'codigo_molino': rng.integers(1, 6, n_lines),
+        'comprobante': np.repeat(np.arange(n_invoices), lines_per_invoice),
+        'producto_limpio': pd.Categorical.from_codes(
+            rng.choice(n_products, n_lines, p=popularity / popularity.sum()),
+            [f'HARINA {i:03d}' for i in range(n_products)],
+        ).astype(str),
+    })
+    df['codigo_molino'] = np.repeat(df['codigo_molino'].to_numpy()[::lines_per_invoice], lines_per_invoice)
+
+    started = time.perf_counter()
+    incidence, products = incidence_matrix(df)
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    co = co_occurrence(incidence)
+    product_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    association_rules(co, incidence.shape[0], products)
+    rules_seconds = time.perf_counter() - started
+
+    print(f"\n📊 BASKET BENCHMARK ({n_lines:,} lines)")
+    print(f"   • Incidence matrix: {build_seconds:.2f}s")
+    print(f"   • Co-occurrence product: {product_seconds:.2f}s")
+    print(f"   • Support / lift / top-{TOP_ASSOCIATIONS}: {rules_seconds:.2f}s")
+    return {'build_s': build_seconds, 'product_s': product_seconds, 'rules_s': rules_seconds}
+
+
+if __name__ == "__main__":
+    benchmark_baskets()
@@ -0,0 +1,270 @@
+"""
+Bitmap-Indexed Query Store for Moli PWA dashboard filters
+Keeps one compressed bitmap per value of mill, zone, product, freight and month
+over the cleaned billing lines (sorted by date), so filters are bitmap
+intersections plus a date slice, followed by sums over the selected rows only
+"""
+
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from fixed_point import measure, scale_of
+from paths import PROCESSED_DIR
+from price_anomalies import read_clean_billing
+
+INDEXED_COLUMNS = ['codigo_molino', 'zona', 'producto_limpio', 'flete', 'month']
+
+# Summed over the selected rows: (output name, billing column)
+MEASURES = [('revenue', 'monto_ars'), ('volume_kg', 'total_kg')]
+
+# A value is stored as sorted row ids while they take less space than a bit per row
+SPARSE_RATIO = 32
+
+DateLike = Union[str, pd.Timestamp]
+FilterValue = Union[object, Iterable[object]]
+
+
+class Bitmap:
+    """Row set over n rows: sorted uint32 ids when sparse, packed uint64 words when dense"""
+
+    __slots__ = ('n', 'rows', 'words', 'count')
+
+    def __init__(self, n: int, rows: Optional[np.ndarray] = None, words: Optional[np.ndarray] = None,
+                 count: Optional[int] = None):
+        self.n = n
+        self.rows = rows
+        self.words = words
+        self.count = len(rows) if rows is not None else count
+
+    @classmethod
+    def from_rows(cls, rows: np.ndarray, n: int) -> 'Bitmap':
+        if len(rows) * SPARSE_RATIO < n:
+            return cls(n, rows=rows.astype('uint32'))
+        mask = np.zeros(n, dtype=bool)
+        mask[rows] = True
+        bitmap = cls.from_mask(mask)
+        bitmap.count = len(rows)
+        return bitmap
+
+    @classmethod
+    def from_mask(cls, mask: np.ndarray) -> 'Bitmap':
+        n = len(mask)
+        packed = np.packbits(mask, bitorder='little')
+        padded = np.zeros(-(-len(packed) // 8) * 8, dtype='uint8')
+        padded[:len(packed)] = packed
+        return cls(n, words=padded.view('uint64'))
+
+    @property
+    def dense(self) -> bool:
+        return self.words is not None
+
+    @property
+    def nbytes(self) -> int:
+        return self.words.nbytes if self.dense else self.rows.nbytes # type: ignore
+
+    def cardinality(self) -> int:
+        if self.count is None:
+            self.count = int(np.unpackbits(self.words.view('uint8')).sum()) # type: ignore
+        return self.count
+
+    def contains(self, rows: np.ndarray) -> np.ndarray:
+        """Membership test of row ids against the packed words"""
+        rows = rows.astype('int64')
+        return ((self.words[rows >> 6] >> (rows & 63).astype('uint64')) & np.uint64(1)).astype(bool) # type: ignore
+
+    def to_rows(self) -> np.ndarray:
+        if not self.dense:
+            return self.rows.astype('int64') # type: ignore
+        return np.flatnonzero(np.unpackbits(self.words.view('uint8'), count=self.n, bitorder='little')) # type: ignore
+
+    def __and__(self, other: 'Bitmap') -> 'Bitmap':
+        if self.dense and other.dense:
+            return Bitmap(self.n, words=self.words & other.words) # type: ignore
+        if self.dense:
+            return Bitmap(self.n, rows=other.rows[self.contains(other.rows)]) # type: ignore
+        if other.dense:
+            return Bitmap(self.n, rows=self.rows[other.contains(self.rows)]) # type: ignore
+        return Bitmap(self.n, rows=np.intersect1d(self.rows, other.rows, assume_unique=True))
+
+    def __or__(self, other: 'Bitmap') -> 'Bitmap':
+        if self.dense and other.dense:
+            return Bitmap(self.n, words=self.words | other.words) # type: ignore
+        if not self.dense and not other.dense:
+            return Bitmap.from_rows(np.union1d(self.rows, other.rows), self.n) # type: ignore
+        dense, sparse = (self, other) if self.dense else (other, self)
+        words = dense.words.copy() # type: ignore
+        rows = sparse.rows.astype('int64') # type: ignore
+        np.bitwise_or.at(words, rows >> 6, np.left_shift(np.uint64(1), (rows & 63).astype('uint64')))
+        return Bitmap(self.n, words=words)
+
+    def clip(self, start: int, stop: int) -> 'Bitmap':
+        """Restrict to rows in [start, stop)"""
+        if not self.dense:
+            rows = self.rows # type: ignore
+            return Bitmap(self.n, rows=rows[np.searchsorted(rows, start):np.searchsorted(rows, stop)])
+        words = self.words.copy() # type: ignore
+        start, stop = int(start), int(stop)
+        first, last = start >> 6, stop >> 6
+        words[:first] = 0
+        if first < len(words):
+            words[first] &= ~np.uint64((1 << (start & 63)) - 1)
+        if last < len(words):
+            words[last] &= np.uint64((1 << (stop & 63)) - 1)
+            words[last + 1:] = 0
+        return Bitmap(self.n, words=words)
+
+
+class BitmapStore:
+    """Billing lines sorted by date, bitmaps per indexed value and measure columns"""
+
+    def __init__(self, df: pd.DataFrame):
+        df = df.sort_values('fecha', kind='stable', ignore_index=True)
+        self.n = len(df)
+        self.dates = df['fecha'].to_numpy(dtype='datetime64[ns]')
+        self.values = {name: measure(df, column) for name, column in MEASURES}
+        self.scales = {name: scale_of(df, column) for name, column in MEASURES}
+        self.customers = pd.factorize(df['razon_social'])[0]
+
+        columns = df.assign(month=df['fecha'].dt.to_period('M').astype(str))[INDEXED_COLUMNS]
+        self.index: Dict[str, Dict[object, Bitmap]] = {}
+        for column in INDEXED_COLUMNS:
+            codes, uniques = pd.factorize(columns[column])
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            self.index[column] = {
+                value: Bitmap.from_rows(order[bounds[i]:bounds[i + 1]], self.n)
+                for i, value in enumerate(uniques)
+            }
+
+    @property
+    def nbytes(self) -> int:
+        return sum(b.nbytes for bitmaps in self.index.values() for b in bitmaps.values())
+
+    def _lookup(self, column: str, value: FilterValue) -> Bitmap:
+        """Bitmap of one value, or the union for a list of values"""
+        bitmaps = self.index[column]
+        values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+        found = [bitmaps[v] for v in values if v in bitmaps]
+        if not found:
+            return Bitmap(self.n, rows=np.array([], dtype='uint32'))
+        result = found[0]
+        for bitmap in found[1:]:
+            result = result | bitmap
+        return result
+
+    def select(self, start: Optional[DateLike] = None, end: Optional[DateLike] = None,
+               **filters: FilterValue) -> np.ndarray:
+        """Row positions matching every filter (AND) within [start, end] dates"""
+        unknown = set(filters) - set(INDEXED_COLUMNS)
+        if unknown:
+            raise KeyError(f"Not indexed: {sorted(unknown)} (indexed: {INDEXED_COLUMNS})")
+
+        # Rows are date-sorted, so the date range is a contiguous slice
+        lo = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start)), 'left'))
+        hi = self.n if end is None else int(np.searchsorted(
+            self.dates, np.datetime64(pd.Timestamp(end).normalize() + pd.Timedelta(days=1)), 'left'))
+        if not filters:
+            return np.arange(lo, hi)
+
+        # Smallest sets first keep intermediate results sparse
+        bitmaps = sorted((self._lookup(c, v) for c, v in filters.items()), key=Bitmap.cardinality)
+        result = bitmaps[0]
+        for bitmap in bitmaps[1:]:
+            result = result & bitmap
+        if lo > 0 or hi < self.n:
+            result = result.clip(lo, hi)
+        return result.to_rows()
+
+    def aggregate(self, start: Optional[DateLike] = None, end: Optional[DateLike] = None,
+                  **filters: FilterValue) -> Dict[str, float]:
+        """Revenue, kg, transactions and distinct customers of the filtered lines"""
+        rows = self.select(start, end, **filters)
+        totals: Dict[str, float] = {
+            name: float(values[rows].sum()) / self.scales[name] for name, values in self.values.items()
+        }
+        totals['transactions'] = len(rows)
+        customers = self.customers[rows]
+        totals['customers'] = len(np.unique(customers[customers >= 0]))
+        return totals
+
+
+def mask_aggregate(df: pd.DataFrame, start: Optional[DateLike] = None, end: Optional[DateLike] = None,
+                   **filters: FilterValue) -> Dict[str, float]:
+    """Reference: the same aggregate with pandas boolean masks over the whole frame"""
+    mask = np.ones(len(df), dtype=bool)
+    if start is not None:
+        mask &= (df['fecha'] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        mask &= (df['fecha'] < pd.Timestamp(end).normalize() + pd.Timedelta(days=1)).to_numpy()
+    for column, value in filters.items():
+        series = df['fecha'].dt.to_period('M').astype(str) if column == 'month' else df[column]
+        values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+        mask &= series.isin(values).to_numpy()
+    selected = df[mask]
+    totals: Dict[str, float] = {name: float(selected[column].sum()) for name, column in MEASURES}
+    totals['transactions'] = int(mask.sum())
+    totals['customers'] = selected['razon_social'].nunique()
+    return totals
+
+
+def _random_filters(df: pd.DataFrame, rng: np.random.Generator) -> Dict[str, object]:
+    """A dashboard-like query: 2-4 filters on values that occur in the data"""
+    row = df.iloc[int(rng.integers(len(df)))]
+    filters = {
+        'codigo_molino': row['codigo_molino'],
+        'zona': row['zona'],
+        'producto_limpio': row['producto_limpio'],
+        'flete': row['flete'],
+    }
+    chosen = rng.choice(list(filters), size=int(rng.integers(2, 5)), replace=False)
+    query: Dict[str, object] = {name: filters[name] for name in chosen}
+    if rng.random() < 0.5:
+        day = pd.Timestamp(row['fecha']).normalize()
+        query['start'] = day - pd.Timedelta(days=int(rng.integers(7, 120)))
+        query['end'] = day
+    return query
+
+
+def benchmark_bitmap_queries(processed_dir: Path = PROCESSED_DIR, n_rows: int = 2_000_000,
+                             n_queries: int = 200, seed: int = 0) -> Dict[str, float]:
+    """Random filter combinations through the bitmap store and pandas masks (same answers)"""
+    billing = read_clean_billing(processed_dir)
+    rng = np.random.default_rng(seed)
+    df = billing.iloc[rng.integers(0, len(billing), n_rows)].reset_index(drop=True)
+    print(f"⏱️  Bitmap benchmark: {n_rows:,} lines, {n_queries} queries")
+
+    started = time.perf_counter()
+    store = BitmapStore(df)
+    build_seconds = time.perf_counter() - started
+    queries: List[Dict[str, object]] = [_random_filters(df, rng) for _ in range(n_queries)]
+
+    bitmap_seconds, mask_seconds = [], []
+    for query in queries:
+        started = time.perf_counter()
+        fast = store.aggregate(**query) # type: ignore
+        bitmap_seconds.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        slow = mask_aggregate(df, **query) # type: ignore
+        mask_seconds.append(time.perf_counter() - started)
+
+        if fast['transactions'] != slow['transactions'] or fast['customers'] != slow['customers'] \
+                or not np.isclose(fast['revenue'], slow['revenue']):
+            raise AssertionError(f"Bitmap and mask results differ for {query}: {fast} vs {slow}")
+
+    bitmap_ms, mask_ms = np.array(bitmap_seconds) * 1000, np.array(mask_seconds) * 1000
+    print(f"\n📊 BITMAP BENCHMARK ({n_rows:,} lines)")
+    print(f"   • Index build: {build_seconds:.2f}s, {store.nbytes / 1e6:.1f} MB of bitmaps")
+    print(f"   • Bitmap store: p50 {np.median(bitmap_ms):.2f} ms, p95 {np.percentile(bitmap_ms, 95):.2f} ms")
+    print(f"   • Pandas masks: p50 {np.median(mask_ms):.2f} ms, p95 {np.percentile(mask_ms, 95):.2f} ms")
+    print(f"   • Speedup (p50): {np.median(mask_ms) / np.median(bitmap_ms):.1f}x")
+    return {'build_s': build_seconds, 'index_mb': store.nbytes / 1e6,
+            'bitmap_p50_ms': float(np.median(bitmap_ms)), 'mask_p50_ms': float(np.median(mask_ms))}
+
+
+if __name__ == "__main__":
+    benchmark_bitmap_queries()
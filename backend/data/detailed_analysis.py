@@ -1,10 +1,13 @@
 import pandas as pd
 from pathlib import Path
 
-def analyze_excel_files():
+from excel_readers import read_excel
+from paths import RAW_DIR
+
+def analyze_excel_files(base_path: Path = RAW_DIR):
     """Analyze the structure and content of the Excel files"""
 
-    base_path = Path("/home/sky/Projects/Moli-PWA/backend/data/raw")
+    base_path = Path(base_path)
 
     print("=" * 80)
     print("DATA ANALYSIS REPORT - MOLI PWA INTEGRATION")
@@ -29,7 +32,7 @@ def analyze_single_file(file_path: Path):
     
     try:
         # Try reading with different parameters to handle complex Excel files
-        df = pd.read_excel(file_path, header=0) # type: ignore
+        df = read_excel(file_path, header=0)
         
         print(f"📈 Shape: {df.shape[0]:,} rows × {df.shape[1]} columns")
         print(f"🏗️  Columns: {list(df.columns)}")
@@ -43,7 +46,7 @@ def analyze_single_file(file_path: Path):
             print(f"\n🔄 Trying alternative header parsing...")
             
             # Try reading without header first to see raw structure
-            df_raw = pd.read_excel(file_path, header=None) # type: ignore
+            df_raw = read_excel(file_path, header=None)
             print(f"📋 Raw first 10 rows:")
             print(df_raw.head(10))
             
@@ -0,0 +1,107 @@
+"""
+Persistent Entity ID Registry for the Moli PWA data pipeline
+Append-only mapping from customer, product and zone strings to stable dense
+integer IDs, so joins and matrices are integer-keyed and ordered across runs
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+# kind -> (string column in the billing frame, integer ID column)
+ENTITY_COLUMNS = {
+    'customer': ('razon_social', 'customer_id'),
+    'product': ('producto_limpio', 'product_id'),
+    'zone': ('zona', 'zone_id'),
+}
+
+
+class EntityRegistry:
+    """Append-only string → dense int32 ID dictionary per entity kind"""
+
+    def __init__(self, registry_dir: Union[str, Path]):
+        self.registry_dir = Path(registry_dir)
+        self.keys: Dict[str, List[str]] = {kind: [] for kind in ENTITY_COLUMNS}
+        self.ids: Dict[str, Dict[str, int]] = {kind: {} for kind in ENTITY_COLUMNS}
+
+        for kind in ENTITY_COLUMNS:
+            path = self.registry_dir / f"{kind}_ids.parquet"
+            if path.exists():
+                table = pd.read_parquet(path).sort_values('id')
+                if not np.array_equal(table['id'].to_numpy(), np.arange(len(table))):
+                    raise ValueError(f"Registry {path} is not dense; refusing to reuse it")
+                self.keys[kind] = table['key'].tolist()
+                self.ids[kind] = {key: i for i, key in enumerate(self.keys[kind])}
+
+    def __len__(self) -> int:
+        return sum(len(keys) for keys in self.keys.values())
+
+    def size(self, kind: str) -> int:
+        return len(self.keys[kind])
+
+    def encode(self, kind: str, values: pd.Series) -> np.ndarray:
+        """Map strings to IDs, appending unseen strings at the end"""
+        codes, uniques = pd.factorize(values.astype(object))
+        uniques = [str(u) for u in uniques]
+        ids = self.ids[kind]
+
+        # New keys are appended sorted so a batch gets the same IDs on re-run
+        new_keys = sorted(u for u in uniques if u not in ids)
+        for key in new_keys:
+            ids[key] = len(self.keys[kind])
+            self.keys[kind].append(key)
+
+        lookup = np.fromiter((ids[u] for u in uniques), dtype='int32', count=len(uniques))
+        # Missing values keep -1
+        return np.where(codes >= 0, lookup[codes] if len(lookup) else -1, -1).astype('int32')
+
+    def decode(self, kind: str, ids: Union[np.ndarray, pd.Series, List[int]]) -> np.ndarray:
+        """Map IDs back to their strings"""
+        keys = np.asarray(self.keys[kind], dtype=object)
+        return keys[np.asarray(ids, dtype='int64')]
+
+    def assign_ids(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Add customer_id, product_id and zone_id columns to the billing frame"""
+        print("\n🔢 Assigning entity IDs...")
+        before = {kind: self.size(kind) for kind in ENTITY_COLUMNS}
+
+        df = df.copy()
+        for kind, (column, id_column) in ENTITY_COLUMNS.items():
+            df[id_column] = self.encode(kind, df[column])
+            added = self.size(kind) - before[kind]
+            print(f"   • {kind}: {self.size(kind):,} IDs ({added:,} new)")
+        return df
+
+    def attach_ids(self, table: pd.DataFrame, kind: str) -> pd.DataFrame:
+        """Put the ID column first on a table keyed by the entity string"""
+        column, id_column = ENTITY_COLUMNS[kind]
+        table = table.copy()
+        table.insert(0, id_column, self.encode(kind, table[column]))
+        return table.sort_values(id_column, kind='stable').reset_index(drop=True)
+
+    def full_index(self, kind: str) -> pd.Index:
+        """Every ID issued so far, for reindexing matrices to a stable shape"""
+        return pd.RangeIndex(self.size(kind), name=ENTITY_COLUMNS[kind][1])
+
+    def interaction_matrix(self, cells: pd.Series, row_kind: str, col_kind: str) -> pd.DataFrame:
+        """Dense ID×ID matrix from (row_id, col_id) sums, covering every issued ID"""
+        matrix = cells.unstack(fill_value=0).reindex(
+            index=self.full_index(row_kind), columns=self.full_index(col_kind), fill_value=0
+        )
+        # Parquet requires string column labels
+        matrix.columns = matrix.columns.astype(str)
+        return matrix
+
+    def save(self) -> Path:
+        """Write each dictionary atomically"""
+        self.registry_dir.mkdir(parents=True, exist_ok=True)
+        for kind, keys in self.keys.items():
+            path = self.registry_dir / f"{kind}_ids.parquet"
+            tmp = path.with_suffix('.parquet.tmp')
+            pd.DataFrame({'id': np.arange(len(keys), dtype='int32'), 'key': keys}).to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+        print(f"✅ Entity registry saved to {self.registry_dir} ({len(self):,} IDs)")
+        return self.registry_dir
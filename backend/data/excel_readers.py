@@ -0,0 +1,170 @@
+"""
+Pluggable Excel Reader Backends for the Moli PWA data pipeline
+Selects between the native calamine parser, a streaming read-only openpyxl
+reader and the default pandas/openpyxl engine, falling back automatically
+"""
+
+import importlib.util
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from paths import RAW_DIR
+
+# Fastest first; 'auto' tries them in this order
+ENGINE_PREFERENCE = ['calamine', 'openpyxl_readonly', 'openpyxl']
+
+PathLike = Union[str, Path]
+
+
+def _read_calamine(path: PathLike, header: Optional[int]) -> pd.DataFrame:
+    # Rust-based xlsx parser exposed as a pandas engine (pandas >= 2.2)
+    return pd.read_excel(path, header=header, engine='calamine') # type: ignore
+
+
+def _convert_cell(value):
+    # read_excel turns empty cells into NaN and integral floats into ints
+    if value is None:
+        return np.nan
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _dedupe_columns(names: List) -> List:
+    # read_excel mangles repeated headers to "X", "X.1", "X.2", ...
+    counts: Dict = {}
+    result = []
+    for name in names:
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[name] = count + 1
+            name = f"{name}.{count}"
+            count = counts.get(name, 0)
+        result.append(name)
+        counts[name] = count + 1
+    return result
+
+
+def _read_openpyxl_readonly(path: PathLike, header: Optional[int]) -> pd.DataFrame:
+    # Streams rows from the sheet XML without building the cell tree
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = [[_convert_cell(value) for value in row] for row in workbook.worksheets[0].iter_rows(values_only=True)]
+    finally:
+        workbook.close()
+
+    # read_excel drops trailing empty rows; match it
+    while rows and all(pd.isna(value) for value in rows[-1]):
+        rows.pop()
+
+    if header is None:
+        return pd.DataFrame(rows).infer_objects()
+    columns = _dedupe_columns([f"Unnamed: {i}" if pd.isna(name) else name for i, name in enumerate(rows[header])])
+    return pd.DataFrame(rows[header + 1:], columns=columns).infer_objects()
+
+
+def _read_openpyxl(path: PathLike, header: Optional[int]) -> pd.DataFrame:
+    return pd.read_excel(path, header=header, engine='openpyxl') # type: ignore
+
+
+READERS: Dict[str, Callable[[PathLike, Optional[int]], pd.DataFrame]] = {
+    'calamine': _read_calamine,
+    'openpyxl_readonly': _read_openpyxl_readonly,
+    'openpyxl': _read_openpyxl,
+}
+ENGINE_MODULES = {
+    'calamine': 'python_calamine',
+    'openpyxl_readonly': 'openpyxl',
+    'openpyxl': 'openpyxl',
+}
+
+
+def available_engines() -> List[str]:
+    """Engines whose backing package is installed"""
+    return [name for name in ENGINE_PREFERENCE if importlib.util.find_spec(ENGINE_MODULES[name]) is not None]
+
+
+def read_excel(path: PathLike, header: Optional[int] = 0, engine: str = 'auto') -> pd.DataFrame:
+    """Read the first sheet with the requested engine, falling back on failure"""
+    candidates = ENGINE_PREFERENCE if engine == 'auto' else [engine] + [e for e in ENGINE_PREFERENCE if e != engine]
+    errors = []
+
+    for name in candidates:
+        if importlib.util.find_spec(ENGINE_MODULES[name]) is None:
+            errors.append(f"{name}: {ENGINE_MODULES[name]} not installed")
+            continue
+        try:
+            df = READERS[name](path, header)
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+            continue
+        if errors and engine != 'auto':
+            print(f"⚠️  Excel engine '{engine}' unavailable, used '{name}'")
+        return df
+
+    raise RuntimeError(f"No Excel engine could read {path}: {'; '.join(errors)}")
+
+
+def check_parity(data_path: Optional[str] = None) -> Dict[str, bool]:
+    """Confirm every installed engine yields the same cleaned billing frame"""
+    from process_data import MoliDataProcessor
+
+    print("🔍 Checking Excel engine parity...")
+    engines = available_engines()
+    kwargs = {'data_path': data_path} if data_path else {}
+
+    frames = {name: MoliDataProcessor(engine=name, **kwargs).process_billing_data() for name in engines}
+    reference_name = 'openpyxl' if 'openpyxl' in frames else engines[0]
+    reference = frames[reference_name].reset_index(drop=True)
+
+    results = {}
+    for name, frame in frames.items():
+        try:
+            pd.testing.assert_frame_equal(frame.reset_index(drop=True), reference)
+            results[name] = True
+        except AssertionError as e:
+            print(f"   ❌ {name} differs from {reference_name}: {str(e).splitlines()[0]}")
+            results[name] = False
+
+    for name, ok in results.items():
+        print(f"   {'✅' if ok else '❌'} {name}")
+    return results
+
+
+def benchmark_engines(files: List[PathLike], header: Optional[int] = 0, repeats: int = 3) -> pd.DataFrame:
+    """Best-of-N read time per engine and file"""
+    rows = []
+    for path in files:
+        size = Path(path).stat().st_size
+        for name in available_engines():
+            timings = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                df = READERS[name](path, header)
+                timings.append(time.perf_counter() - started)
+            rows.append({
+                'file': Path(path).name,
+                'size_mb': size / 1e6,
+                'engine': name,
+                'rows': len(df),
+                'seconds': min(timings),
+            })
+
+    results = pd.DataFrame(rows)
+    results['speedup_vs_openpyxl'] = results.groupby('file')['seconds'].transform(
+        lambda s: s[results.loc[s.index, 'engine'] == 'openpyxl'].max() / s
+    )
+    print("\n📊 EXCEL ENGINE BENCHMARK")
+    print(results.round(3).to_string(index=False))
+    return results
+
+
+if __name__ == "__main__":
+    check_parity(str(RAW_DIR))
+    benchmark_engines(sorted(RAW_DIR.glob("*.xlsx")), header=2)
@@ -0,0 +1,227 @@
+"""
+Memory-Mapped Feature Store for Moli PWA point lookups
+Writes each feature table as fixed-width column arrays plus an open-addressing
+key→row hash index, so one bakery's features are read without loading the table
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from paths import PROCESSED_DIR
+
+# Feature tables and the entity column they are keyed by
+STORE_TABLES = {
+    'customer_features': 'razon_social',
+    'product_features': 'producto_limpio',
+    'zone_features': 'zona',
+    'customer_rfm': 'razon_social',
+}
+
+CURRENT_POINTER = "CURRENT"
+EMPTY_SLOT = -1
+
+
+def key_hash(key: str) -> int:
+    """Stable 64-bit hash of an entity key (same across processes and runs)"""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _fixed_width(values: pd.Series) -> np.ndarray:
+    """Column as a fixed-width numpy array; strings become UTF-8 byte fields"""
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy()
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy(dtype='datetime64[ns]')
+    encoded = values.astype(str).str.encode('utf-8')
+    width = max(int(encoded.str.len().max()) if len(encoded) else 1, 1)
+    return encoded.to_numpy().astype(f'S{width}')
+
+
+def new_version() -> str:
+    """Publish timestamp with nanoseconds, so versions sort and rarely collide"""
+    now = time.time_ns()
+    return time.strftime('%Y%m%d%H%M%S', time.localtime(now // 10**9)) + f".{now % 10**9:09d}"
+
+
+def write_table(table: pd.DataFrame, key_column: str, table_dir: Path, version: Optional[str] = None) -> Path:
+    """Write one table version and atomically make it current"""
+    version = version or new_version()
+    # A version that is already published (same name passed twice) gets a counter suffix
+    base, counter = version, 1
+    while (table_dir / version).exists():
+        version, counter = f"{base}-{counter}", counter + 1
+    staging = table_dir / f".{version}.tmp"
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+
+    table = table.reset_index(drop=True)
+    keys = table[key_column].astype(str)
+    n_rows = len(table)
+
+    columns = {}
+    for column in table.columns:
+        array = _fixed_width(table[column])
+        np.save(staging / f"{column}.npy", array)
+        columns[column] = array.dtype.str
+
+    # Open addressing with linear probing, load factor ≤ 0.5
+    capacity = 1 << max(int(np.ceil(np.log2(max(n_rows, 1) * 2))), 1)
+    hashes = np.fromiter((key_hash(k) for k in keys), dtype='uint64', count=n_rows)
+    slot_rows = np.full(capacity, EMPTY_SLOT, dtype='int64')
+    slot_hashes = np.zeros(capacity, dtype='uint64')
+    mask = np.uint64(capacity - 1)
+    for row, h in enumerate(hashes):
+        slot = int(h & mask)
+        while slot_rows[slot] != EMPTY_SLOT:
+            slot = (slot + 1) & (capacity - 1)
+        slot_rows[slot] = row
+        slot_hashes[slot] = h
+    np.save(staging / "_index_rows.npy", slot_rows)
+    np.save(staging / "_index_hashes.npy", slot_hashes)
+
+    with open(staging / "meta.json", 'w') as f:
+        json.dump({'key': key_column, 'rows': n_rows, 'capacity': capacity, 'columns': columns},
+                  f, separators=(',', ':'))
+
+    version_dir = table_dir / version
+    os.replace(staging, version_dir)
+    pointer_tmp = table_dir / f".{CURRENT_POINTER}.tmp"
+    pointer_tmp.write_text(version)
+    os.replace(pointer_tmp, table_dir / CURRENT_POINTER)
+
+    # Old versions stay until the next publish so open readers keep working
+    for old in sorted(p for p in table_dir.iterdir() if p.is_dir() and not p.name.startswith('.'))[:-2]:
+        shutil.rmtree(old, ignore_errors=True)
+    return version_dir
+
+
+def write_feature_store(features: Dict[str, pd.DataFrame], store_dir: Path,
+                        version: Optional[str] = None) -> Path:
+    """Publish every known feature table into the store"""
+    print("\n🗄️  Writing feature store...")
+    version = version or new_version()
+    for name, key_column in STORE_TABLES.items():
+        if name in features:
+            write_table(features[name], key_column, store_dir / name, version)
+            print(f"   • {name}: {len(features[name]):,} rows")
+    print(f"✅ Feature store version {version} at {store_dir}")
+    return store_dir
+
+
+class FeatureTable:
+    """Read-only, memory-mapped view of one feature table"""
+
+    def __init__(self, table_dir: Union[str, Path]):
+        self.table_dir = Path(table_dir)
+        self.version: Optional[str] = None
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """Re-map if a newer version has been published"""
+        version = (self.table_dir / CURRENT_POINTER).read_text().strip()
+        if version == self.version:
+            return False
+
+        version_dir = self.table_dir / version
+        with open(version_dir / "meta.json") as f:
+            self.meta = json.load(f)
+        self.columns = {c: np.load(version_dir / f"{c}.npy", mmap_mode='r') for c in self.meta['columns']}
+        self.slot_rows = np.load(version_dir / "_index_rows.npy", mmap_mode='r')
+        self.slot_hashes = np.load(version_dir / "_index_hashes.npy", mmap_mode='r')
+        self.key_values = self.columns[self.meta['key']]
+        self.mask = self.meta['capacity'] - 1
+        self.version = version
+        return True
+
+    def row_of(self, key: str) -> int:
+        """Probe the hash index; -1 if the key is absent"""
+        h = key_hash(key)
+        encoded = key.encode('utf-8')
+        slot = h & self.mask
+        while True:
+            row = int(self.slot_rows[slot])
+            if row == EMPTY_SLOT:
+                return -1
+            if int(self.slot_hashes[slot]) == h and self.key_values[row] == encoded:
+                return row
+            slot = (slot + 1) & self.mask
+
+    @staticmethod
+    def _value(value):
+        if isinstance(value, bytes):
+            return value.decode('utf-8')
+        if isinstance(value, np.datetime64):
+            return pd.Timestamp(value)
+        return value.item() if hasattr(value, 'item') else value
+
+    def get(self, key: str) -> Optional[Dict[str, object]]:
+        """Features of one entity, or None"""
+        row = self.row_of(key)
+        if row < 0:
+            return None
+        return {name: self._value(array[row]) for name, array in self.columns.items()}
+
+    def get_many(self, keys: List[str]) -> pd.DataFrame:
+        """Features of a batch of entities; missing keys are dropped"""
+        rows = np.fromiter((self.row_of(k) for k in keys), dtype='int64', count=len(keys))
+        rows = rows[rows >= 0]
+        batch = {}
+        for name, array in self.columns.items():
+            values = np.asarray(array[rows])
+            if values.dtype.kind == 'S':
+                values = np.char.decode(values, 'utf-8')
+            batch[name] = values
+        return pd.DataFrame(batch)
+
+
+class FeatureStore:
+    """All feature tables of a store directory"""
+
+    def __init__(self, store_dir: Union[str, Path] = PROCESSED_DIR / "feature_store"):
+        self.store_dir = Path(store_dir)
+        self.tables = {
+            name: FeatureTable(self.store_dir / name)
+            for name in STORE_TABLES if (self.store_dir / name / CURRENT_POINTER).exists()
+        }
+
+    def refresh(self) -> List[str]:
+        return [name for name, table in self.tables.items() if table.refresh()]
+
+    def get(self, table: str, key: str) -> Optional[Dict[str, object]]:
+        return self.tables[table].get(key)
+
+    def get_many(self, table: str, keys: List[str]) -> pd.DataFrame:
+        return self.tables[table].get_many(keys)
+
+
+def benchmark_lookups(store_dir: Union[str, Path] = PROCESSED_DIR / "feature_store",
+                      table: str = 'customer_features', n: int = 10_000) -> Dict[str, float]:
+    """Average single and batch lookup latency against a written store"""
+    store = FeatureStore(store_dir)
+    features = store.tables[table]
+    keys = [k.decode('utf-8') for k in np.asarray(features.key_values[:n])]
+
+    started = time.perf_counter()
+    for key in keys:
+        features.get(key)
+    single_us = (time.perf_counter() - started) / len(keys) * 1e6
+
+    started = time.perf_counter()
+    features.get_many(keys)
+    batch_us = (time.perf_counter() - started) / len(keys) * 1e6
+
+    print(f"📊 {table}: {single_us:.1f} µs per get, {batch_us:.1f} µs per key in batch")
+    return {'single_us': single_us, 'batch_us_per_key': batch_us}
+
+
+if __name__ == "__main__":
+    benchmark_lookups()
@@ -0,0 +1,93 @@
+"""
+Fixed-Point Money and Weight Columns for the Moli PWA data pipeline
+Opt-in: ingestion adds int64 centavos and grams next to monto_ars / total_kg,
+aggregation stages sum the integers, and values go back to decimal units only
+when an output is produced, so totals do not depend on summation order
+"""
+
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# Decimal column -> (integer column, units per decimal unit)
+FIXED_POINT_COLUMNS = {
+    'monto_ars': ('monto_centavos', 100),
+    'total_kg': ('total_g', 1000),
+}
+
+
+def to_fixed_point(df: pd.DataFrame) -> pd.DataFrame:
+    """Add the integer columns and snap the decimal ones to the same values
+
+    Missing amounts become 0 in the integer column (sums skip them either way)
+    and stay NaN in the decimal column, so counts and means are unchanged
+    """
+    df = df.copy()
+    for column, (fixed, scale) in FIXED_POINT_COLUMNS.items():
+        values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype='float64')
+        units = np.rint(np.nan_to_num(values) * scale).astype('int64')
+        df[fixed] = units
+        df[column] = np.where(np.isnan(values), np.nan, units / scale)
+    return df
+
+
+def has_fixed_point(df: pd.DataFrame) -> bool:
+    return all(fixed in df.columns for fixed, _ in FIXED_POINT_COLUMNS.values())
+
+
+def measure(df: pd.DataFrame, column: str) -> np.ndarray:
+    """Values to accumulate: integer units in fixed-point mode, else float64 with NaN as 0"""
+    if column in FIXED_POINT_COLUMNS and has_fixed_point(df):
+        return df[FIXED_POINT_COLUMNS[column][0]].to_numpy(dtype='int64')
+    return df[column].fillna(0).to_numpy(dtype='float64')
+
+
+def scale_of(df: pd.DataFrame, column: str) -> int:
+    """Units per decimal unit of what measure() returns for this column"""
+    if column in FIXED_POINT_COLUMNS and has_fixed_point(df):
+        return FIXED_POINT_COLUMNS[column][1]
+    return 1
+
+
+def to_decimal(values: Union[pd.Series, pd.DataFrame, np.ndarray, int, float],
+               scale: int) -> Union[pd.Series, pd.DataFrame, np.ndarray, float]:
+    """Integer totals back to decimal units (the only rounding step)"""
+    return values / scale if scale != 1 else values
+
+
+def sum_by(df: pd.DataFrame, column: str, by: Optional[object] = None) -> Union[pd.Series, float]:
+    """Exact integer sum in fixed-point mode, plain float sum otherwise"""
+    if column in FIXED_POINT_COLUMNS and has_fixed_point(df):
+        fixed, scale = FIXED_POINT_COLUMNS[column]
+        if by is None:
+            return float(to_decimal(int(df[fixed].sum()), scale))
+        return to_decimal(df.groupby(by)[fixed].sum(), scale)
+    if by is None:
+        return float(df[column].sum())
+    return df.groupby(by)[column].sum()
+
+
+def group_sum(codes: np.ndarray, values: np.ndarray, n_groups: int) -> np.ndarray:
+    """Per-group sums that stay int64 for integer input (bincount would go through float64)"""
+    if values.dtype.kind in 'iu':
+        totals = np.zeros(n_groups, dtype='int64')
+        np.add.at(totals, codes, values)
+        return totals
+    return np.bincount(codes, weights=values, minlength=n_groups)
+
+
+def apply_exact_sums(stats: pd.DataFrame, df: pd.DataFrame, key: str) -> pd.DataFrame:
+    """Overwrite <column>_sum / <column>_mean of a groupby-agg table with integer totals"""
+    if not has_fixed_point(df):
+        return stats
+    for column, (fixed, scale) in FIXED_POINT_COLUMNS.items():
+        if f'{column}_sum' not in stats.columns:
+            continue
+        grouped = df.groupby(key)
+        totals = grouped[fixed].sum().reindex(stats[key]).to_numpy()
+        counts = grouped[column].count().reindex(stats[key]).to_numpy()
+        stats[f'{column}_sum'] = np.round(to_decimal(totals, scale), 2)
+        if f'{column}_mean' in stats.columns:
+            stats[f'{column}_mean'] = np.round(to_decimal(totals, scale) / np.where(counts > 0, counts, np.nan), 2)
+    return stats
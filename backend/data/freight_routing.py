@@ -0,0 +1,251 @@
+"""
+Freight Delivery Batching for Moli PWA mills
+Groups the day's flete=Si orders into truck loads by zone and capacity using a
+precomputed zone distance matrix, a greedy sweep along a zone tour and a
+local-search pass that moves orders between neighbouring trucks
+"""
+
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from geo_sales import build_zone_lookup
+from paths import PROCESSED_DIR
+
+TRUCK_CAPACITY_KG = 28_000
+
+# Zone distances are a proxy: Argentine postal codes grow roughly with distance
+# from Buenos Aires, so CP gaps stand in for road distance within a province
+KM_PER_POSTAL_CODE = 0.5
+PROVINCE_CHANGE_KM = 150.0
+UNKNOWN_ZONE_KM = 50.0
+
+# Order identity, as in the billing frame
+ORDER_COLUMNS = ['codigo_molino', 'comprobante']
+
+
+def build_zone_distances(zones: pd.Series, geo_df: pd.DataFrame) -> pd.DataFrame:
+    """Symmetric zone × zone distance matrix (km proxy) from the geographic data"""
+    lookup = build_zone_lookup(zones, geo_df)
+    postal = pd.to_numeric(geo_df['codigo_postal'].str.extract(r'(\d+)', expand=False), errors='coerce')
+    geo = geo_df.assign(cp=postal)
+    by_city = geo.groupby(['provincia', 'ciudad'])['cp'].median()
+    by_province = geo.groupby('provincia')['cp'].median()
+
+    city_cp = pd.MultiIndex.from_frame(lookup[['provincia', 'ciudad']]).map(by_city.to_dict().get)
+    cp = np.where(lookup['match'] == 'ciudad', pd.Series(city_cp, dtype='float64'),
+                  lookup['provincia'].map(by_province).to_numpy(dtype='float64'))
+    province_codes = pd.factorize(lookup['provincia'])[0]
+    known = (lookup['match'] != 'sin_asignar').to_numpy() & ~np.isnan(cp)
+
+    distance = (np.abs(cp[:, None] - cp[None, :]) * KM_PER_POSTAL_CODE
+                + (province_codes[:, None] != province_codes[None, :]) * PROVINCE_CHANGE_KM)
+    distance = np.where(known[:, None] & known[None, :], distance, UNKNOWN_ZONE_KM)
+    np.fill_diagonal(distance, 0.0)
+
+    labels = lookup['zona'].astype(str).to_numpy()
+    return pd.DataFrame(distance.round(1), index=pd.Index(labels, name='zona'), columns=labels)
+
+
+def pending_orders(df: pd.DataFrame, day: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """flete=Si invoices of one day with their zone and total kg"""
+    freight = df[df['flete'] == 'Si']
+    if day is not None:
+        freight = freight[freight['fecha'].dt.normalize() == pd.Timestamp(day).normalize()]
+    return (freight.groupby(ORDER_COLUMNS, as_index=False, sort=False)
+            .agg(zona=('zona', 'first'), razon_social=('razon_social', 'first'), total_kg=('total_kg', 'sum')))
+
+
+def zone_tour(distance: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Visit order of the given zones: nearest neighbour from the heaviest, then 2-opt"""
+    n = len(weights)
+    if n <= 2:
+        return np.argsort(-weights, kind='stable')
+
+    tour = [int(np.argmax(weights))]
+    unvisited = np.ones(n, dtype=bool)
+    unvisited[tour[0]] = False
+    for _ in range(n - 1):
+        row = np.where(unvisited, distance[tour[-1]], np.inf)
+        tour.append(int(np.argmin(row)))
+        unvisited[tour[-1]] = False
+    tour = np.array(tour)
+
+    # 2-opt on an open path: reverse tour[i:j+1] when it shortens the two edges it touches
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, n - 1):
+            a, b = tour[i - 1], tour[i]
+            c, d = tour[i:-1], tour[i + 1:]
+            gain = distance[a, b] + distance[c, d] - distance[a, c] - distance[b, d]
+            j = int(np.argmax(gain))
+            if gain[j] > 1e-9:
+                tour[i:i + j + 1] = tour[i:i + j + 1][::-1]
+                improved = True
+    return tour
+
+
+def _route_km(stops: np.ndarray, distance: np.ndarray) -> float:
+    return float(distance[stops[:-1], stops[1:]].sum()) if len(stops) > 1 else 0.0
+
+
+def plan_deliveries(orders: pd.DataFrame, distances: pd.DataFrame,
+                    capacity_kg: float = TRUCK_CAPACITY_KG, max_passes: int = 3) -> Dict[str, pd.DataFrame]:
+    """Assign orders to trucks; returns per-order assignments and per-truck loads"""
+    zone_index = pd.Index(distances.index)
+    zone_pos = zone_index.get_indexer(orders['zona'].astype(str))
+    if (zone_pos < 0).any():
+        missing = orders.loc[zone_pos < 0, 'zona'].unique()[:5]
+        raise KeyError(f"Zones missing from the distance matrix: {list(missing)}")
+    distance = distances.to_numpy()
+    kg = orders['total_kg'].to_numpy(dtype='float64')
+
+    # Cluster: orders of one zone travel together; zones are swept along the tour
+    day_zones, zone_codes = np.unique(zone_pos, return_inverse=True)
+    zone_kg = np.bincount(zone_codes, weights=kg)
+    tour = zone_tour(distance[np.ix_(day_zones, day_zones)], zone_kg)
+    rank = np.empty(len(tour), dtype='int64')
+    rank[tour] = np.arange(len(tour))
+    order = np.lexsort((-kg, rank[zone_codes]))
+
+    # Greedy: fill trucks along the sweep; oversize orders get a dedicated truck
+    truck = np.empty(len(order), dtype='int64')
+    load = []
+    for position in order:
+        if load and load[-1] + kg[position] <= capacity_kg:
+            load[-1] += kg[position]
+        else:
+            load.append(kg[position])
+        truck[position] = len(load) - 1
+    load = np.array(load)
+
+    # Local search: move an order to the neighbouring truck when it drops a stop there
+    stop_rank = rank[zone_codes]
+    for _ in range(max_passes):
+        moved = 0
+        for t in range(len(load) - 1):
+            for src, dst in ((t, t + 1), (t + 1, t)):
+                members = np.flatnonzero(truck == src)
+                src_zones = np.unique(stop_rank[members])
+                dst_zones = np.unique(stop_rank[truck == dst])
+                shared = np.intersect1d(src_zones, dst_zones)
+                for zone in shared:
+                    candidates = members[stop_rank[members] == zone]
+                    if load[dst] + kg[candidates].sum() <= capacity_kg:
+                        truck[candidates] = dst
+                        load[src] -= kg[candidates].sum()
+                        load[dst] += kg[candidates].sum()
+                        moved += len(candidates)
+                        members = np.flatnonzero(truck == src)
+        if not moved:
+            break
+
+    used = np.unique(truck)
+    renumber = np.full(len(load), -1, dtype='int64')
+    renumber[used] = np.arange(len(used))
+    truck = renumber[truck]
+
+    assignments = orders.reset_index(drop=True).assign(
+        truck=truck,
+        stop=pd.Series(stop_rank).groupby(truck).rank(method='dense').astype('int64').to_numpy(),
+    ).sort_values(['truck', 'stop'], kind='stable', ignore_index=True)
+
+    trucks = []
+    for t, group in assignments.groupby('truck', sort=True):
+        stops = day_zones[tour[np.unique(stop_rank[truck == t])]]
+        trucks.append({
+            'truck': t,
+            'orders': len(group),
+            'total_kg': float(group['total_kg'].sum()),
+            'utilization': float(group['total_kg'].sum() / capacity_kg),
+            'stops': len(stops),
+            'zonas': ' → '.join(zone_index[stops]),
+            'route_km': _route_km(stops, distance),
+        })
+    return {'freight_assignments': assignments, 'freight_trucks': pd.DataFrame(trucks)}
+
+
+def plan_day(df: pd.DataFrame, distances: pd.DataFrame, day: pd.Timestamp,
+             capacity_kg: float = TRUCK_CAPACITY_KG) -> Dict[str, pd.DataFrame]:
+    """Per-mill delivery plans for one billing day
+
+    Orders without a zone, or with one the distance matrix does not know, are
+    left out of the plans and listed in freight_unroutable
+    """
+    orders = pending_orders(df, day)
+    routable = (orders['zona'].notna() & orders['zona'].astype(str).isin(distances.index)).to_numpy()
+    unroutable = orders[~routable].assign(
+        reason=np.where(orders.loc[~routable, 'zona'].isna(), 'missing_zone', 'unknown_zone'))
+    orders = orders[routable]
+
+    plans = [
+        {name: table.assign(codigo_molino=mill) if 'codigo_molino' not in table else table
+         for name, table in plan_deliveries(mill_orders, distances, capacity_kg).items()}
+        for mill, mill_orders in orders.groupby('codigo_molino', sort=True)
+    ]
+    if not plans:
+        return {'freight_assignments': orders.assign(truck=[], stop=[]), 'freight_trucks': pd.DataFrame(),
+                'freight_unroutable': unroutable.reset_index(drop=True)}
+    return {**{name: pd.concat([p[name] for p in plans], ignore_index=True) for name in plans[0]},
+            'freight_unroutable': unroutable.reset_index(drop=True)}
+
+
+def benchmark_freight(processed_dir: Path = PROCESSED_DIR, orders_per_day: int = 3_000,
+                      days: int = 30, seed: int = 0) -> Dict[str, float]:
+    """Replay billing days, resampled up to orders_per_day freight orders, through the planner"""
+    billing = pd.read_parquet(processed_dir / "billing_data_clean.parquet")
+    distances = pd.read_parquet(processed_dir / "zone_distance_matrix.parquet")
+    freight = pending_orders(billing).merge(
+        billing[ORDER_COLUMNS + ['fecha']].drop_duplicates(ORDER_COLUMNS), on=ORDER_COLUMNS)
+    freight = freight[freight['zona'].notna() & freight['zona'].astype(str).isin(distances.index)]
+    replay_days = np.sort(freight['fecha'].dt.normalize().unique())[-days:]
+    print(f"⏱️  Freight benchmark: {len(replay_days)} days × {orders_per_day:,} orders")
+
+    rng = np.random.default_rng(seed)
+    seconds, trucks, utilization = [], [], []
+    for day in replay_days:
+        day_orders = freight[freight['fecha'].dt.normalize() == day]
+        sample = day_orders.iloc[rng.integers(0, len(day_orders), orders_per_day)].reset_index(drop=True)
+        sample['comprobante'] = np.arange(orders_per_day)
+
+        started = time.perf_counter()
+        plan = plan_deliveries(sample, distances)
+        seconds.append(time.perf_counter() - started)
+        trucks.append(len(plan['freight_trucks']))
+        utilization.append(plan['freight_trucks']['utilization'].mean())
+
+    seconds = np.array(seconds)
+    print(f"\n📊 FREIGHT BENCHMARK ({orders_per_day:,} orders/day)")
+    print(f"   • Plan time: p50 {np.median(seconds) * 1000:.0f} ms, max {seconds.max() * 1000:.0f} ms")
+    print(f"   • Trucks/day: {np.mean(trucks):.1f}, mean utilization {np.mean(utilization):.1%}")
+    return {'p50_s': float(np.median(seconds)), 'max_s': float(seconds.max()),
+            'trucks_per_day': float(np.mean(trucks)), 'utilization': float(np.mean(utilization))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan freight deliveries for one billing day")
+    parser.add_argument('--date', default=None, help="Billing day (default: last day in the data)")
+    parser.add_argument('--capacity-kg', type=float, default=TRUCK_CAPACITY_KG)
+    parser.add_argument('--processed-dir', type=Path, default=PROCESSED_DIR)
+    args = parser.parse_args()
+
+    billing = pd.read_parquet(args.processed_dir / "billing_data_clean.parquet")
+    distances = pd.read_parquet(args.processed_dir / "zone_distance_matrix.parquet")
+    day = pd.Timestamp(args.date) if args.date else billing['fecha'].max().normalize()
+
+    started = time.perf_counter()
+    plan = plan_day(billing, distances, day, args.capacity_kg)
+    print(f"🚚 {day.date()}: {len(plan['freight_assignments']):,} orders on "
+          f"{len(plan['freight_trucks']):,} trucks in {(time.perf_counter() - started) * 1000:.0f} ms")
+    if len(plan['freight_unroutable']):
+        print(f"   ⚠️  {len(plan['freight_unroutable']):,} orders without a routable zone")
+    print(plan['freight_trucks'].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Geographic Sales Distribution for the Moli PWA dashboard
+Maps billing zones to provincia/ciudad through a lookup built once on
+normalized keys, then materializes revenue, kg and customers per province and
+city as compact, precompressed JSON ready for the map view
+"""
+
+import gzip
+import json
+import unicodedata
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from fixed_point import group_sum, measure, scale_of, to_decimal
+
+UNASSIGNED = 'SIN ASIGNAR'
+
+
+def normalize_place(names: pd.Series) -> pd.Series:
+    """Uppercase, strip accents and punctuation, collapse spaces"""
+    ascii_names = names.astype(str).map(
+        lambda s: unicodedata.normalize('NFKD', s).encode('ascii', 'ignore').decode('ascii')
+    )
+    return (
+        ascii_names.str.upper()
+        .str.replace(r'[^\w\s]', ' ', regex=True)
+        .str.replace(r'\s+', ' ', regex=True)
+        .str.strip()
+    )
+
+
+def build_zone_lookup(zones: pd.Series, geo_df: pd.DataFrame) -> pd.DataFrame:
+    """provincia/ciudad for every distinct billing zone
+
+    A zone matches a city name first, then a province name; city names shared
+    by several provinces resolve to the province with the most postal codes
+    """
+    geo = geo_df.assign(
+        ciudad_key=normalize_place(geo_df['ciudad']),
+        provincia_key=normalize_place(geo_df['provincia']),
+    )
+    cities = (
+        geo.groupby(['ciudad_key', 'provincia', 'ciudad'], sort=False).size().rename('postal_codes')
+        .reset_index()
+        .sort_values(['ciudad_key', 'postal_codes'], ascending=[True, False], kind='stable')
+        .drop_duplicates('ciudad_key')
+        .set_index('ciudad_key')
+    )
+    provinces = geo.drop_duplicates('provincia_key').set_index('provincia_key')['provincia']
+
+    lookup = pd.DataFrame({'zona': pd.unique(zones.dropna())})
+    keys = normalize_place(lookup['zona'])
+    by_city = keys.map(cities['provincia']).notna().to_numpy()
+    by_province = ~by_city & keys.map(provinces).notna().to_numpy()
+
+    lookup['provincia'] = np.where(by_city, keys.map(cities['provincia']),
+                                   np.where(by_province, keys.map(provinces), UNASSIGNED))
+    lookup['ciudad'] = np.where(by_city, keys.map(cities['ciudad']), UNASSIGNED)
+    lookup['match'] = np.select([by_city, by_province], ['ciudad', 'provincia'], default='sin_asignar')
+    return lookup
+
+
+def aggregate_geo_sales(df: pd.DataFrame, lookup: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Revenue, kg, transactions and distinct customers per province and per city"""
+    # Hash join on the factorized zone code: one take per row, no merge
+    zone_codes = pd.Index(lookup['zona']).get_indexer(df['zona'])
+    row_lookup = lookup.reindex(np.where(zone_codes >= 0, zone_codes, len(lookup))).reset_index(drop=True)
+    row_lookup[['provincia', 'ciudad']] = row_lookup[['provincia', 'ciudad']].fillna(UNASSIGNED)
+
+    customer_codes, customers = pd.factorize(df['razon_social'])
+    known_customer = customer_codes >= 0
+    n_customers = max(len(customers), 1)
+    monto, monto_scale = measure(df, 'monto_ars'), scale_of(df, 'monto_ars')
+    kg, kg_scale = measure(df, 'total_kg'), scale_of(df, 'total_kg')
+
+    tables = {}
+    for level, columns in {'province': ['provincia'], 'city': ['provincia', 'ciudad']}.items():
+        grouped = row_lookup.groupby(columns, sort=True)
+        codes = grouped.ngroup().to_numpy()
+        table = grouped.size().reset_index()[columns]
+        n = len(table)
+        pairs = np.unique(codes[known_customer].astype('int64') * n_customers + customer_codes[known_customer])
+        table['revenue'] = np.round(to_decimal(group_sum(codes, monto, n), monto_scale), 2)
+        table['volume_kg'] = np.round(to_decimal(group_sum(codes, kg, n), kg_scale), 2)
+        table['transactions'] = np.bincount(codes, minlength=n)
+        table['customers'] = np.bincount(pairs // n_customers, minlength=n)
+        tables[f"geo_sales_{level}"] = table.sort_values('revenue', ascending=False, ignore_index=True)
+    return tables
+
+
+def write_geo_sales(tables: Dict[str, pd.DataFrame], output_dir: Path) -> List[Path]:
+    """Map payload as compact JSON plus a gzip copy served with Content-Encoding"""
+    province, city = tables['geo_sales_province'], tables['geo_sales_city']
+    payload = {
+        'provinces': {
+            row.provincia: {
+                'revenue': row.revenue, 'volume_kg': row.volume_kg,
+                'transactions': int(row.transactions), 'customers': int(row.customers),
+                'cities': {
+                    c.ciudad: [c.revenue, c.volume_kg, int(c.transactions), int(c.customers)]
+                    for c in city[city['provincia'] == row.provincia].itertuples()
+                },
+            }
+            for row in province.itertuples()
+        },
+        'city_fields': ['revenue', 'volume_kg', 'transactions', 'customers'],
+    }
+    body = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    path = output_dir / "geo_sales.json"
+    path.write_bytes(body)
+    # mtime=0 keeps the compressed bytes identical across runs with the same data
+    gz_path = output_dir / "geo_sales.json.gz"
+    gz_path.write_bytes(gzip.compress(body, compresslevel=9, mtime=0))
+    return [path, gz_path]
+
+
+def generate_geo_sales(df: pd.DataFrame, geo_df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Geo stage: zone lookup plus province and city aggregates"""
+    print("\n🗺️  Aggregating sales by province and city...")
+    lookup = build_zone_lookup(df['zona'], geo_df)
+    tables = aggregate_geo_sales(df, lookup)
+
+    matched = lookup['match'] != 'sin_asignar'
+    line_share = df['zona'].isin(lookup.loc[matched, 'zona']).mean() if len(df) else 0.0
+    print(f"✅ {matched.sum():,}/{len(lookup):,} zones located "
+          f"({(lookup['match'] == 'ciudad').sum():,} by city), {line_share:.1%} of billing lines")
+    print(f"   • {len(tables['geo_sales_province']):,} provinces, {len(tables['geo_sales_city']):,} cities")
+    return {'zone_geo_lookup': lookup, **tables}
@@ -0,0 +1,348 @@
+"""
+Order-traffic load generator for the Moli PWA backend
+Replays the cleaned billing history as time-compressed order create/edit/status
+calls and reports throughput and tail latency per endpoint
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+
+from paths import PROCESSED_DIR
+
+# PRD non-functional target: p95 ≤ 500 ms on status queries
+P95_TARGET_MS = 500.0
+
+# Billing dates carry no time of day, so orders are spread over business hours
+BUSINESS_DAY_SECONDS = 10 * 3600
+# Edits land inside the 30-minute grace window of the order
+EDIT_DELAY_SECONDS = 15 * 60
+STATUS_DELAY_SECONDS = 2 * 3600
+
+
+def build_replay_schedule(df: pd.DataFrame, speedup: float = 3600.0,
+                          edit_ratio: float = 0.2, seed: int = 42) -> pd.DataFrame:
+    """Turn billing lines into a time-ordered schedule of API calls"""
+    print("🗓️  Building replay schedule...")
+
+    # One order per invoice; its lines become the order items
+    orders = df.groupby('comprobante', sort=False).agg( # type: ignore
+        fecha=('fecha', 'first'),
+        razon_social=('razon_social', 'first'),
+        codigo_molino=('codigo_molino', 'first'),
+        zona=('zona', 'first'),
+        total_kg=('total_kg', 'sum'),
+        monto_ars=('monto_ars', 'sum'),
+        items=('producto_limpio', list),
+        kgs=('total_kg', list),
+    ).reset_index().sort_values('fecha', kind='stable')
+
+    # Spread each day's orders evenly across the business day
+    day_rank = orders.groupby('fecha').cumcount().to_numpy()
+    day_size = orders.groupby('fecha')['fecha'].transform('size').to_numpy()
+    day_start = (orders['fecha'] - orders['fecha'].min()).dt.total_seconds().to_numpy() * 1.0
+    created_at = day_start + day_rank * (BUSINESS_DAY_SECONDS / day_size)
+
+    rng = np.random.default_rng(seed)
+    is_edited = rng.random(len(orders)) < edit_ratio
+
+    calls = [
+        pd.DataFrame({'at': created_at, 'endpoint': 'create', 'order': np.arange(len(orders))}),
+        pd.DataFrame({'at': created_at[is_edited] + EDIT_DELAY_SECONDS, 'endpoint': 'edit',
+                      'order': np.flatnonzero(is_edited)}),
+        pd.DataFrame({'at': created_at + STATUS_DELAY_SECONDS, 'endpoint': 'status',
+                      'order': np.arange(len(orders))}),
+    ]
+    schedule = pd.concat(calls, ignore_index=True).sort_values('at', kind='stable')
+    schedule['at'] = schedule['at'] / speedup
+    schedule = schedule.reset_index(drop=True)
+
+    print(f"✅ {len(orders):,} orders → {len(schedule):,} calls "
+          f"over {schedule['at'].max():,.1f}s at {speedup:,.0f}x")
+    schedule.attrs['orders'] = orders
+    return schedule
+
+
+def order_payload(order: pd.Series) -> Dict[str, object]:
+    """Map a replayed invoice onto the frontend Order model"""
+    return {
+        'bakeryId': str(order['razon_social']),
+        'molinoId': str(order['codigo_molino']),
+        'clientName': str(order['razon_social']),
+        'deliveryAddress': {'city': str(order['zona']), 'country': 'AR'},
+        'status': 'Creado',
+        'items': [
+            {'productType': str(product), 'quantity': float(kg), 'unit': 'kg'}
+            for product, kg in zip(order['items'], order['kgs'])
+        ],
+        'totalAmount': float(order['monto_ars']),
+        'total': float(order['monto_ars']),
+    }
+
+
+class HttpConnection:
+    """Minimal keep-alive HTTP/1.1 client on asyncio streams"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: Optional[dict] = None) -> Tuple[int, bytes]:
+        if self.writer is None or self.writer.is_closing():
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+        payload = json.dumps(body, separators=(',', ':')).encode() if body is not None else b''
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n")
+        self.writer.write(head.encode() + payload)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline() # type: ignore
+        if not status_line:
+            # The server closed an idle keep-alive connection
+            raise ConnectionError("Connection closed before a response")
+        status = int(status_line.split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline() # type: ignore
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode().partition(':')
+            if name.lower() == 'content-length':
+                length = int(value)
+        data = await self.reader.readexactly(length) # type: ignore
+        return status, data
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+    async def aclose(self):
+        self.close()
+        if self.writer is not None:
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+class StandInBackend:
+    """Local in-memory stand-in for the orders API, for offline runs"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.orders: Dict[str, dict] = {}
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return f"http://{self.host}:{self.port}/api"
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode().split(' ', 2)
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b''):
+                        break
+                    name, _, value = line.decode().partition(':')
+                    if name.lower() == 'content-length':
+                        length = int(value)
+                body = json.loads(await reader.readexactly(length)) if length else None
+
+                if self.latency_ms:
+                    await asyncio.sleep(self.latency_ms / 1000)
+                status, response = self._route(method, path, body)
+
+                data = json.dumps(response).encode()
+                writer.write(f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _route(self, method: str, path: str, body: Optional[dict]) -> Tuple[int, dict]:
+        parts = path.strip('/').split('/')
+        if parts[-1] == 'orders' and method == 'POST':
+            order_id = str(len(self.orders) + 1)
+            self.orders[order_id] = {**(body or {}), 'id': order_id}
+            return 201, self.orders[order_id]
+        order = self.orders.get(parts[-1])
+        if order is None:
+            return 404, {'detail': 'Order not found'}
+        if method == 'PUT':
+            order.update(body or {})
+        return 200, order
+
+
+async def replay(schedule: pd.DataFrame, base_url: str,
+                 concurrency: int = 32) -> Tuple[Dict[str, List[float]], Dict[str, int], float]:
+    """Fire the schedule against the backend and collect latencies per endpoint"""
+    print(f"\n🚚 Replaying {len(schedule):,} calls against {base_url}")
+
+    url = urlsplit(base_url)
+    prefix = url.path.rstrip('/')
+    orders: pd.DataFrame = schedule.attrs['orders']
+
+    pool: asyncio.Queue = asyncio.Queue()
+    for _ in range(concurrency):
+        pool.put_nowait(HttpConnection(url.hostname or '127.0.0.1', url.port or 80))
+
+    order_ids: Dict[int, asyncio.Future] = {}
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    loop = asyncio.get_running_loop()
+
+    async def call(endpoint: str, order_idx: int):
+        created_id = None
+        try:
+            if endpoint == 'create':
+                method, path, body = 'POST', f"{prefix}/orders", order_payload(orders.iloc[order_idx])
+            else:
+                order_id = await order_ids[order_idx]
+                if order_id is None:
+                    errors[endpoint] += 1
+                    return
+                if endpoint == 'edit':
+                    method, path, body = 'PUT', f"{prefix}/orders/{order_id}", {'notes': 'replay edit'}
+                else:
+                    method, path, body = 'GET', f"{prefix}/orders/{order_id}", None
+
+            conn = await pool.get()
+            started = time.perf_counter()
+            try:
+                status, data = await conn.request(method, path, body)
+            except (ConnectionError, asyncio.IncompleteReadError, OSError, ValueError, IndexError):
+                conn.close()
+                status, data = 599, b''
+            finally:
+                pool.put_nowait(conn)
+            latencies[endpoint].append((time.perf_counter() - started) * 1000)
+
+            if endpoint == 'create' and status < 400:
+                try:
+                    created_id = json.loads(data).get('id')
+                except (ValueError, AttributeError):
+                    status = 599
+            if status >= 400:
+                errors[endpoint] += 1
+        finally:
+            # Edits and status calls wait on this future, so it resolves even when the call fails
+            if endpoint == 'create' and not order_ids[order_idx].done():
+                order_ids[order_idx].set_result(created_id)
+
+    t0 = loop.time()
+    tasks = []
+    for at, endpoint, order_idx in schedule[['at', 'endpoint', 'order']].itertuples(index=False):
+        if endpoint == 'create':
+            order_ids[order_idx] = loop.create_future()
+        delay = t0 + at - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(call(endpoint, order_idx)))
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    for endpoint, result in zip(schedule['endpoint'], results):
+        if isinstance(result, Exception):
+            errors[endpoint] += 1
+    elapsed = loop.time() - t0
+
+    while not pool.empty():
+        await pool.get_nowait().aclose()
+
+    return latencies, errors, elapsed
+
+
+def report_latencies(latencies: Dict[str, List[float]], errors: Dict[str, int],
+                     elapsed: float) -> pd.DataFrame:
+    """Summarize throughput and tail latency per endpoint"""
+    rows = []
+    for endpoint in ('create', 'edit', 'status'):
+        samples = np.asarray(latencies.get(endpoint, []))
+        if samples.size == 0:
+            continue
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        rows.append({
+            'endpoint': endpoint,
+            'calls': int(samples.size),
+            'errors': int(errors.get(endpoint, 0)),
+            'rps': samples.size / elapsed,
+            'p50_ms': p50,
+            'p95_ms': p95,
+            'p99_ms': p99,
+            'max_ms': samples.max(),
+        })
+    summary = pd.DataFrame(rows).set_index('endpoint').round(2)
+
+    print(f"\n📊 LOAD TEST RESULTS ({elapsed:,.1f}s)")
+    print(summary.to_string())
+    for endpoint, row in summary.iterrows():
+        verdict = "✅" if row['p95_ms'] <= P95_TARGET_MS else "❌"
+        print(f"   {verdict} {endpoint}: p95 {row['p95_ms']:.1f} ms (target ≤ {P95_TARGET_MS:.0f} ms)")
+    return summary
+
+
+async def run_load_test(billing_file: Path, base_url: Optional[str], speedup: float,
+                        concurrency: int, limit: Optional[int], latency_ms: float) -> pd.DataFrame:
+    df = pd.read_parquet(billing_file)
+    if limit:
+        df = df[df['comprobante'].isin(df['comprobante'].drop_duplicates().head(limit))]
+    schedule = build_replay_schedule(df, speedup=speedup)
+
+    standin = None
+    if base_url is None:
+        standin = StandInBackend(latency_ms=latency_ms)
+        base_url = await standin.start()
+        print(f"🧪 Using local stand-in backend at {base_url}")
+
+    try:
+        latencies, errors, elapsed = await replay(schedule, base_url, concurrency=concurrency)
+    finally:
+        if standin is not None:
+            await standin.stop()
+    return report_latencies(latencies, errors, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay billing history as order traffic")
+    parser.add_argument('--billing', default=str(PROCESSED_DIR / "billing_data_clean.parquet"))
+    parser.add_argument('--base-url', default=None,
+                        help="Backend API root, e.g. http://localhost:8000/api (default: local stand-in)")
+    parser.add_argument('--speedup', type=float, default=3600.0, help="Seconds of history per wall second")
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--limit', type=int, default=None, help="Replay only the first N invoices")
+    parser.add_argument('--standin-latency-ms', type=float, default=0.0)
+    args = parser.parse_args()
+
+    print("🚀 MOLI PWA ORDER LOAD TEST")
+    print("=" * 50)
+    asyncio.run(run_load_test(Path(args.billing), args.base_url, args.speedup,
+                              args.concurrency, args.limit, args.standin_latency_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Map-Reduce Execution Mode for the Moli PWA data pipeline
+Partitions the cleaned billing data by codigo_molino (or a hash of razon_social),
+computes partial aggregates per shard in a process pool and merges them into
+the same features, matrices and insights that process_data.main writes
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from entity_registry import EntityRegistry
+from fixed_point import FIXED_POINT_COLUMNS, has_fixed_point, to_decimal
+from price_anomalies import drop_flagged
+
+# Grouping key and measures per feature table; partials carry a sum and a non-null count
+FEATURE_SPECS = {
+    'customer_features': ('razon_social', ['monto_ars', 'total_kg', 'precio_por_kg', 'flete_binario']),
+    'product_features': ('producto_limpio', ['monto_ars', 'total_kg', 'precio_por_kg']),
+    'zone_features': ('zona', ['monto_ars', 'total_kg', 'flete_binario']),
+}
+# Output columns in the order MoliDataProcessor.generate_ml_features emits them
+FEATURE_COLUMNS = {
+    'monto_ars': ['sum', 'mean', 'count'],
+    'total_kg': ['sum', 'mean'],
+    'precio_por_kg': ['mean'],
+    'flete_binario': ['mean'],
+}
+MATRIX_SPECS = {
+    'customer_product': ('razon_social', 'producto_limpio'),
+    'customer_zone': ('razon_social', 'zona'),
+}
+# Same matrices keyed by entity registry IDs: (row ID column, col ID column, row kind, col kind)
+ID_MATRIX_SPECS = {
+    'customer_product': ('customer_id', 'product_id', 'customer', 'product'),
+    'customer_zone': ('customer_id', 'zone_id', 'customer', 'zone'),
+}
+
+
+# Billing frame inherited by forked workers, so shards travel as row positions
+_SHARED_BILLING: Optional[pd.DataFrame] = None
+
+
+def partition_billing(df: pd.DataFrame, n_shards: int, by: str = 'codigo_molino') -> List[np.ndarray]:
+    """Split row positions into shards, balancing mills by row count"""
+    if by == 'codigo_molino':
+        sizes = df.groupby('codigo_molino', dropna=False).size().sort_values(ascending=False)
+        # Greedy largest-first bin packing keeps shards close to equal size
+        loads = np.zeros(n_shards, dtype='int64')
+        assignment = {}
+        for mill, size in sizes.items():
+            target = int(loads.argmin())
+            assignment[mill] = target
+            loads[target] += size
+        shard_ids = df['codigo_molino'].map(assignment).fillna(int(loads.argmin())).to_numpy()
+    else:
+        shard_ids = pd.util.hash_pandas_object(df['razon_social'], index=False).to_numpy() % n_shards
+
+    order = np.argsort(shard_ids, kind='stable')
+    bounds = np.searchsorted(shard_ids[order], np.arange(1, n_shards))
+    return [rows for rows in np.split(order, bounds) if len(rows)]
+
+
+def map_partials(shard: pd.DataFrame) -> Dict[str, Any]:
+    """Map step: additive aggregates for one shard"""
+    features_df = drop_flagged(shard)
+
+    # Fixed-point mode sums integer centavos/grams; reduce converts back to decimal
+    fixed = has_fixed_point(shard)
+    money = FIXED_POINT_COLUMNS['monto_ars'][0] if fixed else 'monto_ars'
+    weight = FIXED_POINT_COLUMNS['total_kg'][0] if fixed else 'total_kg'
+
+    partials: Dict[str, Any] = {'fixed_point': fixed}
+    for name, (key, measures) in FEATURE_SPECS.items():
+        grouped = features_df.groupby(key)
+        sums = grouped[measures].sum()
+        counts = grouped[measures].count()
+        partial = sums.add_suffix('__sum').join(counts.add_suffix('__n'))
+        if fixed:
+            exact = [FIXED_POINT_COLUMNS[m][0] for m in measures if m in FIXED_POINT_COLUMNS]
+            partial = partial.join(grouped[exact].sum().add_suffix('__sum'))
+        partials[name] = partial
+
+    for name, (row_key, col_key) in MATRIX_SPECS.items():
+        if 'customer_id' in shard.columns:
+            row_key, col_key = ID_MATRIX_SPECS[name][:2]
+        partials[name] = shard.groupby([row_key, col_key])[money].sum()
+
+    with_freight = shard['flete'] == 'Si'
+    partials['insights'] = {
+        'total_revenue': shard[money].sum(),
+        'total_volume_kg': shard[weight].sum(),
+        'total_transactions': len(shard),
+        'customers': shard.groupby('razon_social')[money].sum(),
+        'products': shard.groupby('producto_limpio')[money].sum(),
+        'zones': shard.groupby('zona')[money].sum(),
+        'monthly': shard.groupby(shard['fecha'].dt.to_period('M'))[money].sum(),
+        'fecha_min': shard['fecha'].min(),
+        'fecha_max': shard['fecha'].max(),
+        'with_freight': shard.loc[with_freight, money].sum(),
+        'without_freight': shard.loc[shard['flete'] == 'No', money].sum(),
+        'freight_rows': int(with_freight.sum()),
+    }
+    return partials
+
+
+def _scales(partials: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Units per decimal unit of the summed money/weight values in these partials"""
+    fixed = bool(partials) and all(p['fixed_point'] for p in partials)
+    return {column: scale if fixed else 1 for column, (_, scale) in FIXED_POINT_COLUMNS.items()}
+
+
+def _map_shard(rows: np.ndarray) -> Dict[str, Any]:
+    return map_partials(_SHARED_BILLING.iloc[rows]) # type: ignore
+
+
+def _sum_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    combined = pd.concat(frames)
+    return combined.groupby(level=list(range(combined.index.nlevels))).sum()
+
+
+def reduce_features(partials: List[Dict[str, Any]]) -> Dict[str, pd.DataFrame]:
+    """Reduce step for the per-entity feature tables"""
+    features = {}
+    scales = _scales(partials)
+    for name, (key, measures) in FEATURE_SPECS.items():
+        totals = _sum_frames([p[name] for p in partials])
+        out = pd.DataFrame(index=totals.index)
+        for measure in measures:
+            total, count = totals[f'{measure}__sum'], totals[f'{measure}__n']
+            if scales.get(measure, 1) != 1:
+                total = to_decimal(totals[f'{FIXED_POINT_COLUMNS[measure][0]}__sum'], scales[measure])
+            for stat in FEATURE_COLUMNS[measure]:
+                if stat == 'sum':
+                    out[f'{measure}_sum'] = total
+                elif stat == 'mean':
+                    out[f'{measure}_mean'] = total / count.where(count > 0)
+                else:
+                    out[f'{measure}_count'] = count
+        features[name] = out.round(2).rename_axis(key).reset_index()
+    return features
+
+
+def reduce_matrices(partials: List[Dict[str, Any]],
+                    registry: Optional[EntityRegistry] = None) -> Dict[str, pd.DataFrame]:
+    """Reduce step for the recommendation matrices"""
+    matrices = {}
+    scale = _scales(partials)['monto_ars']
+    for name in MATRIX_SPECS:
+        totals = to_decimal(pd.concat([p[name] for p in partials]).groupby(level=[0, 1]).sum(), scale)
+        if registry is not None:
+            _, _, row_kind, col_kind = ID_MATRIX_SPECS[name]
+            matrices[name] = registry.interaction_matrix(totals, row_kind, col_kind)
+        else:
+            matrices[name] = totals.unstack(fill_value=0).sort_index().sort_index(axis=1)
+    return matrices
+
+
+def reduce_insights(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Reduce step for the business insights payload"""
+    parts = [p['insights'] for p in partials]
+    scales = _scales(partials)
+    money = scales['monto_ars']
+    merged = {
+        field: to_decimal(pd.concat([part[field] for part in parts]).groupby(level=0).sum(), money)
+        for field in ('customers', 'products', 'zones', 'monthly')
+    }
+    rows = sum(part['total_transactions'] for part in parts)
+
+    return {
+        'overview': {
+            'total_revenue': float(to_decimal(sum(part['total_revenue'] for part in parts), money)),
+            'total_volume_kg': float(to_decimal(sum(part['total_volume_kg'] for part in parts), scales['total_kg'])),
+            'total_transactions': int(rows),
+            'unique_customers': int(len(merged['customers'])),
+            'unique_products': int(len(merged['products'])),
+            'date_range': {
+                'start': min(part['fecha_min'] for part in parts).strftime('%Y-%m-%d'),
+                'end': max(part['fecha_max'] for part in parts).strftime('%Y-%m-%d'),
+            },
+        },
+        'top_customers': merged['customers'].nlargest(10).to_dict(),
+        'top_products': merged['products'].nlargest(10).to_dict(),
+        'top_zones': merged['zones'].nlargest(10).to_dict(),
+        'monthly_trends': {str(k): float(v) for k, v in merged['monthly'].sort_index().items()},
+        'freight_analysis': {
+            'with_freight': float(to_decimal(sum(part['with_freight'] for part in parts), money)),
+            'without_freight': float(to_decimal(sum(part['without_freight'] for part in parts), money)),
+            'freight_percentage': float(sum(part['freight_rows'] for part in parts) / rows * 100) if rows else 0.0,
+        },
+    }
+
+
+def run_mapreduce(df: pd.DataFrame, workers: Optional[int] = None, by: str = 'codigo_molino',
+                  shards_per_worker: int = 2, registry: Optional[EntityRegistry] = None) -> Dict[str, Any]:
+    """Compute features, matrices and insights with a process pool"""
+    workers = workers or os.cpu_count() or 1
+    shards = partition_billing(df, workers * shards_per_worker, by=by)
+    print(f"\n🧩 Map-reduce over {len(shards)} shards by {by} with {workers} workers...")
+
+    global _SHARED_BILLING
+    _SHARED_BILLING = df
+    try:
+        if workers == 1 or 'fork' not in multiprocessing.get_all_start_methods():
+            partials = [_map_shard(rows) for rows in shards]
+        else:
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                partials = list(pool.map(_map_shard, shards))
+    finally:
+        _SHARED_BILLING = None
+
+    result = {
+        'ml_features': reduce_features(partials),
+        'rec_matrices': reduce_matrices(partials, registry),
+        'insights': reduce_insights(partials),
+    }
+    print(f"✅ Merged {len(partials)} partials")
+    return result
+
+
+def benchmark_scaling(n_rows: int = 4_000_000, n_mills: int = 64, max_workers: Optional[int] = None,
+                      seed: int = 0) -> pd.DataFrame:
+    """Wall time of the map-reduce mode for 1..max_workers processes"""
+    max_workers = max_workers or os.cpu_count() or 1
+    rng = np.random.default_rng(seed)
+    kg = rng.choice([25.0, 50.0, 500.0, 1000.0], n_rows)
+    df = pd.DataFrame({
+        'fecha': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 730, n_rows), unit='D'),
+        'codigo_molino': rng.integers(0, n_mills, n_rows).astype('float64'),
+        'razon_social': pd.Series(rng.integers(0, 20_000, n_rows)).map('PANADERIA {:05d}'.format),
+        'zona': pd.Series(rng.integers(0, 40, n_rows)).map('ZONA {:02d}'.format),
+        'producto_limpio': pd.Series(rng.integers(0, 30, n_rows)).map('HARINA {:02d}'.format),
+        'flete': rng.choice(['Si', 'No'], n_rows),
+        'total_kg': kg,
+        'monto_ars': kg * rng.normal(500, 30, n_rows),
+    })
+    df['precio_por_kg'] = df['monto_ars'] / df['total_kg']
+    df['flete_binario'] = (df['flete'] == 'Si').astype(int)
+
+    print(f"⏱️  Map-reduce scaling benchmark on {n_rows:,} rows")
+    rows = []
+    workers = 1
+    while workers <= max_workers:
+        started = time.perf_counter()
+        run_mapreduce(df, workers=workers)
+        elapsed = time.perf_counter() - started
+        rows.append({'workers': workers, 'seconds': elapsed})
+        workers *= 2
+
+    curve = pd.DataFrame(rows)
+    curve['speedup'] = curve['seconds'].iloc[0] / curve['seconds']
+    curve['efficiency'] = curve['speedup'] / curve['workers']
+
+    print("\n📊 SCALING CURVE")
+    print(curve.round(2).to_string(index=False))
+    return curve
+
+
+if __name__ == "__main__":
+    benchmark_scaling()
@@ -0,0 +1,423 @@
+"""
+Mill Allocation for new Moli PWA bakery orders via min-cost flow
+Routes pending orders to mills under daily capacity using a zone × mill cost
+table derived from billing history; orders collapse to zona × product supply
+nodes, so tens of thousands of orders become a small sparse flow network that
+is re-solved warm from the previous flows as orders change
+"""
+
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from paths import PROCESSED_DIR
+from price_anomalies import drop_flagged, read_clean_billing
+
+COMMODITY_COLUMNS = ['zona', 'producto_limpio']
+
+# Daily capacity per mill: this quantile of its historical daily kg
+CAPACITY_QUANTILE = 0.95
+# Never-served mill × zone pairs pay the mill's median freight premium times this
+UNSERVED_ZONE_FACTOR = 1.5
+# Cost per kg left unassigned (overflow when capacity runs out); dwarfs any real cost
+UNASSIGNED_COST = 1e7
+UNASSIGNED = 'SIN ASIGNAR'
+
+# Flow (kg) and cost (ARS/kg path sums next to UNASSIGNED_COST) tolerances
+EPSILON = 1e-9
+COST_EPSILON = 1e-6
+
+
+def zone_cost_table(df: pd.DataFrame) -> pd.DataFrame:
+    """Delivered cost per kg for every (zona, product) × mill from billing history
+
+    Cost = the mill's ex-works price for the product (median flete=No price per
+    kg) + its freight premium to the zone (median flete=Si minus flete=No price
+    per kg there). Products a mill never billed are left out (NaN); price-flagged
+    rows are left out of the medians
+    """
+    df = drop_flagged(df)
+    any_price = df.groupby(['producto_limpio', 'codigo_molino'])['precio_por_kg'].median()
+    ex_works = df[df['flete'] == 'No'].groupby(['producto_limpio', 'codigo_molino'])['precio_por_kg'].median()
+    ex_works = ex_works.reindex(any_price.index).fillna(any_price)
+    by_zone = df.groupby(['codigo_molino', 'zona', 'flete'])['precio_por_kg'].median().unstack()
+    zone_premium = (by_zone.get('Si') - by_zone.get('No')).clip(lower=0) if {'Si', 'No'} <= set(by_zone) \
+        else pd.Series(0.0, index=by_zone.index)
+    mill_premium = zone_premium.groupby(level='codigo_molino').median().fillna(0.0)
+
+    mills = np.sort(df['codigo_molino'].dropna().unique())
+    zones = np.sort(df['zona'].dropna().unique())
+    freight = (zone_premium.unstack('codigo_molino').reindex(index=zones, columns=mills)
+               .fillna(mill_premium.reindex(mills) * UNSERVED_ZONE_FACTOR))
+
+    commodities = (df[COMMODITY_COLUMNS].dropna().drop_duplicates()
+                   .sort_values(COMMODITY_COLUMNS, ignore_index=True))
+    product_price = ex_works.unstack('codigo_molino').reindex(columns=mills)
+    costs = (product_price.reindex(commodities['producto_limpio']).to_numpy()
+             + freight.reindex(commodities['zona']).to_numpy())
+    return pd.DataFrame(costs, index=pd.MultiIndex.from_frame(commodities), columns=pd.Index(mills, name='codigo_molino'))
+
+
+def mill_capacities(df: pd.DataFrame, quantile: float = CAPACITY_QUANTILE) -> pd.Series:
+    """Daily kg capacity per mill from its busiest historical days
+
+    Credit notes (non-positive kg) are left out so returns do not shrink a day's
+    output, and so are price-flagged rows
+    """
+    df = drop_flagged(df)
+    df = df[df['total_kg'] > 0]
+    daily = df.groupby(['codigo_molino', df['fecha'].dt.normalize()])['total_kg'].sum()
+    return daily.groupby(level='codigo_molino').quantile(quantile).rename('capacity_kg')
+
+
+class FlowState:
+    """Transportation network: supply (commodity) nodes → mills (+ unassigned) → sink
+
+    flow[c, m] is kg of commodity c served by mill m; the last column is the
+    unassigned overflow with unlimited capacity, which keeps every instance feasible
+    """
+
+    def __init__(self, cost: np.ndarray, capacity: np.ndarray):
+        n_commodities = cost.shape[0]
+        self.cost = np.column_stack([cost, np.full(n_commodities, UNASSIGNED_COST)])
+        self.allowed = ~np.isnan(self.cost)
+        self.weight = np.where(self.allowed, self.cost, np.inf)
+        self.capacity = np.r_[capacity, np.inf]
+        self.flow = np.zeros_like(self.cost)
+        self.supply = np.zeros(n_commodities)
+        # Mill potentials of the last optimum: the dual warm start of the next solve
+        self.prices = np.zeros(len(self.capacity))
+
+    @property
+    def excess(self) -> np.ndarray:
+        return self.supply - self.flow.sum(axis=1)
+
+    def _bellman_ford(self, from_excess: bool, rounds: Optional[int] = None):
+        """Shortest distances on the residual network (Jacobi rounds, vectorized)
+
+        from_excess: distances from commodities with unrouted supply; otherwise
+        from a virtual root at every node, where a change after n rounds
+        exposes a negative cycle. Returns distances, predecessors and the nodes
+        still changing in the last round (None once settled)
+        """
+        n_c, n_m = self.flow.shape
+        load = self.flow.sum(axis=0)
+        has_flow = self.flow > EPSILON
+        free = self.capacity - load > EPSILON
+        loaded = load > EPSILON
+
+        dist_c = np.where(self.excess > EPSILON, 0.0, np.inf) if from_excess else np.zeros(n_c)
+        dist_m = np.full(n_m, np.inf) if from_excess else np.zeros(n_m)
+        dist_t = np.inf if from_excess else 0.0
+        pred_c = np.full(n_c, -1)        # mill reached backwards from, -1 = root
+        pred_m = np.full(n_m, -2)        # commodity reached forwards from, -1 = sink, -2 = root
+        pred_t = -1                      # mill
+
+        back_weight = np.where(has_flow, -self.weight, np.inf)
+        changed_c = changed_m = np.zeros(0, dtype=int)
+        # Residual paths alternate commodities and mills, so a simple path has at
+        # most 2 arcs per mill plus the sink arcs: that many rounds settle every distance
+        for _ in range(rounds or 2 * n_m + 4):
+            via_c = dist_c[:, None] + self.weight
+            best_c = np.argmin(via_c, axis=0)
+            new_m = via_c[best_c, np.arange(n_m)]
+            # Shortest paths to the sink never leave it again; cycles may pass through it
+            via_t = np.where(loaded & (not from_excess), dist_t, np.inf)
+            from_t = via_t < new_m
+            new_m = np.where(from_t, via_t, new_m)
+
+            via_m = dist_m[None, :] + back_weight
+            best_m = np.argmin(via_m, axis=1)
+            new_c = via_m[np.arange(n_c), best_m]
+
+            sink_candidates = np.where(free, dist_m, np.inf)
+            best_t = int(np.argmin(sink_candidates))
+
+            improve_m = new_m < dist_m - COST_EPSILON
+            improve_c = new_c < dist_c - COST_EPSILON
+            improve_t = sink_candidates[best_t] < dist_t - COST_EPSILON
+            if not (improve_m.any() or improve_c.any() or improve_t):
+                return dist_c, dist_m, dist_t, pred_c, pred_m, pred_t, None
+
+            dist_m = np.where(improve_m, new_m, dist_m)
+            pred_m = np.where(improve_m, np.where(from_t, -1, best_c), pred_m)
+            dist_c = np.where(improve_c, new_c, dist_c)
+            pred_c = np.where(improve_c, best_m, pred_c)
+            if improve_t:
+                dist_t, pred_t = float(sink_candidates[best_t]), best_t
+            changed_c, changed_m = np.flatnonzero(improve_c), np.flatnonzero(improve_m)
+        # Still relaxing past the longest simple path: a negative cycle feeds the changed nodes
+        changed = [('c', int(c)) for c in changed_c] + [('m', int(m)) for m in changed_m] + [('t', 0)]
+        return dist_c, dist_m, dist_t, pred_c, pred_m, pred_t, changed
+
+    @staticmethod
+    def _step(node: Tuple[str, int], pred_c, pred_m, pred_t) -> Optional[Tuple[str, int]]:
+        """Predecessor of a node, None at the root"""
+        kind, i = node
+        if kind == 'c':
+            return ('m', int(pred_c[i])) if pred_c[i] >= 0 else None
+        if kind == 't':
+            return ('m', int(pred_t)) if pred_t >= 0 else None
+        return ('t', 0) if pred_m[i] == -1 else ('c', int(pred_m[i])) if pred_m[i] >= 0 else None
+
+    def _path_cost(self, path: List[Tuple[Tuple[str, int], Tuple[str, int]]]) -> float:
+        return sum(self.weight[i, j] if kind == 'c' else -self.weight[j, i] if head_kind == 'c' else 0.0
+                   for (kind, i), (head_kind, j) in path)
+
+    def _push(self, path: List[Tuple[Tuple[str, int], Tuple[str, int]]], limit: float) -> float:
+        """Send the bottleneck amount along residual arcs (tail, head)"""
+        load = self.flow.sum(axis=0)
+        amount = limit
+        for (kind, i), (head_kind, j) in path:
+            if kind == 'm' and head_kind == 'c':
+                amount = min(amount, self.flow[j, i])
+            elif kind == 'm' and head_kind == 't':
+                amount = min(amount, self.capacity[i] - load[i])
+            elif kind == 't':
+                amount = min(amount, load[j])
+        for (kind, i), (head_kind, j) in path:
+            if kind == 'c':
+                self.flow[i, j] += amount
+            elif head_kind == 'c':
+                self.flow[j, i] -= amount
+        return amount
+
+    def cancel_negative_cycles(self) -> int:
+        """Drop cost until the residual network has no negative cycle (optimal for its value)"""
+        cancelled = 0
+        n_nodes = sum(self.flow.shape) + 1
+        while True:
+            cycle = None
+            for rounds in (None, n_nodes + 1):
+                *_, pred_c, pred_m, pred_t, changed = self._bellman_ford(from_excess=False, rounds=rounds)
+                if changed is None:
+                    return cancelled
+                cycle = next(filter(None, (self._cycle_from(node, n_nodes, pred_c, pred_m, pred_t)
+                                           for node in changed)), None)
+                if cycle is not None:
+                    break
+            if cycle is None or self._path_cost(cycle) > -COST_EPSILON or self._push(cycle, np.inf) <= EPSILON:
+                return cancelled
+            cancelled += 1
+
+    def _cycle_from(self, node, n_nodes: int, pred_c, pred_m, pred_t):
+        """Predecessor cycle reached from node (as residual arcs), None if the walk hits the root"""
+        for _ in range(n_nodes):
+            node = node and self._step(node, pred_c, pred_m, pred_t)
+        if node is None:
+            return None
+        cycle, head = [], node
+        while True:
+            tail = self._step(head, pred_c, pred_m, pred_t)
+            if tail is None:
+                return None
+            cycle.append((tail, head))
+            head = tail
+            if head == node:
+                return cycle
+
+    def augment(self) -> int:
+        """Successive shortest paths from unrouted supply to the sink"""
+        augmentations = 0
+        while self.excess.max(initial=0.0) > EPSILON:
+            *_, pred_c, pred_m, pred_t, _ = self._bellman_ford(from_excess=True)
+            path, head = [], ('t', 0)
+            while True:
+                tail = self._step(head, pred_c, pred_m, pred_t)
+                if tail is None:
+                    raise RuntimeError("Unrouted supply with no path to the sink")
+                path.append((tail, head))
+                if tail[0] == 'c' and pred_c[tail[1]] == -1:
+                    break
+                head = tail
+            origin = path[-1][0][1]
+            self._push(path, self.excess[origin])
+            augmentations += 1
+        return augmentations
+
+    def greedy_start(self):
+        """Every commodity at its cheapest mill under the current prices, trimmed to capacity
+
+        With zero prices no residual cycle can be negative (each flow sits on its
+        row minimum); with the previous solve's prices the start is close to the
+        new optimum and only the few cycles left by the changes need cancelling
+        """
+        cheapest = np.argmin(self.weight + self.prices, axis=1)
+        self.flow[:] = 0.0
+        self.flow[np.arange(len(self.supply)), cheapest] = self.supply
+        self.repair()
+
+    def update_prices(self):
+        """Potentials of the current flow; reduced costs w[c, m] + price[m] are minimal where flow runs"""
+        _, dist_m, *_ = self._bellman_ford(from_excess=False)
+        self.prices = -dist_m
+
+    def repair(self):
+        """Trim flows to the capacities, most expensive commodities first"""
+        over_capacity = np.maximum(self.flow.sum(axis=0) - self.capacity, 0.0)
+        for m in np.flatnonzero(over_capacity > EPSILON):
+            for c in np.argsort(-np.where(self.flow[:, m] > 0, self.weight[:, m], -np.inf)):
+                take = min(over_capacity[m], self.flow[c, m])
+                self.flow[c, m] -= take
+                over_capacity[m] -= take
+                if over_capacity[m] <= EPSILON:
+                    break
+
+
+class MillAllocator:
+    """Allocate orders to mills; keeps the last mill prices to warm-start the next solve"""
+
+    def __init__(self, costs: pd.DataFrame, capacities: pd.Series):
+        self.costs = costs
+        self.mills = costs.columns
+        self.capacities = capacities.reindex(self.mills).fillna(0.0)
+        self.state: Optional[FlowState] = None
+
+    def _commodities(self, orders: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Cost row per order (-1 without a zone, a product or a cost row) and kg per cost row"""
+        codes = self.costs.index.get_indexer(pd.MultiIndex.from_frame(orders[COMMODITY_COLUMNS]))
+        codes = np.where(orders[COMMODITY_COLUMNS].notna().all(axis=1).to_numpy(), codes, -1)
+        known = codes >= 0
+        supply = np.bincount(codes[known], weights=orders['total_kg'].to_numpy(dtype='float64')[known],
+                             minlength=len(self.costs))
+        return codes, supply
+
+    def solve(self, orders: pd.DataFrame, warm_start: bool = True) -> Dict[str, object]:
+        """Optimal kg per order × mill; an order is split only where a mill's flow runs out
+
+        Only lines with positive kg are demand: credit notes need no mill and
+        are left out of the assignments. Orders without a zone or product, or
+        with a pair the cost table does not know, are assigned to UNASSIGNED
+        whole and listed in 'unroutable'
+        """
+        started = time.perf_counter()
+        orders = orders[orders['total_kg'] > 0]
+        codes, supply = self._commodities(orders)
+        unroutable = orders[codes < 0]
+        orders, codes = orders[codes >= 0], codes[codes >= 0]
+        cold = self.state is None or not warm_start
+        if cold:
+            self.state = FlowState(self.costs.to_numpy(dtype='float64'), self.capacities.to_numpy(dtype='float64'))
+        state = self.state
+        state.supply = supply
+        state.capacity[:-1] = self.capacities.to_numpy(dtype='float64')
+        state.greedy_start()
+        cancelled = state.cancel_negative_cycles()
+        augmentations = state.augment()
+        state.update_prices()
+        solve_seconds = time.perf_counter() - started
+
+        assignments = self._assign(orders, codes, state.flow)
+        if len(unroutable):
+            whole = unroutable.reset_index().rename(columns={'index': 'order'}).assign(
+                mill=UNASSIGNED, assigned_kg=unroutable['total_kg'].to_numpy(dtype='float64').round(3))
+            assignments = pd.concat([assignments, whole], ignore_index=True)
+        load = state.flow.sum(axis=0)
+        load[-1] += unroutable['total_kg'].sum()
+        mills = pd.DataFrame({
+            'codigo_molino': list(self.mills) + [UNASSIGNED],
+            'capacity_kg': state.capacity,
+            'assigned_kg': load.round(3),
+            'utilization': np.where(np.isfinite(state.capacity), load / np.maximum(state.capacity, EPSILON), np.nan),
+        })
+        return {
+            'assignments': assignments,
+            'mills': mills,
+            'total_cost': float(np.nansum(state.flow[:, :-1] * state.cost[:, :-1])),
+            'unassigned_kg': float(load[-1]),
+            'unroutable': unroutable.assign(reason=np.select(
+                [unroutable['zona'].isna(), unroutable['producto_limpio'].isna()],
+                ['missing_zone', 'missing_product'], default='unknown_commodity')),
+            'augmentations': augmentations,
+            'cycles_cancelled': cancelled,
+            'solve_seconds': solve_seconds,
+        }
+
+    def _assign(self, orders: pd.DataFrame, codes: np.ndarray, flow: np.ndarray) -> pd.DataFrame:
+        """Cut orders (laid end to end per commodity) at the commodity's mill flow boundaries"""
+        order = np.argsort(codes, kind='stable')
+        kg = orders['total_kg'].to_numpy(dtype='float64')[order]
+        order_end = np.cumsum(kg)
+        flow_end = np.cumsum(flow.ravel())
+        # Both partitions cover [0, total kg); pieces lie between consecutive breakpoints
+        cuts = np.unique(np.r_[0.0, order_end, flow_end])
+        cuts = cuts[cuts <= order_end[-1] + EPSILON] if len(order_end) else cuts[:1]
+        piece_start, piece_kg = cuts[:-1], np.diff(cuts)
+        keep = piece_kg > 1e-6
+        piece_start, piece_kg = piece_start[keep], piece_kg[keep]
+        owner = np.searchsorted(order_end, piece_start + EPSILON, 'left')
+        cell = np.minimum(np.searchsorted(flow_end, piece_start + EPSILON, 'left'), flow.size - 1)
+        mill_labels = np.asarray(list(self.mills) + [UNASSIGNED], dtype=object)
+
+        assignments = orders.iloc[order[owner]].reset_index()
+        assignments = assignments.rename(columns={'index': 'order'}).assign(
+            mill=mill_labels[cell % flow.shape[1]],
+            assigned_kg=piece_kg.round(3),
+        )
+        return assignments
+
+
+def benchmark_allocation(processed_dir: Path = PROCESSED_DIR, n_orders: int = 30_000,
+                         churn: float = 0.05, capacity_ratio: float = 0.9, seed: int = 0) -> Dict[str, float]:
+    """Cold solve of n_orders resampled lines, then warm vs cold re-solve after churn"""
+    billing = read_clean_billing(processed_dir)
+    costs, capacities = zone_cost_table(billing), mill_capacities(billing)
+    rng = np.random.default_rng(seed)
+
+    def sample(n: int) -> pd.DataFrame:
+        return billing.iloc[rng.integers(0, len(billing), n)][COMMODITY_COLUMNS + ['razon_social', 'total_kg']]
+
+    orders = sample(n_orders).reset_index(drop=True)
+    # Tight capacities make the flow fight for the cheap mills
+    capacities = capacities / capacities.sum() * orders['total_kg'].sum() * capacity_ratio
+    print(f"⏱️  Allocation benchmark: {n_orders:,} orders, {len(costs):,} zona × product nodes, "
+          f"{len(capacities)} mills")
+
+    allocator = MillAllocator(costs, capacities)
+    cold = allocator.solve(orders)
+
+    n_churn = int(n_orders * churn)
+    keep = rng.permutation(n_orders)[n_churn:]
+    changed = pd.concat([orders.iloc[keep], sample(n_churn)], ignore_index=True)
+    warm = allocator.solve(changed)
+    recold = MillAllocator(costs, capacities).solve(changed, warm_start=False)
+    if not np.isclose(warm['total_cost'], recold['total_cost'], rtol=1e-9):
+        raise AssertionError(f"Warm and cold re-solves differ: {warm['total_cost']} vs {recold['total_cost']}")
+
+    print(f"\n📊 ALLOCATION BENCHMARK ({n_orders:,} orders)")
+    print(f"   • Cold solve: {cold['solve_seconds'] * 1000:.0f} ms ({cold['augmentations']} augmentations), "
+          f"{cold['unassigned_kg']:,.0f} kg unassigned")
+    print(f"   • Re-solve after {churn:.0%} churn: warm {warm['solve_seconds'] * 1000:.0f} ms "
+          f"({warm['augmentations']} augmentations, {warm['cycles_cancelled']} cycles cancelled), "
+          f"cold {recold['solve_seconds'] * 1000:.0f} ms")
+    print(f"   • Split orders: {warm['assignments']['order'].duplicated().sum():,}")
+    return {'cold_s': cold['solve_seconds'], 'warm_s': warm['solve_seconds'], 'recold_s': recold['solve_seconds']}
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Allocate one billing day's orders to mills")
+    parser.add_argument('--date', default=None, help="Billing day to replay (default: last day in the data)")
+    parser.add_argument('--capacity-scale', type=float, default=1.0, help="Multiply historical mill capacities")
+    parser.add_argument('--processed-dir', type=Path, default=PROCESSED_DIR)
+    args = parser.parse_args(argv)
+
+    billing = read_clean_billing(args.processed_dir)
+    day = pd.Timestamp(args.date) if args.date else billing['fecha'].max().normalize()
+    orders = billing[billing['fecha'].dt.normalize() == day][['comprobante'] + COMMODITY_COLUMNS
+                                                            + ['razon_social', 'codigo_molino', 'total_kg']]
+    allocator = MillAllocator(zone_cost_table(billing), mill_capacities(billing) * args.capacity_scale)
+    result = allocator.solve(orders.rename(columns={'codigo_molino': 'codigo_molino_historico'}))
+
+    print(f"🏭 {day.date()}: {len(orders):,} order lines, cost ${result['total_cost']:,.2f} "
+          f"in {result['solve_seconds'] * 1000:.0f} ms")
+    if len(result['unroutable']): # type: ignore
+        print(f"   ⚠️  {len(result['unroutable']):,} order lines without a known zona × product") # type: ignore
+    print(result['mills'].to_string(index=False)) # type: ignore
+
+
+if __name__ == "__main__":
+    main()
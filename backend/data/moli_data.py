@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+moli-data: single entry point for the Moli PWA data pipeline
+Heavy imports (pandas, numpy, pyarrow) are deferred to the subcommands that
+need them, so --help and status stay cheap for cron and health checks
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from paths import RAW_DIR, PROCESSED_DIR
+
+# Artifacts written by process_data.main, checked by `status`
+EXPECTED_ARTIFACTS = [
+    'billing_data_clean.parquet',
+    'geographic_data.parquet',
+    'customer_features.parquet',
+    'product_features.parquet',
+    'zone_features.parquet',
+    'customer_product_matrix.parquet',
+    'customer_zone_matrix.parquet',
+    'cohort_retention.parquet',
+    'business_insights.json',
+]
+
+BENCHMARKS = ['rfm', 'mapreduce', 'resolution', 'excel', 'load', 'store', 'cohort', 'basket', 'freight', 'reorder', 'bitmap', 'pit', 'scenario', 'allocation', 'realtime', 'bundles']
+
+
+def cmd_process(args: argparse.Namespace) -> int:
+    if args.quick:
+        from quick_process import process_billing_only
+        process_billing_only(args.raw_dir, args.out_dir)
+    else:
+        from process_data import main as process_main
+        process_main(workers=args.workers, data_path=str(args.raw_dir),
+                     output_dir=str(args.out_dir), engine=args.engine,
+                     compression=args.compression, compression_level=args.compression_level,
+                     fixed_point=args.fixed_point)
+    return 0
+
+
+def cmd_analyze(args: argparse.Namespace) -> int:
+    if args.detailed:
+        from detailed_analysis import analyze_excel_files
+    else:
+        from analyze_data import analyze_excel_files
+    analyze_excel_files(args.raw_dir)
+    return 0
+
+
+def cmd_profile(args: argparse.Namespace) -> int:
+    import cProfile
+    import pstats
+
+    from process_data import main as process_main
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    process_main(workers=1, data_path=str(args.raw_dir), output_dir=str(args.out_dir), engine=args.engine)
+    profiler.disable()
+
+    if args.output:
+        profiler.dump_stats(args.output)
+        print(f"\n💾 Profile written to {args.output}")
+    print("\n⏱️  TOP FUNCTIONS")
+    pstats.Stats(profiler).sort_stats(args.sort).print_stats(args.top)
+    return 0
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    import pandas as pd
+    from delta_export import LocalDirectorySink, export_delta
+
+    billing = pd.read_parquet(Path(args.out_dir) / 'billing_data_clean.parquet')
+    export_delta(billing, LocalDirectorySink(args.sink_dir or Path(args.out_dir) / 'warehouse_sink'))
+    return 0
+
+
+def cmd_simulate(args: argparse.Namespace) -> int:
+    from scenario_simulator import main as simulate_main
+
+    argv = ['--processed-dir', str(args.out_dir), '--scenarios', str(args.scenarios), '--seed', str(args.seed)]
+    for change in args.price or []:
+        argv += ['--price', change]
+    for change in args.freight or []:
+        argv += ['--freight', change]
+    simulate_main(argv)
+    return 0
+
+
+def cmd_status(args: argparse.Namespace) -> int:
+    out_dir = Path(args.out_dir)
+    artifacts = {}
+    for name in EXPECTED_ARTIFACTS:
+        path = out_dir / name
+        if path.exists():
+            stat = path.stat()
+            artifacts[name] = {
+                'bytes': stat.st_size,
+                'age_hours': round((time.time() - stat.st_mtime) / 3600, 2),
+            }
+        else:
+            artifacts[name] = None
+
+    overview = None
+    insights_path = out_dir / 'business_insights.json'
+    if insights_path.exists():
+        with open(insights_path) as f:
+            overview = json.load(f).get('overview')
+
+    shm_pointer = Path(args.shm_root) / 'CURRENT'
+    status = {
+        'processed_dir': str(out_dir),
+        'ok': all(artifacts.values()),
+        'artifacts': artifacts,
+        'overview': overview,
+        'shared_memory_version': shm_pointer.read_text().strip() if shm_pointer.exists() else None,
+    }
+
+    if args.json:
+        print(json.dumps(status, separators=(',', ':'), ensure_ascii=False))
+    else:
+        print(f"{'✅' if status['ok'] else '❌'} {out_dir}")
+        for name, info in artifacts.items():
+            if info is None:
+                print(f"   ❌ {name}: missing")
+            else:
+                print(f"   • {name}: {info['bytes']:,} bytes, {info['age_hours']}h old")
+        if overview:
+            print(f"   💰 Revenue: ${overview['total_revenue']:,.2f} · "
+                  f"{overview['total_transactions']:,} transactions · "
+                  f"{overview['date_range']['start']} → {overview['date_range']['end']}")
+        if status['shared_memory_version']:
+            print(f"   📤 Shared-memory version: {status['shared_memory_version']}")
+    return 0 if status['ok'] else 1
+
+
+def cmd_bench(args: argparse.Namespace) -> int:
+    if args.name == 'rfm':
+        from rfm_segmentation import benchmark_rfm
+        benchmark_rfm()
+    elif args.name == 'mapreduce':
+        from mapreduce_pipeline import benchmark_scaling
+        benchmark_scaling(max_workers=args.workers)
+    elif args.name == 'resolution':
+        from entity_resolution import benchmark_resolution
+        benchmark_resolution()
+    elif args.name == 'excel':
+        from excel_readers import benchmark_engines
+        benchmark_engines(sorted(Path(args.raw_dir).glob('*.xlsx')), header=2)
+    elif args.name == 'load':
+        import asyncio
+        from load_generator import run_load_test
+        asyncio.run(run_load_test(Path(args.out_dir) / 'billing_data_clean.parquet', None,
+                                  speedup=3600.0, concurrency=32, limit=None, latency_ms=0.0))
+    elif args.name == 'store':
+        from feature_store import benchmark_lookups
+        benchmark_lookups(Path(args.out_dir) / 'feature_store')
+    elif args.name == 'cohort':
+        from cohort_analysis import benchmark_cohorts
+        benchmark_cohorts()
+    elif args.name == 'basket':
+        from basket_analysis import benchmark_baskets
+        benchmark_baskets()
+    elif args.name == 'freight':
+        from freight_routing import benchmark_freight
+        benchmark_freight(Path(args.out_dir))
+    elif args.name == 'reorder':
+        from reorder_prediction import benchmark_reorders
+        benchmark_reorders()
+    elif args.name == 'bitmap':
+        from bitmap_store import benchmark_bitmap_queries
+        benchmark_bitmap_queries(Path(args.out_dir))
+    elif args.name == 'pit':
+        from pit_features import benchmark_pit_features
+        benchmark_pit_features()
+    elif args.name == 'scenario':
+        from scenario_simulator import benchmark_scenarios
+        benchmark_scenarios(Path(args.out_dir))
+    elif args.name == 'allocation':
+        from mill_allocation import benchmark_allocation
+        benchmark_allocation(Path(args.out_dir))
+    elif args.name == 'realtime':
+        from realtime_kpis import benchmark_realtime_kpis
+        benchmark_realtime_kpis(Path(args.out_dir))
+    elif args.name == 'bundles':
+        from recommendation_bundles import benchmark_bundles
+        benchmark_bundles()
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='moli-data', description="Moli PWA data pipeline")
+    parser.add_argument('--raw-dir', type=Path, default=RAW_DIR,
+                        help="Raw Excel directory (env MOLI_RAW_DIR)")
+    parser.add_argument('--out-dir', type=Path, default=PROCESSED_DIR,
+                        help="Processed output directory (env MOLI_PROCESSED_DIR)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    process = subparsers.add_parser('process', help="Run the processing pipeline")
+    process.add_argument('--workers', type=int, default=1, help="> 1 enables map-reduce mode")
+    process.add_argument('--engine', default='auto', help="Excel engine (auto, calamine, openpyxl_readonly, openpyxl)")
+    process.add_argument('--compression', default='zstd',
+                         choices=['zstd', 'snappy', 'lz4', 'gzip', 'brotli', 'none'], help="Parquet codec")
+    process.add_argument('--compression-level', type=int, default=None, help="Codec level (zstd 1-22, gzip 1-9...)")
+    process.add_argument('--fixed-point', action='store_true',
+                         help="Aggregate money/weight as exact int64 centavos and grams")
+    process.add_argument('--quick', action='store_true', help="Billing data and insights only")
+    process.set_defaults(func=cmd_process)
+
+    analyze = subparsers.add_parser('analyze', help="Print a structure report of the raw Excel files")
+    analyze.add_argument('--detailed', action='store_true', help="Inspect raw header rows of every file")
+    analyze.set_defaults(func=cmd_analyze)
+
+    profile = subparsers.add_parser('profile', help="Run the pipeline under cProfile")
+    profile.add_argument('--engine', default='auto')
+    profile.add_argument('--sort', default='cumulative')
+    profile.add_argument('--top', type=int, default=25)
+    profile.add_argument('--output', default=None, help="Also write raw stats to this file")
+    profile.set_defaults(func=cmd_profile)
+
+    export = subparsers.add_parser('export', help="Ship billing changes since the last export to the warehouse sink")
+    export.add_argument('--sink-dir', type=Path, default=None, help="Local sink directory (default <out-dir>/warehouse_sink)")
+    export.set_defaults(func=cmd_export)
+
+    simulate = subparsers.add_parser('simulate', help="Monte Carlo price/freight what-if per mill")
+    simulate.add_argument('--price', action='append', metavar='PRODUCT=PCT', help="e.g. 'HARINA 000=15' or '*=15'")
+    simulate.add_argument('--freight', action='append', metavar='ZONE=PCT', help="e.g. 'SUR=10'")
+    simulate.add_argument('--scenarios', type=int, default=10_000)
+    simulate.add_argument('--seed', type=int, default=0)
+    simulate.set_defaults(func=cmd_simulate)
+
+    status = subparsers.add_parser('status', help="Check processed artifacts (exit 1 if incomplete)")
+    status.add_argument('--json', action='store_true')
+    status.add_argument('--shm-root', default='/dev/shm/moli')
+    status.set_defaults(func=cmd_status)
+
+    bench = subparsers.add_parser('bench', help="Run a pipeline benchmark")
+    bench.add_argument('name', choices=BENCHMARKS)
+    bench.add_argument('--workers', type=int, default=os.cpu_count())
+    bench.set_defaults(func=cmd_bench)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,11 @@
+"""
+Data directory configuration for the Moli PWA data pipeline
+Override with MOLI_RAW_DIR / MOLI_PROCESSED_DIR; kept stdlib-only so it is
+cheap to import from the CLI
+"""
+
+import os
+from pathlib import Path
+
+RAW_DIR = Path(os.environ.get("MOLI_RAW_DIR", "/home/sky/Projects/Moli-PWA/data/raw"))
+PROCESSED_DIR = Path(os.environ.get("MOLI_PROCESSED_DIR", "/home/sky/Projects/Moli-PWA/data/processed"))
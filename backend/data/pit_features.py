@@ -0,0 +1,190 @@
+"""
+Point-in-Time Customer Features for Moli PWA training sets
+Trailing 30/90/365-day revenue, kg, order count and freight share per customer
+at every order date, from sorted cumulative sums with searchsorted window
+bounds; windows end the day before the order, so no row sees its own future
+"""
+
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from export_stage import DEFAULT_CODEC, write_parquet
+from fixed_point import measure, scale_of, to_decimal
+
+WINDOWS_DAYS = [30, 90, 365]
+
+# Order events per written part; parts split on customer boundaries
+CHUNK_ROWS = 250_000
+
+INVOICE_COLUMNS = ['codigo_molino', 'comprobante']
+
+
+def order_events(df: pd.DataFrame) -> pd.DataFrame:
+    """One row per customer × order day with revenue, kg, orders and freight orders
+
+    Revenue and kg stay integer in fixed-point mode (see scale_of); orders are
+    distinct invoices of the customer that day, freight orders those billed
+    with flete=Si
+    """
+    invoice_keys = [df[c] for c in INVOICE_COLUMNS + ['razon_social']] + [df['fecha'].dt.normalize()]
+    invoice = df.groupby(invoice_keys, sort=False, dropna=False).ngroup().to_numpy()
+    n_invoices = int(invoice.max()) + 1 if len(df) else 0
+    first_line = np.full(n_invoices, len(df), dtype='int64')
+    np.minimum.at(first_line, invoice, np.arange(len(df)))
+
+    customer_codes, customers = pd.factorize(df['razon_social'])
+    days = df['fecha'].to_numpy(dtype='datetime64[D]').astype('int64')
+    freight = (df['flete'] == 'Si').to_numpy()
+    monto, kg = measure(df, 'monto_ars'), measure(df, 'total_kg')
+
+    # Lines -> invoices
+    inv_customer = customer_codes[first_line]
+    inv_day = days[first_line]
+    inv_monto = np.zeros(n_invoices, dtype=monto.dtype)
+    inv_kg = np.zeros(n_invoices, dtype=kg.dtype)
+    np.add.at(inv_monto, invoice, monto)
+    np.add.at(inv_kg, invoice, kg)
+    inv_freight = np.zeros(n_invoices, dtype=bool)
+    np.logical_or.at(inv_freight, invoice, freight)
+
+    # Invoices -> customer × day events, sorted by customer then day
+    valid = inv_customer >= 0
+    order = np.flatnonzero(valid)[np.lexsort((inv_day[valid], inv_customer[valid]))]
+    customer, day = inv_customer[order], inv_day[order]
+    start = np.flatnonzero(np.r_[True, (customer[1:] != customer[:-1]) | (day[1:] != day[:-1])])
+    first = order[start]
+    events = pd.DataFrame({
+        'razon_social': np.asarray(customers, dtype=object)[customer[start]],
+        'customer_code': customer[start],
+        'fecha': day[start].astype('datetime64[D]').astype('datetime64[ns]'),
+        'revenue': np.add.reduceat(inv_monto[order], start),
+        'volume_kg': np.add.reduceat(inv_kg[order], start),
+        'orders': np.diff(np.r_[start, len(order)]),
+        'freight_orders': np.add.reduceat(inv_freight[order].astype('int64'), start),
+    })
+    if 'customer_id' in df.columns:
+        events.insert(1, 'customer_id', df['customer_id'].to_numpy()[first_line[first]])
+    return events
+
+
+def window_features(events: pd.DataFrame, revenue_scale: int = 1, kg_scale: int = 1,
+                    windows: List[int] = WINDOWS_DAYS) -> pd.DataFrame:
+    """Trailing window features for customer-sorted events, as of each event's date
+
+    Window [t - w, t) per customer: keys are customer * span + day, so one
+    searchsorted finds every lower bound and cum[i] - cum[lo] the window sums
+    """
+    customer = events['customer_code'].to_numpy(dtype='int64')
+    days = events['fecha'].to_numpy(dtype='datetime64[D]').astype('int64')
+    n = len(events)
+    if n == 0:
+        return events.drop(columns='customer_code')
+    days = days - days.min()
+    span = int(days.max()) + max(windows) + 1
+    keys = customer * span + days
+    position = np.arange(n)
+
+    sums = {name: events[name].to_numpy() for name in ['revenue', 'volume_kg', 'orders', 'freight_orders']}
+    cumulative = {name: np.r_[np.zeros(1, dtype=values.dtype), np.cumsum(values)] for name, values in sums.items()}
+    scales = {'revenue': revenue_scale, 'volume_kg': kg_scale, 'orders': 1, 'freight_orders': 1}
+
+    table = events[[c for c in ['razon_social', 'customer_id', 'fecha'] if c in events.columns]].copy()
+    # Labels: what the customer bought on this date
+    table['order_revenue'] = np.round(to_decimal(sums['revenue'], revenue_scale), 2)
+    table['order_kg'] = np.round(to_decimal(sums['volume_kg'], kg_scale), 3)
+    table['order_count'] = sums['orders']
+
+    customer_start = np.searchsorted(keys, customer * span, 'left')
+    same_customer = position > customer_start
+    previous_day = np.where(same_customer, days[np.maximum(position - 1, 0)], -1)
+    table['days_since_last_order'] = np.where(same_customer, days - previous_day, np.nan)
+    table['prior_orders'] = cumulative['orders'][position] - cumulative['orders'][customer_start]
+
+    for window in windows:
+        lo = np.searchsorted(keys, keys - window, 'left')
+        total = {name: cum[position] - cum[lo] for name, cum in cumulative.items()}
+        table[f'revenue_{window}d'] = np.round(to_decimal(total['revenue'], scales['revenue']), 2)
+        table[f'kg_{window}d'] = np.round(to_decimal(total['volume_kg'], scales['volume_kg']), 3)
+        table[f'orders_{window}d'] = total['orders']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            table[f'freight_share_{window}d'] = np.round(
+                np.where(total['orders'] > 0, total['freight_orders'] / total['orders'], np.nan), 4)
+    return table
+
+
+def chunk_bounds(customer: np.ndarray, chunk_rows: int = CHUNK_ROWS) -> np.ndarray:
+    """Event offsets near every chunk_rows, moved to the next customer boundary"""
+    starts = np.flatnonzero(np.r_[True, customer[1:] != customer[:-1]]) if len(customer) else np.array([0])
+    targets = np.arange(chunk_rows, len(customer), chunk_rows)
+    cuts = starts[np.minimum(np.searchsorted(starts, targets, 'left'), len(starts) - 1)]
+    return np.unique(np.r_[0, cuts[cuts > 0], len(customer)])
+
+
+def write_training_features(df: pd.DataFrame, output_dir: Path, chunk_rows: int = CHUNK_ROWS,
+                            compression: str = DEFAULT_CODEC,
+                            compression_level: Optional[int] = None) -> List[Path]:
+    """Training table as part-NNNNN.parquet files; one chunk of features in memory at a time"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for stale in output_dir.glob("part-*.parquet"):
+        stale.unlink()
+
+    events = order_events(df)
+    revenue_scale, kg_scale = scale_of(df, 'monto_ars'), scale_of(df, 'total_kg')
+    bounds = chunk_bounds(events['customer_code'].to_numpy(), chunk_rows)
+    paths = []
+    for part, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:])):
+        features = window_features(events.iloc[lo:hi], revenue_scale, kg_scale)
+        paths.append(write_parquet(features, output_dir / f"part-{part:05d}.parquet",
+                                   compression=compression, compression_level=compression_level))
+    print(f"🧠 {len(events):,} point-in-time training rows in {len(paths)} parts → {output_dir}")
+    return paths
+
+
+def benchmark_pit_features(n_customers: int = 100_000, lines_per_customer: int = 40,
+                           seed: int = 0) -> Dict[str, float]:
+    """Time the cumulative-sum windows against a per-row filtering baseline on a sample"""
+    n_lines = n_customers * lines_per_customer
+    print(f"⏱️  Point-in-time benchmark: {n_lines:,} lines, {n_customers:,} customers")
+
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'codigo_molino': rng.integers(1, 4, n_lines),
+        'comprobante': np.arange(n_lines) // 2,
+        'razon_social': pd.Series(rng.integers(0, n_customers, n_lines)).map('PANADERIA {:07d}'.format),
+        'fecha': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 730, n_lines), unit='D'),
+        'flete': rng.choice(['Si', 'No'], n_lines),
+        'total_kg': rng.choice([25, 50, 500, 1000], n_lines).astype('float64'),
+        'monto_ars': rng.uniform(1e4, 1e6, n_lines).round(2),
+    })
+
+    started = time.perf_counter()
+    events = order_events(df)
+    features = window_features(events)
+    vectorized_seconds = time.perf_counter() - started
+
+    # Baseline: filter each sampled event's customer history row by row
+    sample = rng.choice(len(events), 200, replace=False)
+    started = time.perf_counter()
+    for i in sample:
+        row = events.iloc[i]
+        history = events[(events['razon_social'] == row['razon_social'])
+                         & (events['fecha'] < row['fecha'])
+                         & (events['fecha'] >= row['fecha'] - pd.Timedelta(days=90))]
+        expected = history['revenue'].sum()
+        if not np.isclose(expected, features['revenue_90d'].iat[i], atol=0.01):
+            raise AssertionError(f"Window mismatch at event {i}: {expected} vs {features['revenue_90d'].iat[i]}")
+    per_row_seconds = (time.perf_counter() - started) / len(sample)
+
+    print(f"\n📊 POINT-IN-TIME BENCHMARK ({len(events):,} order events)")
+    print(f"   • Cumulative sums + searchsorted: {vectorized_seconds:.2f}s for all events")
+    print(f"   • Per-row filtering: {per_row_seconds * 1000:.1f} ms per event "
+          f"(≈{per_row_seconds * len(events) / 60:.0f} min for all)")
+    return {'vectorized_s': vectorized_seconds, 'per_row_ms': per_row_seconds * 1000}
+
+
+if __name__ == "__main__":
+    benchmark_pit_features()
@@ -0,0 +1,161 @@
+"""
+Price Anomaly Detection for Moli PWA billing data
+Flags invoices whose precio_por_kg is far from the robust median/MAD of their
+product and zone, in batch over history or online as new rows arrive
+"""
+
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from paths import PROCESSED_DIR
+
+ANOMALY_KEYS = ['producto_limpio', 'zona']
+
+# Modified z-score (Iglewicz & Hoaglin): 0.6745 * (x - median) / MAD; groups
+# where more than half the prices are equal (MAD = 0, a list price) use
+# 1.253314 * mean absolute deviation, floored at a share of the median so a
+# cent off the list price is not an outlier
+MAD_SCALE = 0.6745
+MEAN_AD_SCALE = 1.253314
+MIN_RELATIVE_SPREAD = 0.02
+Z_THRESHOLD = 3.5
+# Groups with fewer observations are only checked for invalid prices
+MIN_GROUP_SIZE = 5
+
+
+def detect_price_anomalies(df: pd.DataFrame, threshold: float = Z_THRESHOLD) -> pd.DataFrame:
+    """Batch mode: score every row against its product/zone median and MAD"""
+    print("\n🔎 Detecting precio_por_kg anomalies...")
+
+    precio = df['precio_por_kg'].to_numpy(dtype='float64')
+    invalid = ~np.isfinite(precio) | (precio <= 0)
+    valid_precio = df['precio_por_kg'].where(~invalid)
+
+    groups = valid_precio.groupby([df[k] for k in ANOMALY_KEYS], dropna=False)
+    median = groups.transform('median')
+    abs_dev = (valid_precio - median).abs()
+    mad = abs_dev.groupby([df[k] for k in ANOMALY_KEYS], dropna=False).transform('median')
+    mean_ad = abs_dev.groupby([df[k] for k in ANOMALY_KEYS], dropna=False).transform('mean')
+    size = groups.transform('count')
+
+    fallback = np.maximum(MEAN_AD_SCALE * mean_ad, MIN_RELATIVE_SPREAD * median.abs())
+    spread = (mad / MAD_SCALE).where(mad > 0, fallback)
+    robust_z = ((valid_precio - median) / spread.where(spread > 0)).fillna(0.0)
+    outlier = (robust_z.abs() > threshold) & (size >= MIN_GROUP_SIZE)
+
+    scored = df.assign(
+        precio_mediana=median,
+        precio_mad=mad,
+        precio_z=robust_z.round(3),
+        anomalia_precio=(invalid | outlier.to_numpy()),
+    )
+
+    flagged = int(scored['anomalia_precio'].sum())
+    print(f"✅ Flagged {flagged:,} of {len(df):,} rows ({flagged / max(len(df), 1) * 100:.2f}%)")
+    print(f"   • Invalid price (kg or amount): {int(invalid.sum()):,}")
+    print(f"   • Robust z > {threshold}: {int(outlier.sum()):,}")
+    return scored
+
+
+def drop_flagged(df: pd.DataFrame) -> pd.DataFrame:
+    """Rows detect_price_anomalies did not flag (all rows of an unscored frame)"""
+    return df[~df['anomalia_precio']] if 'anomalia_precio' in df.columns else df
+
+
+def read_clean_billing(processed_dir: Path = PROCESSED_DIR) -> pd.DataFrame:
+    """billing_data_clean without its price-flagged rows, for analytics readers
+
+    The parquet keeps every row with its flag (the delta export and the
+    operational tools need them); anything computing prices, revenue or
+    demand from history reads it through here
+    """
+    return drop_flagged(pd.read_parquet(processed_dir / "billing_data_clean.parquet"))
+
+
+def write_quarantine(rows: pd.DataFrame, quarantine_dir: Path, name: str = "price_anomalies") -> Optional[Path]:
+    """Append flagged rows to the quarantine area as a new Parquet part"""
+    if rows.empty:
+        return None
+    quarantine_dir.mkdir(parents=True, exist_ok=True)
+    path = quarantine_dir / f"{name}_{pd.Timestamp.now().strftime('%Y%m%d%H%M%S%f')}.parquet"
+    rows.to_parquet(path)
+    print(f"🚧 Quarantined {len(rows):,} rows → {path}")
+    return path
+
+
+class OnlinePriceScorer:
+    """Online mode: constant-time scoring of new rows per product/zone window"""
+
+    def __init__(self, window: int = 200, refresh_every: int = 20, threshold: float = Z_THRESHOLD):
+        self.window = window
+        self.refresh_every = refresh_every
+        self.threshold = threshold
+        self.history: Dict[Tuple[str, str], deque] = {}
+        self.stats: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self.pending: Dict[Tuple[str, str], int] = {}
+        self.quarantine: List[dict] = []
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame, **kwargs) -> 'OnlinePriceScorer':
+        """Warm the windows with the most recent clean rows per group"""
+        scorer = cls(**kwargs)
+        recent = df.sort_values('fecha', kind='stable')
+        if 'anomalia_precio' in recent.columns:
+            recent = recent[~recent['anomalia_precio']]
+        recent = recent.groupby(ANOMALY_KEYS, dropna=False).tail(scorer.window)
+        for key, prices in recent.groupby(ANOMALY_KEYS, dropna=False, sort=False)['precio_por_kg']:
+            scorer.history[key] = deque(prices.to_numpy(dtype='float64'), maxlen=scorer.window) # type: ignore
+            scorer._refresh(key) # type: ignore
+        return scorer
+
+    def _refresh(self, key: Tuple[str, str]):
+        # Window size is bounded, so this is O(window) every refresh_every rows
+        values = np.fromiter(self.history[key], dtype='float64')
+        median = float(np.median(values))
+        abs_dev = np.abs(values - median)
+        mad = float(np.median(abs_dev))
+        # Same spread as the batch z-score: MAD, or mean absolute deviation when MAD is 0
+        fallback = max(MEAN_AD_SCALE * float(abs_dev.mean()), MIN_RELATIVE_SPREAD * abs(median))
+        self.stats[key] = (median, mad / MAD_SCALE if mad > 0 else fallback)
+        self.pending[key] = 0
+
+    def score(self, row: dict) -> Tuple[bool, float]:
+        """Score one billing row and update the rolling window"""
+        key = (row['producto_limpio'], row['zona'])
+        precio = row.get('precio_por_kg')
+        if precio is None:
+            kg = row.get('total_kg') or 0
+            precio = row['monto_ars'] / kg if kg else float('nan')
+
+        if not np.isfinite(precio) or precio <= 0:
+            self.quarantine.append({**row, 'precio_por_kg': precio, 'precio_z': float('nan')})
+            return True, float('nan')
+
+        window = self.history.setdefault(key, deque(maxlen=self.window))
+        median, spread = self.stats.get(key, (precio, 0.0))
+        z = (precio - median) / spread if spread > 0 else 0.0
+        is_anomaly = len(window) >= MIN_GROUP_SIZE and abs(z) > self.threshold
+
+        if is_anomaly:
+            self.quarantine.append({**row, 'precio_por_kg': precio, 'precio_z': round(z, 3)})
+        else:
+            # Only clean prices feed the statistics so outliers cannot drift them
+            window.append(precio)
+            self.pending[key] = self.pending.get(key, 0) + 1
+            if key not in self.stats or self.pending[key] >= self.refresh_every:
+                self._refresh(key)
+        return is_anomaly, z
+
+    def flush_quarantine(self, quarantine_dir: Path) -> Optional[Path]:
+        rows = pd.DataFrame(self.quarantine)
+        self.quarantine = []
+        return write_quarantine(rows, quarantine_dir, name="price_anomalies_online")
+
+
+if __name__ == "__main__":
+    scored = detect_price_anomalies(pd.read_parquet(PROCESSED_DIR / "billing_data_clean.parquet"))
+    write_quarantine(scored[scored['anomalia_precio']], PROCESSED_DIR / "quarantine")
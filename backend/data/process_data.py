@@ -6,14 +6,44 @@ Processes Excel files and prepares them for ML/Analytics integration
 import pandas as pd
 import json
 from pathlib import Path
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Optional, Tuple
 import pandas as pd
 
+from rfm_segmentation import generate_rfm_features
+from cohort_analysis import generate_cohort_matrices
+from reorder_prediction import generate_reorder_features
+from pit_features import write_training_features
+from basket_analysis import generate_basket_analysis
+from recommendation_bundles import build_recommendation_bundles, save_recommendation_bundles
+from geo_sales import generate_geo_sales, write_geo_sales
+from freight_routing import build_zone_distances
+from price_anomalies import detect_price_anomalies, drop_flagged, write_quarantine
+from range_insights import build_prefix_sums, save_prefix_sums
+from mapreduce_pipeline import run_mapreduce
+from entity_registry import EntityRegistry
+from excel_readers import read_excel
+from feature_store import write_feature_store
+from export_stage import export_artifacts, DEFAULT_CODEC
+from paths import RAW_DIR, PROCESSED_DIR
+from fixed_point import to_fixed_point, apply_exact_sums, sum_by
+from entity_resolution import resolve_customers, apply_canonical_names, save_canonical_mapping
+
+# Feature tables keyed by an entity string, tagged with its registry ID before saving
+FEATURE_ENTITY_KINDS = {
+    'customer_features': 'customer',
+    'product_features': 'product',
+    'zone_features': 'zone',
+    'customer_rfm': 'customer',
+    'customer_rfm_state': 'customer',
+}
+
 class MoliDataProcessor:
     """Main class for processing Moli PWA data files"""
     
-    def __init__(self, data_path: str = "/home/sky/Projects/Moli-PWA/data/raw"):
+    def __init__(self, data_path: str = str(RAW_DIR), engine: str = 'auto', fixed_point: bool = False):
         self.data_path = Path(data_path)
+        self.engine = engine
+        self.fixed_point = fixed_point
         
         # Find the files dynamically to handle name variations
         files = list(self.data_path.glob("*.xlsx"))
@@ -39,7 +69,7 @@ class MoliDataProcessor:
         print("🔄 Processing billing data...")
         
         # Read with proper header row (row 2 contains the headers)
-        df = pd.read_excel(self.billing_file, header=2) # type: ignore
+        df = read_excel(self.billing_file, header=2, engine=self.engine)
         
         # Clean column names
         df.columns = [
@@ -56,6 +86,10 @@ class MoliDataProcessor:
         # Remove rows with null dates (header rows, etc.)
         df = df.dropna(subset=['fecha']) # type: ignore
         
+        # Opt-in exact money/weight: int64 centavos and grams summed by every stage
+        if self.fixed_point:
+            df = to_fixed_point(df)
+        
         # Add derived features for ML
         df['year'] = df['fecha'].dt.year
         df['month'] = df['fecha'].dt.month
@@ -80,7 +114,7 @@ class MoliDataProcessor:
         print("\n🔄 Processing geographic data...")
         
         # Read raw data without header to understand structure
-        df_raw = pd.read_excel(self.sales_file, header=None) # type: ignore
+        df_raw = read_excel(self.sales_file, header=None, engine=self.engine)
         
         # The structure appears to be: Province | CP | Ciudad repeated across columns
         # We need to reshape this data properly
@@ -130,7 +164,7 @@ class MoliDataProcessor:
         }).round(2) # type: ignore
         
         customer_stats.columns = ['_'.join(col).strip() for col in customer_stats.columns]
-        customer_stats = customer_stats.reset_index()
+        customer_stats = apply_exact_sums(customer_stats.reset_index(), df, 'razon_social')
         
         # Product performance features
         product_stats = df.groupby('producto_limpio').agg({ # type: ignore
@@ -140,7 +174,7 @@ class MoliDataProcessor:
         }).round(2)
         
         product_stats.columns = ['_'.join(col).strip() for col in product_stats.columns]
-        product_stats = product_stats.reset_index()
+        product_stats = apply_exact_sums(product_stats.reset_index(), df, 'producto_limpio')
         
         # Zone performance features
         zone_stats = df.groupby('zona').agg({ # type: ignore
@@ -150,7 +184,7 @@ class MoliDataProcessor:
         }).round(2)
         
         zone_stats.columns = ['_'.join(col).strip() for col in zone_stats.columns]
-        zone_stats = zone_stats.reset_index()
+        zone_stats = apply_exact_sums(zone_stats.reset_index(), df, 'zona')
         
         print(f"✅ Generated features for {len(customer_stats)} customers")
         print(f"✅ Generated features for {len(product_stats)} products")
@@ -162,27 +196,27 @@ class MoliDataProcessor:
             'zone_features': zone_stats
         }
     
-    def create_recommendation_matrices(self, df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
-        """Create matrices for collaborative filtering"""
+    def create_recommendation_matrices(self, df: pd.DataFrame, registry: Optional[EntityRegistry] = None) -> Dict[str, pd.DataFrame]:
+        """Create matrices for collaborative filtering, indexed by entity ID when a registry is given"""
         print("\n🎯 Creating recommendation matrices...")
         
-        # Customer-Product interaction matrix
-        customer_product_matrix = df.pivot_table( # type: ignore
-            index='razon_social',
-            columns='producto_limpio',
-            values='monto_ars',
-            aggfunc='sum',
-            fill_value=0
-        )
-        
-        # Customer-Zone interaction matrix
-        customer_zone_matrix = df.pivot_table( # type: ignore
-            index='razon_social',
-            columns='zona',
-            values='monto_ars',
-            aggfunc='sum',
-            fill_value=0
-        )
+        if registry is not None:
+            customer_product_matrix = registry.interaction_matrix(
+                sum_by(df, 'monto_ars', ['customer_id', 'product_id']), 'customer', 'product'
+            )
+            customer_zone_matrix = registry.interaction_matrix(
+                sum_by(df, 'monto_ars', ['customer_id', 'zone_id']), 'customer', 'zone'
+            )
+        else:
+            # Customer-Product interaction matrix
+            customer_product_matrix = sum_by( # type: ignore
+                df, 'monto_ars', ['razon_social', 'producto_limpio']
+            ).unstack(fill_value=0)
+            
+            # Customer-Zone interaction matrix
+            customer_zone_matrix = sum_by( # type: ignore
+                df, 'monto_ars', ['razon_social', 'zona']
+            ).unstack(fill_value=0)
         
         print(f"✅ Customer-Product matrix: {str(customer_product_matrix.shape)}") # type: ignore
         print(f"✅ Customer-Zone matrix: {str(customer_zone_matrix.shape)}") # type: ignore
@@ -198,8 +232,8 @@ class MoliDataProcessor:
         
         insights = { # type: ignore
             'overview': {
-                'total_revenue': float(df['monto_ars'].sum()),
-                'total_volume_kg': float(df['total_kg'].sum()),
+                'total_revenue': sum_by(df, 'monto_ars'),
+                'total_volume_kg': sum_by(df, 'total_kg'),
                 'total_transactions': int(len(df)),
                 'unique_customers': int(df['razon_social'].nunique()),
                 'unique_products': int(df['producto_limpio'].nunique()),
@@ -208,13 +242,13 @@ class MoliDataProcessor:
                     'end': df['fecha'].max().strftime('%Y-%m-%d') # type: ignore
                 }
             },
-            'top_customers': df.groupby('razon_social')['monto_ars'].sum().nlargest(10).to_dict(), # type: ignore
-            'top_products': df.groupby('producto_limpio')['monto_ars'].sum().nlargest(10).to_dict(), # type: ignore
-            'top_zones': df.groupby('zona')['monto_ars'].sum().nlargest(10).to_dict(), # type: ignore
-            'monthly_trends': df.groupby(df['fecha'].dt.to_period('M'))['monto_ars'].sum().to_dict(), # type: ignore
+            'top_customers': sum_by(df, 'monto_ars', 'razon_social').nlargest(10).to_dict(), # type: ignore
+            'top_products': sum_by(df, 'monto_ars', 'producto_limpio').nlargest(10).to_dict(), # type: ignore
+            'top_zones': sum_by(df, 'monto_ars', 'zona').nlargest(10).to_dict(), # type: ignore
+            'monthly_trends': sum_by(df, 'monto_ars', df['fecha'].dt.to_period('M')).to_dict(), # type: ignore
             'freight_analysis': {
-                'with_freight': float(df[df['flete'] == 'Si']['monto_ars'].sum()),
-                'without_freight': float(df[df['flete'] == 'No']['monto_ars'].sum()),
+                'with_freight': sum_by(df[df['flete'] == 'Si'], 'monto_ars'),
+                'without_freight': sum_by(df[df['flete'] == 'No'], 'monto_ars'),
                 'freight_percentage': float((df['flete'] == 'Si').mean() * 100)
             }
         }
@@ -227,49 +261,101 @@ class MoliDataProcessor:
 
 
 
-def main() -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, pd.DataFrame], Dict[str, pd.DataFrame], Dict[str, Any]]: # type: ignore
-    """Main processing pipeline"""
+def main(workers: int = 1, data_path: str = str(RAW_DIR), output_dir: str = str(PROCESSED_DIR),
+         engine: str = 'auto', compression: str = DEFAULT_CODEC, compression_level: Optional[int] = None,
+         fixed_point: bool = False) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, pd.DataFrame], Dict[str, pd.DataFrame], Dict[str, Any]]: # type: ignore
+    """Main processing pipeline; workers > 1 enables the map-reduce mode"""
     print("🚀 STARTING MOLI PWA DATA INTEGRATION PIPELINE")
     print("=" * 60)
     
-    processor = MoliDataProcessor()
+    processor = MoliDataProcessor(data_path, engine=engine, fixed_point=fixed_point)
     
     # Process both datasets
     billing_df = processor.process_billing_data()
     geo_df = processor.process_geographic_data()
     
-    # Generate ML features
-    ml_features = processor.generate_ml_features(billing_df)
+    # Stable integer IDs for customers, products and zones across runs
+    output_dir = Path(output_dir)
+    registry = EntityRegistry(output_dir / "entity_registry")
     
-    # Create recommendation matrices
-    rec_matrices = processor.create_recommendation_matrices(billing_df) # type: ignore
+    # Merge spelling variants of the same bakery before anything is keyed by customer;
+    # names the registry already knows stay canonical so customer_id does not move
+    canonical_map = resolve_customers(billing_df, known_names=registry.keys['customer'])
+    billing_df = apply_canonical_names(billing_df, canonical_map)
+    billing_df = registry.assign_ids(billing_df)
     
-    # Generate business insights
-    insights = processor.generate_business_insights(billing_df) # type: ignore
+    # Flag bad prices so they don't skew the analytics: every stage below reads
+    # clean_df; billing_data_clean keeps all rows with their anomalia_precio flag
+    # and the flagged rows also go to the quarantine
+    billing_df = detect_price_anomalies(billing_df)
+    clean_df = drop_flagged(billing_df)
     
-    # Save processed data
-    output_dir = Path("/home/sky/Projects/Moli-PWA/data/processed")
-    output_dir.mkdir(exist_ok=True)
-    
-    # Save main datasets
-    billing_df.to_parquet(output_dir / "billing_data_clean.parquet")
-    geo_df.to_parquet(output_dir / "geographic_data.parquet")
+    if workers > 1:
+        # Map-reduce mode: partial aggregates per mill shard, merged into the same outputs
+        results = run_mapreduce(clean_df, workers=workers, registry=registry)
+        ml_features = results['ml_features']
+        rec_matrices = results['rec_matrices']
+        insights = results['insights']
+    else:
+        # Generate ML features
+        ml_features = processor.generate_ml_features(clean_df)
+        
+        # Create recommendation matrices
+        rec_matrices = processor.create_recommendation_matrices(clean_df, registry) # type: ignore
+        
+        # Generate business insights
+        insights = processor.generate_business_insights(clean_df) # type: ignore
     
-    # Save ML features
-    for name, df in ml_features.items():
-        df.to_parquet(output_dir / f"{name}.parquet")
+    # RFM scores, rebuilt from the full history every run
+    ml_features.update(generate_rfm_features(clean_df))
+    for name, kind in FEATURE_ENTITY_KINDS.items():
+        ml_features[name] = registry.attach_ids(ml_features[name], kind)
+    cohort_tables = generate_cohort_matrices(clean_df)
+    cohort_tables['customer_cohorts'] = registry.attach_ids(cohort_tables['customer_cohorts'], 'customer')
+    reorder_tables = generate_reorder_features(clean_df)
+    for name, table in reorder_tables.items():
+        reorder_tables[name] = registry.attach_ids(registry.attach_ids(table, 'customer'), 'product')
+    basket_tables = generate_basket_analysis(clean_df)
+    basket_tables['product_associations'] = registry.attach_ids(basket_tables['product_associations'], 'product')
+    # Forks its workers here, before the export thread pool starts
+    bundles = build_recommendation_bundles(clean_df, reorder_tables['reorder_predictions'],
+                                           basket_tables['product_associations'])
+    geo_tables = generate_geo_sales(clean_df, geo_df)
+    # Freight plans route every order, flagged prices included
+    geo_tables['zone_distance_matrix'] = build_zone_distances(billing_df['zona'], geo_df)
+    range_prefix = build_prefix_sums(clean_df)
     
-    # Save recommendation matrices
-    for name, matrix in rec_matrices.items():
-        matrix.to_parquet(output_dir / f"{name}_matrix.parquet")
-    
-    # Save business insights as JSON
-    with open(output_dir / "business_insights.json", 'w') as f:
-        json.dump(insights, f, indent=2, default=str)
+    # Save processed data; independent artifacts are written concurrently
+    output_dir.mkdir(exist_ok=True)
+    frames = {
+        'billing_data_clean': billing_df,
+        'geographic_data': geo_df,
+        **ml_features,
+        **cohort_tables,
+        **basket_tables,
+        **reorder_tables,
+        **geo_tables,
+        **{f"{name}_matrix": matrix for name, matrix in rec_matrices.items()},
+    }
+    tasks = {
+        'entity_registry/': registry.save,
+        'quarantine/': lambda: write_quarantine(billing_df[billing_df['anomalia_precio']], output_dir / "quarantine"),
+        'customer_canonical_map.parquet': lambda: save_canonical_mapping(canonical_map, output_dir),
+        'feature_store/': lambda: write_feature_store(ml_features, output_dir / "feature_store"),
+        'range_insights': lambda: save_prefix_sums(range_prefix, output_dir),
+        'recommendations/': lambda: save_recommendation_bundles(bundles, output_dir / "recommendations"),
+        'geo_sales.json(.gz)': lambda: write_geo_sales(geo_tables, output_dir),
+        'ml_training/': lambda: write_training_features(clean_df, output_dir / "ml_training",
+                                                        compression=compression,
+                                                        compression_level=compression_level),
+    }
+    export_artifacts(output_dir, frames, documents={'business_insights': insights}, tasks=tasks,
+                     compression=compression, compression_level=compression_level)
     
     print(f"\n✅ ALL DATA PROCESSED AND SAVED TO: {output_dir}")
     print("\n📊 SUMMARY:")
-    print(f"   • Billing records: {len(billing_df):,}")
+    print(f"   • Billing records: {len(billing_df):,} ({len(billing_df) - len(clean_df):,} price-flagged, "
+          f"left out of the analytics)")
     print(f"   • Geographic records: {len(geo_df):,}")
     print(f"   • Total revenue: ${insights['overview']['total_revenue']:,.2f}")
     print(f"   • Total volume: {insights['overview']['total_volume_kg']:,.2f} kg")
@@ -10,20 +10,22 @@ import json
 from typing import Tuple, Dict
 import pandas as pd
 
-def process_billing_data() -> Tuple[pd.DataFrame, Dict[str, object], pd.DataFrame, pd.DataFrame]:
+from excel_readers import read_excel
+from paths import RAW_DIR, PROCESSED_DIR
+
+def process_billing_data(data_path: Path = RAW_DIR, output_dir: Path = PROCESSED_DIR) -> Tuple[pd.DataFrame, Dict[str, object], pd.DataFrame, pd.DataFrame]:
     """Process the billing data and generate insights"""
     
     print("🚀 PROCESSING MOLI PWA BILLING DATA")
     print("=" * 50)
     
-    # Read billing data from backend directory
-    data_path = Path("/home/sky/Projects/Moli-PWA/backend/data/raw")
-    billing_file = data_path / "Listado_de_Facturacion_de_Molinos.xlsx"
+    # Read billing data from the raw directory
+    billing_file = Path(data_path) / "Listado_de_Facturacion_de_Molinos.xlsx"
     
     print(f"📁 Reading file: {billing_file}")
     
     # Read with proper header row (row 2 contains the headers)
-    df = pd.read_excel(billing_file, header=2) # type: ignore
+    df = read_excel(billing_file, header=2)
     
     print(f"📊 Initial shape: {df.shape}")
     print(f"🏗️  Columns: {list(df.columns)}")
@@ -119,7 +121,7 @@ def process_billing_data() -> Tuple[pd.DataFrame, Dict[str, object], pd.DataFram
     print(f"✅ Customer-Zone matrix: {customer_zone_matrix.shape}")
     
     # Save processed data
-    output_dir = Path("/home/sky/Projects/Moli-PWA/backend/data/processed")
+    output_dir = Path(output_dir)
     output_dir.mkdir(exist_ok=True)
     
     # Save main dataset
@@ -7,18 +7,20 @@ import numpy as np
 from pathlib import Path
 import json
 
-def process_billing_only():
+from excel_readers import read_excel
+from paths import RAW_DIR, PROCESSED_DIR
+
+def process_billing_only(data_path: Path = RAW_DIR, output_dir: Path = PROCESSED_DIR):
     """Process just the billing data and save it"""
     
     print("🚀 PROCESSING BILLING DATA FOR MOLI PWA")
     print("=" * 50)
     
     # Read billing data
-    data_path = "./data/raw"
-    billing_file = f"{data_path}/Listado_de_Facturacion_de_Molinos.xlsx"
+    billing_file = Path(data_path) / "Listado_de_Facturacion_de_Molinos.xlsx"
     
     # Read with proper header row (row 2 contains the headers)
-    df = pd.read_excel(billing_file, header=2)
+    df = read_excel(billing_file, header=2)
     
     # Clean column names
     df.columns = [
@@ -80,7 +82,7 @@ def process_billing_only():
     insights['monthly_trends'] = {str(k): float(v) for k, v in insights['monthly_trends'].items()}
     
     # Save processed data
-    output_dir = Path("/home/sky/Projects/Moli-PWA/data/processed")
+    output_dir = Path(output_dir)
     output_dir.mkdir(exist_ok=True)
     
     # Save main dataset
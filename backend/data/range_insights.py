@@ -0,0 +1,192 @@
+"""
+Date-Range Insights via Prefix Sums for the Moli PWA dashboard
+Stores daily cumulative sums per measure, globally and per customer/product/zone,
+so any window aggregate is two lookups instead of a filter and regroup
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from fixed_point import measure, scale_of
+
+from paths import PROCESSED_DIR
+
+# Measure order along the last axis of every prefix-sum array
+MEASURES = ['monto_ars', 'total_kg', 'transactions', 'freight_monto_ars', 'freight_transactions']
+DIMENSIONS = {
+    'customer': 'razon_social',
+    'product': 'producto_limpio',
+    'zone': 'zona',
+}
+
+DateLike = Union[str, pd.Timestamp]
+
+
+def build_prefix_sums(df: pd.DataFrame) -> Dict[str, object]:
+    """Daily cumulative sums of every measure, global and per dimension"""
+    print("\n📈 Building date-range prefix sums...")
+
+    days = df['fecha'].dt.normalize()
+    start = days.min()
+    n_days = int((days.max() - start).days) + 1
+    day_idx = (days - start).dt.days.to_numpy()
+
+    # Fixed-point mode accumulates int64 centavos/grams; scales convert at query time
+    with_freight = (df['flete'] == 'Si').to_numpy()
+    monto = measure(df, 'monto_ars')
+    kg = measure(df, 'total_kg')
+    dtype = np.result_type(monto, kg)
+    values = np.column_stack([
+        monto,
+        kg,
+        np.ones(len(df), dtype=dtype),
+        np.where(with_freight, monto, 0),
+        with_freight,
+    ]).astype(dtype)
+    scales = [scale_of(df, 'monto_ars'), scale_of(df, 'total_kg'), 1, scale_of(df, 'monto_ars'), 1]
+
+    # Leading zero row makes window [s, e] = cum[e + 1] - cum[s]
+    daily = np.zeros((n_days + 1, len(MEASURES)), dtype=dtype)
+    np.add.at(daily, day_idx + 1, values)
+    prefix: Dict[str, object] = {'global': np.cumsum(daily, axis=0)}
+    labels: Dict[str, List[str]] = {}
+
+    for dim, column in DIMENSIONS.items():
+        codes, uniques = pd.factorize(df[column], sort=True)
+        present = codes >= 0
+        cube = np.zeros((len(uniques), n_days + 1, len(MEASURES)), dtype=dtype)
+        np.add.at(cube, (codes[present], day_idx[present] + 1), values[present])
+        prefix[dim] = np.cumsum(cube, axis=1)
+        labels[dim] = [str(u) for u in uniques]
+        print(f"   • {dim}: {len(uniques):,} × {n_days:,} days")
+
+    prefix['meta'] = {
+        'start': start.strftime('%Y-%m-%d'),
+        'n_days': n_days,
+        'measures': MEASURES,
+        'scales': scales,
+        'labels': labels,
+    }
+    print(f"✅ Prefix sums over {n_days:,} days from {prefix['meta']['start']}") # type: ignore
+    return prefix
+
+
+def save_prefix_sums(prefix: Dict[str, object], output_dir: Path) -> List[Path]:
+    """Write one .npy per array (global and each dimension) so readers can memory-map them"""
+    paths = []
+    for name, array in prefix.items():
+        if name != 'meta':
+            np.save(output_dir / f"range_insights_{name}.npy", array)
+            paths.append(output_dir / f"range_insights_{name}.npy")
+    with open(output_dir / "range_insights_meta.json", 'w') as f:
+        json.dump(prefix['meta'], f, separators=(',', ':'), ensure_ascii=False)
+    return paths + [output_dir / "range_insights_meta.json"]
+
+
+class RangeInsights:
+    """Window aggregates in O(1) from stored prefix sums"""
+
+    def __init__(self, output_dir: Union[str, Path] = PROCESSED_DIR,
+                 prefix: Optional[Dict[str, object]] = None):
+        if prefix is None:
+            output_dir = Path(output_dir)
+            with open(output_dir / "range_insights_meta.json") as f:
+                meta = json.load(f)
+            prefix = {name: np.load(output_dir / f"range_insights_{name}.npy", mmap_mode='r')
+                      for name in ['global', *meta['labels']]}
+            prefix['meta'] = meta
+        self.prefix = prefix
+        self.meta: Dict[str, object] = prefix['meta'] # type: ignore
+        self.start = pd.Timestamp(self.meta['start']) # type: ignore
+        self.n_days: int = self.meta['n_days'] # type: ignore
+        self.scales = np.asarray(self.meta.get('scales', [1] * len(MEASURES)), dtype='float64') # type: ignore
+        self.index = {
+            dim: {label: i for i, label in enumerate(labels)}
+            for dim, labels in self.meta['labels'].items() # type: ignore
+        }
+
+    def _bounds(self, start: Optional[DateLike], end: Optional[DateLike]):
+        """Clip an inclusive date window to prefix-sum row offsets (empty when outside the data)"""
+        s = 0 if start is None else (pd.Timestamp(start) - self.start).days
+        e = self.n_days - 1 if end is None else (pd.Timestamp(end) - self.start).days
+        s, e = min(max(s, 0), self.n_days), min(e, self.n_days - 1)
+        return s, max(e + 1, s)
+
+    def _window(self, cum: np.ndarray, start, end) -> np.ndarray:
+        """Window totals in decimal units (integer differences first, then one division)"""
+        s, e = self._bounds(start, end)
+        return (cum[..., e, :] - cum[..., s, :]) / self.scales
+
+    @staticmethod
+    def _summary(totals: np.ndarray) -> Dict[str, object]:
+        revenue, kg, transactions, freight_revenue, freight_tx = (float(x) for x in totals)
+        return {
+            'total_revenue': revenue,
+            'total_volume_kg': kg,
+            'total_transactions': int(round(transactions)),
+            'freight_analysis': {
+                'with_freight': freight_revenue,
+                # Centavo rounding keeps the difference exact when the cube is fixed-point
+                'without_freight': round(revenue - freight_revenue, 2),
+                'freight_percentage': freight_tx / transactions * 100 if transactions else 0.0,
+            },
+        }
+
+    def overview(self, start: Optional[DateLike] = None, end: Optional[DateLike] = None) -> Dict[str, object]:
+        """Revenue, kg, transactions and freight split over [start, end]"""
+        return self._summary(self._window(self.prefix['global'], start, end)) # type: ignore
+
+    def entity(self, dim: str, key: str, start: Optional[DateLike] = None,
+               end: Optional[DateLike] = None) -> Dict[str, object]:
+        """Same overview restricted to one customer, product or zone"""
+        cube: np.ndarray = self.prefix[dim] # type: ignore
+        return self._summary(self._window(cube[self.index[dim][key]], start, end))
+
+    def top(self, dim: str, start: Optional[DateLike] = None, end: Optional[DateLike] = None,
+            n: int = 10, measure: str = 'monto_ars') -> Dict[str, float]:
+        """Top-n entities by a measure over the window"""
+        totals = self._window(self.prefix[dim], start, end)[:, MEASURES.index(measure)] # type: ignore
+        n = min(n, len(totals))
+        best = np.argpartition(-totals, n - 1)[:n] if n else np.array([], dtype=int)
+        best = best[np.argsort(-totals[best], kind='stable')]
+        labels = self.meta['labels'][dim] # type: ignore
+        return {labels[i]: float(totals[i]) for i in best}
+
+    def window_insights(self, start: Optional[DateLike] = None, end: Optional[DateLike] = None,
+                        n: int = 10) -> Dict[str, object]:
+        """generate_business_insights-style payload for an arbitrary window"""
+        overview = self.overview(start, end)
+        freight = overview.pop('freight_analysis')
+        return {
+            'overview': overview,
+            'top_customers': self.top('customer', start, end, n),
+            'top_products': self.top('product', start, end, n),
+            'top_zones': self.top('zone', start, end, n),
+            'freight_analysis': freight,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query billing insights for a date window")
+    parser.add_argument('--start', default=None)
+    parser.add_argument('--end', default=None)
+    parser.add_argument('--dim', choices=list(DIMENSIONS), default=None)
+    parser.add_argument('--key', default=None, help="Entity label when --dim is given")
+    parser.add_argument('--processed-dir', default=str(PROCESSED_DIR))
+    args = parser.parse_args()
+
+    insights = RangeInsights(args.processed_dir)
+    if args.dim and args.key:
+        result = insights.entity(args.dim, args.key, args.start, args.end)
+    else:
+        result = insights.window_insights(args.start, args.end)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
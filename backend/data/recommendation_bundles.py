@@ -0,0 +1,319 @@
+"""
+Offline Recommendation Bundles for the Moli PWA service worker
+Scores every bakery's products (own revenue share, plus basket cross-sell for
+products it has not bought), keeps the top k with their reorder hints and packs
+them as fixed 8-byte entries per customer behind a uint32 offset index
+"""
+
+import json
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from feature_store import new_version
+from fixed_point import measure
+
+TOP_K = 12
+
+# Cross-sell scores are the customer's share-weighted rule confidence, damped so
+# a product the bakery already buys ranks above one it might add
+CROSS_SELL_WEIGHT = 0.5
+MIN_LIFT = 1.0
+
+# Scores are in [0, 1] and stored as uint8 levels
+SCORE_LEVELS = 255
+
+# Reorder status per entry; 'none' for cross-sell products without history
+REORDER_HINTS = ['none', 'due', 'scheduled', 'lapsed', 'insufficient_history']
+NO_DAYS = -32768
+
+# Little-endian entry layout, 8 bytes: what the client decodes with a DataView
+ENTRY_DTYPE = np.dtype([
+    ('product_id', '<u2'),
+    ('score', 'u1'),
+    ('hint', 'u1'),
+    ('days_until', '<i2'),
+    ('typical_kg', '<u2'),
+])
+
+# Dense score block per worker step (customers × products cells)
+BLOCK_CELLS = 4_000_000
+
+BUNDLE_FORMAT = 1
+CURRENT_POINTER = "CURRENT"
+
+# Scoring inputs inherited by forked workers, so shards travel as customer ranges
+_SHARED_INPUTS: Optional[Dict[str, object]] = None
+
+
+def customer_shares(df: pd.DataFrame) -> sparse.csr_matrix:
+    """Customer × product revenue share (rows sum to 1), indexed by registry IDs"""
+    revenue = pd.Series(measure(df, 'monto_ars')).groupby(
+        [df['customer_id'].to_numpy(), df['product_id'].to_numpy()]).sum().clip(lower=0)
+    revenue = revenue[revenue > 0]
+    customers = revenue.index.get_level_values(0).to_numpy()
+    products = revenue.index.get_level_values(1).to_numpy()
+    shape = (int(df['customer_id'].max()) + 1, int(df['product_id'].max()) + 1) if len(df) else (0, 0)
+    matrix = sparse.csr_matrix((revenue.to_numpy(dtype='float64'), (customers, products)), shape=shape)
+    totals = np.asarray(matrix.sum(axis=1)).ravel()
+    return (sparse.diags(np.divide(1.0, totals, out=np.zeros_like(totals), where=totals > 0)) @ matrix).tocsr()
+
+
+def cross_sell_matrix(associations: pd.DataFrame, product_ids: Dict[str, int], n_products: int,
+                      min_lift: float = MIN_LIFT) -> sparse.csr_matrix:
+    """Product × product confidence of the positive (lift above min_lift) basket rules"""
+    rules = associations[associations['lift'] > min_lift]
+    rows = rules['producto_limpio'].map(product_ids)
+    cols = rules['associated_product'].map(product_ids)
+    known = (rows.notna() & cols.notna()).to_numpy()
+    return sparse.csr_matrix(
+        (rules['confidence'].to_numpy(dtype='float64')[known],
+         (rows[known].to_numpy(dtype='int64'), cols[known].to_numpy(dtype='int64'))),
+        shape=(n_products, n_products),
+    )
+
+
+def reorder_hints(predictions: pd.DataFrame, n_products: int) -> Dict[str, np.ndarray]:
+    """Reorder predictions as arrays sorted by customer_id * n_products + product_id"""
+    keys = (predictions['customer_id'].to_numpy(dtype='int64') * n_products
+            + predictions['product_id'].to_numpy(dtype='int64'))
+    order = np.argsort(keys, kind='stable')
+    codes = pd.Categorical(predictions['status'], categories=REORDER_HINTS).codes
+    days = predictions['days_until'].to_numpy(dtype='float64')
+    return {
+        'keys': keys[order],
+        'hint': np.where(codes >= 0, codes, 0).astype('uint8')[order],
+        'days_until': np.where(np.isnan(days), NO_DAYS, np.clip(np.nan_to_num(days), NO_DAYS + 1, 32767))
+                        .astype('int16')[order],
+        'typical_kg': np.clip(np.rint(predictions['typical_kg'].fillna(0).to_numpy(dtype='float64')), 0, 65535)
+                        .astype('uint16')[order],
+    }
+
+
+def top_k_entries(shares: sparse.csr_matrix, cross_sell: sparse.csr_matrix, hints: Dict[str, np.ndarray],
+                  row_offset: int = 0, top_k: int = TOP_K) -> Tuple[np.ndarray, np.ndarray]:
+    """Packed entries and entry counts for every row of shares, best score first
+
+    Rows are customers row_offset, row_offset + 1, ...; hints come from reorder_hints()
+    """
+    n_rows, n_products = shares.shape
+    k = min(top_k, n_products)
+    scores = shares.toarray()
+    bought = scores > 0
+    scores[~bought] = CROSS_SELL_WEIGHT * (shares @ cross_sell).toarray()[~bought]
+
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < n_products else np.tile(np.arange(k), (n_rows, 1))
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    top = np.take_along_axis(top, order, axis=1)
+    levels = np.rint(np.clip(np.take_along_axis(top_scores, order, axis=1), 0, 1) * SCORE_LEVELS)
+    # Sorted best first, so each row's kept entries are a prefix and row-major order groups them
+    keep = levels > 0
+
+    rows = np.broadcast_to(np.arange(n_rows)[:, None], top.shape)[keep]
+    products = top[keep]
+    entries = np.zeros(len(products), dtype=ENTRY_DTYPE)
+    entries['product_id'] = products
+    entries['score'] = levels[keep]
+    entries['days_until'] = NO_DAYS
+
+    keys = (rows + row_offset) * np.int64(n_products) + products
+    position = np.minimum(np.searchsorted(hints['keys'], keys), max(len(hints['keys']) - 1, 0))
+    found = hints['keys'][position] == keys if len(hints['keys']) else np.zeros(len(keys), dtype=bool)
+    for field in ['hint', 'days_until', 'typical_kg']:
+        entries[field][found] = hints[field][position[found]]
+    return entries, keep.sum(axis=1)
+
+
+def _pack_range(bounds: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+    inputs = _SHARED_INPUTS
+    shares, cross_sell = inputs['shares'], inputs['cross_sell'] # type: ignore
+    step = max(1, BLOCK_CELLS // max(shares.shape[1], 1))
+    entries, counts = [], []
+    for lo in range(bounds[0], bounds[1], step):
+        hi = min(lo + step, bounds[1])
+        block_entries, block_counts = top_k_entries(shares[lo:hi], cross_sell, inputs['hints'], # type: ignore
+                                                    lo, inputs['top_k']) # type: ignore
+        entries.append(block_entries)
+        counts.append(block_counts)
+    return np.concatenate(entries), np.concatenate(counts)
+
+
+def build_recommendation_bundles(df: pd.DataFrame, predictions: pd.DataFrame, associations: pd.DataFrame,
+                                 top_k: int = TOP_K, workers: Optional[int] = None,
+                                 shards_per_worker: int = 4) -> Dict[str, object]:
+    """Top-k entries per customer, built over customer ranges in a process pool"""
+    print("\n🎁 Building offline recommendation bundles...")
+    products = df.drop_duplicates('product_id').set_index('product_id')['producto_limpio'].sort_index()
+    if len(products) and products.index.max() > np.iinfo('uint16').max:
+        raise ValueError(f"Product IDs exceed uint16 ({products.index.max()}); bundles need a wider entry")
+
+    shares = customer_shares(df)
+    n_customers, n_products = shares.shape
+    cross_sell = cross_sell_matrix(associations, {name: int(i) for i, name in products.items()}, n_products)
+    as_of = pd.Timestamp(predictions['last_purchase'].max()).normalize() if len(predictions) else None
+
+    workers = workers or os.cpu_count() or 1
+    edges = np.linspace(0, n_customers, workers * shards_per_worker + 1).astype('int64')
+    ranges = [(int(lo), int(hi)) for lo, hi in zip(edges[:-1], edges[1:]) if hi > lo]
+
+    global _SHARED_INPUTS
+    _SHARED_INPUTS = {'shares': shares, 'cross_sell': cross_sell, 'top_k': top_k,
+                      'hints': reorder_hints(predictions, n_products)}
+    try:
+        if workers == 1 or 'fork' not in multiprocessing.get_all_start_methods():
+            parts = [_pack_range(bounds) for bounds in ranges]
+        else:
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                parts = list(pool.map(_pack_range, ranges))
+    finally:
+        _SHARED_INPUTS = None
+
+    entries = np.concatenate([p[0] for p in parts]) if parts else np.zeros(0, dtype=ENTRY_DTYPE)
+    counts = np.concatenate([p[1] for p in parts]) if parts else np.zeros(0, dtype='int64')
+    offsets = np.r_[0, np.cumsum(counts) * ENTRY_DTYPE.itemsize].astype('uint32')
+
+    meta = {
+        'format': BUNDLE_FORMAT,
+        'entry': [[name, ENTRY_DTYPE.fields[name][0].str] for name in ENTRY_DTYPE.names],
+        'entry_bytes': ENTRY_DTYPE.itemsize,
+        'score_levels': SCORE_LEVELS,
+        'hints': REORDER_HINTS,
+        'no_days': NO_DAYS,
+        'as_of': as_of.strftime('%Y-%m-%d') if as_of is not None else None,
+        'top_k': top_k,
+        'customers': int(n_customers),
+        'products': {str(i): name for i, name in products.items()},
+    }
+    served = int((counts > 0).sum())
+    print(f"✅ {served:,} bundles, {len(entries):,} entries "
+          f"({offsets[-1] / max(served, 1):.0f} bytes per bakery) with {len(ranges)} shards on {workers} workers")
+    return {'entries': entries, 'offsets': offsets, 'meta': meta}
+
+
+def save_recommendation_bundles(bundles: Dict[str, object], output_dir: Path) -> List[Path]:
+    """bundles.bin (entries), index.bin (uint32 byte offsets by customer_id, n + 1) and meta.json
+
+    The three files go into a fresh version directory and CURRENT is flipped last,
+    so a reader never pairs an index with another build's entries or meta
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    version = new_version()
+    base, counter = version, 1
+    while (output_dir / version).exists():
+        version, counter = f"{base}-{counter}", counter + 1
+    staging = output_dir / f".{version}.tmp"
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir()
+
+    try:
+        bundles['entries'].tofile(staging / "bundles.bin") # type: ignore
+        bundles['offsets'].tofile(staging / "index.bin") # type: ignore
+        with open(staging / "meta.json", 'w') as f:
+            json.dump(bundles['meta'], f, separators=(',', ':'), ensure_ascii=False)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    version_dir = output_dir / version
+    os.replace(staging, version_dir)
+    pointer_tmp = output_dir / f".{CURRENT_POINTER}.tmp"
+    pointer_tmp.write_text(version)
+    os.replace(pointer_tmp, output_dir / CURRENT_POINTER)
+
+    # The previous version stays until the next save so open readers keep working
+    for old in sorted(p for p in output_dir.iterdir() if p.is_dir() and not p.name.startswith('.'))[:-2]:
+        shutil.rmtree(old, ignore_errors=True)
+    return [version_dir / name for name in ["bundles.bin", "index.bin", "meta.json"]] + [output_dir / CURRENT_POINTER]
+
+
+def current_bundle_dir(output_dir: Union[str, Path]) -> Path:
+    """Version directory CURRENT points at"""
+    output_dir = Path(output_dir)
+    return output_dir / (output_dir / CURRENT_POINTER).read_text().strip()
+
+
+def read_bundle(output_dir: Union[str, Path], customer_id: int) -> pd.DataFrame:
+    """Decode one customer's entries the way the service worker does"""
+    version_dir = current_bundle_dir(output_dir)
+    offsets = np.memmap(version_dir / "index.bin", dtype='<u4', mode='r')
+    if not 0 <= customer_id < len(offsets) - 1:
+        return pd.DataFrame(np.zeros(0, dtype=ENTRY_DTYPE))
+    start, end = int(offsets[customer_id]), int(offsets[customer_id + 1])
+    with open(version_dir / "bundles.bin", 'rb') as f:
+        f.seek(start)
+        entries = np.frombuffer(f.read(end - start), dtype=ENTRY_DTYPE)
+    with open(version_dir / "meta.json") as f:
+        meta = json.load(f)
+
+    bundle = pd.DataFrame(entries)
+    bundle.insert(1, 'producto_limpio', bundle['product_id'].astype(str).map(meta['products']))
+    bundle['score'] = bundle['score'] / meta['score_levels']
+    bundle['hint'] = np.asarray(meta['hints'], dtype=object)[bundle['hint']]
+    bundle['days_until'] = bundle['days_until'].where(bundle['days_until'] != meta['no_days'])
+    return bundle
+
+
+def benchmark_bundles(n_customers: int = 200_000, n_products: int = 400, lines_per_customer: int = 30,
+                      workers: Optional[int] = None, seed: int = 0) -> Dict[str, float]:
+    """Serial vs process-pool bundle builds on synthetic billing, plus bundle sizes"""
+    from basket_analysis import association_rules, co_occurrence, incidence_matrix
+    from reorder_prediction import compute_reorder_state, predict_reorders
+
+    workers = workers or os.cpu_count() or 1
+    n_lines = n_customers * lines_per_customer
+    print(f"⏱️  Bundle benchmark: {n_customers:,} customers × {n_products:,} products, {n_lines:,} lines")
+
+    rng = np.random.default_rng(seed)
+    customer = rng.integers(0, n_customers, n_lines)
+    # Each bakery sticks to a handful of products around its own favourite
+    product = (rng.integers(0, n_products, n_customers)[customer] + rng.geometric(0.3, n_lines) - 1) % n_products
+    df = pd.DataFrame({
+        'codigo_molino': rng.integers(1, 4, n_lines),
+        'comprobante': np.arange(n_lines) // 3,
+        'customer_id': customer.astype('int32'),
+        'product_id': product.astype('int32'),
+        'razon_social': pd.Series(customer).map('PANADERIA {:07d}'.format),
+        'producto_limpio': pd.Series(product).map('PRODUCTO {:04d}'.format),
+        'fecha': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 730, n_lines), unit='D'),
+        'total_kg': rng.choice([25, 50, 500, 1000], n_lines).astype('float64'),
+        'monto_ars': rng.uniform(1e4, 1e6, n_lines).round(2),
+    })
+    incidence, labels = incidence_matrix(df)
+    associations = association_rules(co_occurrence(incidence), incidence.shape[0], labels)
+    predictions = predict_reorders(compute_reorder_state(df))['reorder_predictions']
+    ids = df.drop_duplicates(['razon_social', 'producto_limpio'])
+    predictions = predictions.merge(ids[['razon_social', 'producto_limpio', 'customer_id', 'product_id']],
+                                    on=['razon_social', 'producto_limpio'])
+
+    started = time.perf_counter()
+    serial = build_recommendation_bundles(df, predictions, associations, workers=1)
+    serial_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    parallel = build_recommendation_bundles(df, predictions, associations, workers=workers)
+    parallel_seconds = time.perf_counter() - started
+    if serial['entries'].tobytes() != parallel['entries'].tobytes():  # type: ignore
+        raise AssertionError("Parallel bundles differ from the serial build")
+
+    sizes = np.diff(parallel['offsets'].astype('int64'))  # type: ignore
+    print(f"\n📊 BUNDLE BENCHMARK ({n_customers:,} customers)")
+    print(f"   • Serial: {serial_seconds:.2f}s")
+    print(f"   • {workers} workers: {parallel_seconds:.2f}s ({serial_seconds / parallel_seconds:.1f}x)")
+    print(f"   • Bundle: {sizes.mean():.0f} bytes mean, {sizes.max()} max; "
+          f"index {parallel['offsets'].nbytes / n_customers:.0f} bytes per bakery")  # type: ignore
+    return {'serial_s': serial_seconds, 'parallel_s': parallel_seconds,
+            'mean_bytes': float(sizes.mean()), 'max_bytes': float(sizes.max())}
+
+
+if __name__ == "__main__":
+    benchmark_bundles()
@@ -0,0 +1,197 @@
+"""
+Reorder-Due Prediction for Moli PWA
+Estimates each bakery's purchase interval per product from sorted inter-purchase
+gaps, predicts the next order date and typical kg, and emits the daily list of
+customer × product pairs due to reorder; the gap sums refresh incrementally
+"""
+
+import time
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from fixed_point import FIXED_POINT_COLUMNS, has_fixed_point, measure, to_decimal
+
+# Pairs need this many observed gaps before their interval is trusted
+MIN_GAPS = 2
+# Due list covers orders expected up to this many days ahead
+DUE_HORIZON_DAYS = 1
+# Pairs overdue by more than this many intervals are treated as lapsed, not due
+LAPSED_INTERVALS = 2.0
+
+def _empty_state(kg_column: str = 'kg_sum') -> pd.DataFrame:
+    return pd.DataFrame({
+        'razon_social': pd.Series([], dtype=object),
+        'producto_limpio': pd.Series([], dtype=object),
+        'last_purchase': pd.Series([], dtype='datetime64[ns]'),
+        'orders': pd.Series([], dtype='int64'),
+        'gaps': pd.Series([], dtype='int64'),
+        'gap_sum': pd.Series([], dtype='float64'),
+        'gap_sq_sum': pd.Series([], dtype='float64'),
+        kg_column: pd.Series([], dtype='int64' if kg_column == 'g_sum' else 'float64'),
+    })
+
+
+def update_reorder_state(state: pd.DataFrame, new_df: pd.DataFrame) -> pd.DataFrame:
+    """Fold new billing lines into the per customer × product gap sums
+
+    Each known pair contributes a zero-kg marker event on its last purchase day,
+    so the first new purchase closes the gap that was open in the state.
+    In fixed-point mode kg accumulate as exact grams in g_sum
+    """
+    customers = pd.concat([state['razon_social'], new_df['razon_social']], ignore_index=True)
+    products = pd.concat([state['producto_limpio'], new_df['producto_limpio']], ignore_index=True)
+    customer_codes, customer_labels = pd.factorize(customers)
+    product_codes, product_labels = pd.factorize(products)
+    n_products = max(len(product_labels), 1)
+    pair = customer_codes.astype('int64') * n_products + product_codes
+
+    n_state = len(state)
+    state_pair = pair[:n_state]
+    days = np.concatenate([
+        state['last_purchase'].to_numpy(dtype='datetime64[D]').astype('int64'),
+        new_df['fecha'].to_numpy(dtype='datetime64[D]').astype('int64'),
+    ])
+    new_kg = measure(new_df, 'total_kg')
+    kg_column = 'g_sum' if new_kg.dtype.kind in 'iu' else 'kg_sum'
+    kg = np.concatenate([np.zeros(n_state, dtype=new_kg.dtype), new_kg])
+    is_marker = np.r_[np.ones(n_state, dtype=bool), np.zeros(len(new_df), dtype=bool)]
+    valid = (customer_codes >= 0) & (product_codes >= 0)
+    pair, days, kg, is_marker = pair[valid], days[valid], kg[valid], is_marker[valid]
+
+    # One event per (pair, day); marker days were already counted as orders, so
+    # new lines on that day only add kg
+    order = np.lexsort((days, pair))
+    pair, days, kg, is_marker = pair[order], days[order], kg[order], is_marker[order]
+    event_start = np.flatnonzero(np.r_[True, (pair[1:] != pair[:-1]) | (days[1:] != days[:-1])])
+    pair, days = pair[event_start], days[event_start]
+    kg = np.add.reduceat(kg, event_start)
+    counts_as_order = ~np.logical_or.reduceat(is_marker, event_start)
+
+    # Gaps close on every new order that follows an earlier event of the same pair
+    same_pair = np.r_[False, pair[1:] == pair[:-1]]
+    gap = np.where(same_pair, np.diff(days, prepend=days[:1]), 0).astype('float64')
+    closes_gap = same_pair & counts_as_order
+
+    pair_start = np.flatnonzero(np.r_[True, pair[1:] != pair[:-1]])
+    delta = pd.DataFrame({
+        'pair': pair[pair_start],
+        'last_day': np.maximum.reduceat(days, pair_start),
+        'orders': np.add.reduceat(counts_as_order.astype('int64'), pair_start),
+        'gaps': np.add.reduceat(closes_gap.astype('int64'), pair_start),
+        'gap_sum': np.add.reduceat(np.where(closes_gap, gap, 0.0), pair_start),
+        'gap_sq_sum': np.add.reduceat(np.where(closes_gap, gap * gap, 0.0), pair_start),
+        kg_column: np.add.reduceat(kg, pair_start),
+    }).set_index('pair')
+
+    previous = state[['orders', 'gaps', 'gap_sum', 'gap_sq_sum', kg_column]].set_axis(pd.Index(state_pair))
+    merged = delta.drop(columns='last_day').add(previous.reindex(delta.index, fill_value=0), fill_value=0)
+
+    pairs = delta.index.to_numpy()
+    return pd.DataFrame({
+        'razon_social': np.asarray(customer_labels, dtype=object)[pairs // n_products],
+        'producto_limpio': np.asarray(product_labels, dtype=object)[pairs % n_products],
+        'last_purchase': delta['last_day'].to_numpy().astype('datetime64[D]').astype('datetime64[ns]'),
+        'orders': merged['orders'].to_numpy(dtype='int64'),
+        'gaps': merged['gaps'].to_numpy(dtype='int64'),
+        'gap_sum': merged['gap_sum'].to_numpy(dtype='float64'),
+        'gap_sq_sum': merged['gap_sq_sum'].to_numpy(dtype='float64'),
+        kg_column: merged[kg_column].to_numpy(dtype=kg.dtype),
+    })
+
+
+def compute_reorder_state(df: pd.DataFrame) -> pd.DataFrame:
+    """Full build: the incremental update applied to an empty state"""
+    return update_reorder_state(_empty_state('g_sum' if has_fixed_point(df) else 'kg_sum'), df)
+
+
+def predict_reorders(state: pd.DataFrame, as_of: Optional[pd.Timestamp] = None,
+                     horizon_days: int = DUE_HORIZON_DAYS) -> Dict[str, pd.DataFrame]:
+    """Expected next order and typical kg per pair, plus the due-to-reorder list"""
+    if as_of is None:
+        as_of = state['last_purchase'].max()
+    as_of = pd.Timestamp(as_of).normalize()
+
+    gaps = state['gaps'].to_numpy()
+    mean_gap = np.where(gaps > 0, state['gap_sum'] / np.maximum(gaps, 1), np.nan)
+    variance = np.where(gaps > 0, state['gap_sq_sum'] / np.maximum(gaps, 1) - mean_gap ** 2, np.nan)
+
+    predictions = state[['razon_social', 'producto_limpio', 'last_purchase', 'orders']].copy()
+    predictions['mean_gap_days'] = mean_gap.round(2)
+    predictions['gap_std_days'] = np.sqrt(np.clip(variance, 0, None)).round(2)
+    kg_sum = (to_decimal(state['g_sum'], FIXED_POINT_COLUMNS['total_kg'][1]) if 'g_sum' in state.columns
+              else state['kg_sum'])
+    predictions['typical_kg'] = (kg_sum / state['orders'].clip(lower=1)).round(2)
+    predictions['expected_next'] = predictions['last_purchase'] + pd.to_timedelta(np.rint(mean_gap), unit='D')
+    predictions['days_until'] = (predictions['expected_next'] - as_of).dt.days
+
+    trusted = gaps >= MIN_GAPS
+    overdue = -predictions['days_until'].to_numpy(dtype='float64')
+    lapsed = overdue > LAPSED_INTERVALS * mean_gap
+    predictions['status'] = np.select(
+        [~trusted, lapsed, predictions['days_until'] <= horizon_days],
+        ['insufficient_history', 'lapsed', 'due'],
+        default='scheduled',
+    )
+
+    due = (predictions[predictions['status'] == 'due']
+           .sort_values(['days_until', 'typical_kg'], ascending=[True, False], ignore_index=True))
+    due.insert(0, 'as_of', as_of)
+    return {'reorder_predictions': predictions, 'reorder_due': due}
+
+
+def generate_reorder_features(df: pd.DataFrame, previous_state: Optional[pd.DataFrame] = None,
+                              as_of: Optional[pd.Timestamp] = None) -> Dict[str, pd.DataFrame]:
+    """Reorder stage: full build, or incremental when a previous state is given"""
+    print("\n🔁 Predicting reorder dates...")
+    if previous_state is None:
+        state = compute_reorder_state(df)
+    else:
+        state = update_reorder_state(previous_state, df)
+    outputs = predict_reorders(state, as_of=as_of)
+
+    status = outputs['reorder_predictions']['status'].value_counts()
+    print(f"✅ {len(state):,} customer × product pairs, {len(outputs['reorder_due']):,} due to reorder")
+    for name, count in status.items():
+        print(f"   • {name}: {count:,}")
+    return {'reorder_state': state, **outputs}
+
+
+def benchmark_reorders(n_customers: int = 200_000, n_products: int = 20,
+                       lines_per_customer: int = 15, seed: int = 0) -> Dict[str, float]:
+    """Time the full and incremental reorder state on synthetic billing lines"""
+    n_lines = n_customers * lines_per_customer
+    print(f"⏱️  Reorder benchmark: {n_lines:,} lines, {n_customers:,} customers × {n_products} products")
+
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'razon_social': pd.Series(rng.integers(0, n_customers, n_lines)).map('PANADERIA {:07d}'.format),
+        'producto_limpio': pd.Series(rng.integers(0, n_products, n_lines)).map('HARINA {:02d}'.format),
+        'fecha': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 730, n_lines), unit='D'),
+        'total_kg': rng.choice([25, 50, 500, 1000], n_lines).astype('float64'),
+    })
+    cutoff = pd.Timestamp('2024-12-24')
+    history, latest = df[df['fecha'] < cutoff], df[df['fecha'] >= cutoff]
+
+    started = time.perf_counter()
+    state = compute_reorder_state(history)
+    full_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    state = update_reorder_state(state, latest)
+    incremental_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    predict_reorders(state)
+    predict_seconds = time.perf_counter() - started
+
+    print(f"\n📊 REORDER BENCHMARK ({n_lines:,} lines)")
+    print(f"   • Full state build: {full_seconds:.2f}s")
+    print(f"   • Incremental week ({len(latest):,} lines): {incremental_seconds:.2f}s")
+    print(f"   • Predictions + due list: {predict_seconds:.2f}s")
+    return {'full_s': full_seconds, 'incremental_s': incremental_seconds, 'predict_s': predict_seconds}
+
+
+if __name__ == "__main__":
+    benchmark_reorders()
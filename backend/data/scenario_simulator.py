@@ -0,0 +1,242 @@
+"""
+Monte Carlo Price and Freight Scenario Simulator for Moli PWA
+Loads baseline demand per mill × customer × product × zone × freight cell once,
+then evaluates thousands of what-if scenarios (product price and zone freight
+changes with random demand shocks) as batched array math, no pipeline reruns
+"""
+
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtri
+
+from fixed_point import measure, scale_of, to_decimal
+from paths import PROCESSED_DIR
+from price_anomalies import drop_flagged, read_clean_billing
+
+CELL_COLUMNS = ['codigo_molino', 'razon_social', 'producto_limpio', 'zona', 'flete']
+
+# Cells missing one of these have no mill to report under or no lever to apply
+LEVER_COLUMNS = ['codigo_molino', 'producto_limpio', 'zona']
+
+# Bakery flour demand is inelastic: +10% price → about -5% kg
+PRICE_ELASTICITY = -0.5
+# Lognormal demand noise per cell, plus one market-wide shock per scenario
+DEMAND_SIGMA = 0.15
+MARKET_SIGMA = 0.05
+
+# Cell shocks are uint16 draws into this many equiprobable lognormal quantiles:
+# a table lookup is several times cheaper than drawing and exponentiating normals
+NOISE_LEVELS = 1 << 16
+
+# Working set per batch of scenarios (a few scenarios × cells float32 arrays)
+BATCH_BYTES = 64 * 2**20
+
+# Price cuts stop at 99% off
+MIN_PRICE_RATIO = 0.01
+
+ALL = '*'
+
+
+def baseline_cells(df: pd.DataFrame) -> pd.DataFrame:
+    """Baseline kg and revenue per demand cell, sorted by mill; cells without a mill, product or zone are dropped"""
+    grouped = df.groupby(CELL_COLUMNS, sort=True, dropna=False)
+    codes = grouped.ngroup().to_numpy()
+    cells = grouped.size().reset_index()[CELL_COLUMNS]
+    n = len(cells)
+    monto, kg = measure(df, 'monto_ars'), measure(df, 'total_kg')
+    cells['kg'] = to_decimal(np.bincount(codes, weights=kg, minlength=n), scale_of(df, 'total_kg'))
+    cells['revenue'] = to_decimal(np.bincount(codes, weights=monto, minlength=n), scale_of(df, 'monto_ars'))
+    keep = (cells['kg'] > 0) & (cells['revenue'] > 0) & cells[LEVER_COLUMNS].notna().all(axis=1)
+    return cells[keep].reset_index(drop=True)
+
+
+def freight_premium(df: pd.DataFrame) -> pd.Series:
+    """Freight part of the price per kg: median flete=Si minus flete=No price, per product"""
+    medians = df.groupby(['producto_limpio', 'flete'])['precio_por_kg'].median().unstack()
+    if 'Si' not in medians or 'No' not in medians:
+        return pd.Series(0.0, index=medians.index)
+    return (medians['Si'] - medians['No']).clip(lower=0).fillna(0.0)
+
+
+def shock_table(sigma: float, levels: int = NOISE_LEVELS) -> np.ndarray:
+    """Mean-one lognormal multipliers at the midpoints of equal-probability bins"""
+    multipliers = np.exp(sigma * ndtri((np.arange(levels) + 0.5) / levels))
+    return (multipliers / multipliers.mean()).astype('float32')
+
+
+class ScenarioEngine:
+    """Baseline cell arrays held once; run() evaluates a scenario batch per call"""
+
+    def __init__(self, df: pd.DataFrame, elasticity: float = PRICE_ELASTICITY,
+                 demand_sigma: float = DEMAND_SIGMA, market_sigma: float = MARKET_SIGMA):
+        df = drop_flagged(df)
+        cells = baseline_cells(df)
+        self.elasticity = elasticity
+        self.demand_sigma = demand_sigma
+        self.market_sigma = market_sigma
+
+        mill_codes, self.mills = pd.factorize(cells['codigo_molino'], sort=True)
+        self.product_codes, self.products = pd.factorize(cells['producto_limpio'], sort=True)
+        self.zone_codes, self.zones = pd.factorize(cells['zona'], sort=True)
+        self.mill_starts = np.flatnonzero(np.r_[True, mill_codes[1:] != mill_codes[:-1]])
+
+        self.kg = cells['kg'].to_numpy(dtype='float64')
+        self.price = cells['revenue'].to_numpy(dtype='float64') / self.kg
+        premium = self.products.map(freight_premium(df)).fillna(0.0).to_numpy(dtype='float64')
+        self.freight_component = np.where(cells['flete'] == 'Si', premium[self.product_codes], 0.0)
+        self.shocks = shock_table(demand_sigma)
+        self.baseline = {
+            'revenue': np.add.reduceat(self.kg * self.price, self.mill_starts),
+            'kg': np.add.reduceat(self.kg, self.mill_starts),
+        }
+
+    @property
+    def n_cells(self) -> int:
+        return len(self.kg)
+
+    def levers(self, changes: Optional[Dict[str, float]], labels: pd.Index) -> np.ndarray:
+        """Fractional change per label from {label or '*': change}; '*' sets the default"""
+        changes = changes or {}
+        unknown = set(changes) - set(labels) - {ALL}
+        if unknown:
+            raise KeyError(f"Unknown scenario keys: {sorted(unknown)[:5]}")
+        values = np.full(len(labels), changes.get(ALL, 0.0))
+        for label, change in changes.items():
+            if label != ALL:
+                values[labels.get_loc(label)] = change
+        return values
+
+    def run(self, price_change: np.ndarray, freight_change: np.ndarray, seed: int = 0) -> Dict[str, np.ndarray]:
+        """Revenue and kg per mill for each scenario row
+
+        price_change is scenarios × products and freight_change scenarios × zones,
+        both fractional (0.15 = +15%); the freight change applies to the freight
+        component of flete=Si cells only
+        """
+        n_scenarios = len(price_change)
+        revenue = np.empty((n_scenarios, len(self.mills)))
+        kg = np.empty((n_scenarios, len(self.mills)))
+        rng = np.random.default_rng(seed)
+        batch = max(1, BATCH_BYTES // (4 * 3 * max(self.n_cells, 1)))
+
+        # Cell arrays in float32 (the shocks dwarf the rounding); mill sums accumulate in float64
+        base_kg = self.kg.astype('float32')
+        base_price = self.price.astype('float32')
+        freight_share = (self.freight_component / self.price).astype('float32')
+        elasticity = np.float32(self.elasticity)
+        price_change = np.asarray(price_change, dtype='float32')
+        freight_change = np.asarray(freight_change, dtype='float32')
+
+        for lo in range(0, n_scenarios, batch):
+            hi = min(lo + batch, n_scenarios)
+            ratio = price_change[lo:hi][:, self.product_codes]
+            ratio += 1.0
+            ratio += freight_change[lo:hi][:, self.zone_codes] * freight_share
+            np.maximum(ratio, MIN_PRICE_RATIO, out=ratio)
+
+            market = np.exp(self.market_sigma * rng.standard_normal(hi - lo) - 0.5 * self.market_sigma ** 2)
+            demand = self.shocks[rng.integers(0, NOISE_LEVELS, (hi - lo, self.n_cells), dtype='uint16')]
+            demand *= market.astype('float32')[:, None]
+            demand *= base_kg
+            demand *= ratio ** elasticity
+            kg[lo:hi] = np.add.reduceat(demand, self.mill_starts, axis=1, dtype='float64')
+
+            demand *= ratio
+            demand *= base_price
+            revenue[lo:hi] = np.add.reduceat(demand, self.mill_starts, axis=1, dtype='float64')
+        return {'revenue': revenue, 'kg': kg}
+
+    def simulate(self, price_pct: Optional[Dict[str, float]] = None,
+                 freight_pct: Optional[Dict[str, float]] = None,
+                 n_scenarios: int = 10_000, seed: int = 0) -> Dict[str, np.ndarray]:
+        """One what-if (percent changes) under n_scenarios random demand draws"""
+        prices = self.levers({k: v / 100 for k, v in (price_pct or {}).items()}, self.products)
+        freight = self.levers({k: v / 100 for k, v in (freight_pct or {}).items()}, self.zones)
+        return self.run(np.broadcast_to(prices, (n_scenarios, len(prices))),
+                        np.broadcast_to(freight, (n_scenarios, len(freight))), seed)
+
+    def summarize(self, results: Dict[str, np.ndarray],
+                  reference: Optional[Dict[str, np.ndarray]] = None) -> pd.DataFrame:
+        """Per-mill percentiles; with a same-seed reference run, also the median change"""
+        rows = []
+        for i, mill in enumerate(self.mills):
+            row = {'codigo_molino': mill}
+            for measure_name in ['revenue', 'kg']:
+                values = results[measure_name][:, i]
+                row[f'{measure_name}_baseline'] = round(float(self.baseline[measure_name][i]), 2)
+                for q in (5, 50, 95):
+                    row[f'{measure_name}_p{q}'] = round(float(np.percentile(values, q)), 2)
+                if reference is not None:
+                    change = values / reference[measure_name][:, i] - 1
+                    row[f'{measure_name}_change_p50'] = round(float(np.median(change)) * 100, 2)
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+
+def _parse_changes(items: Optional[List[str]]) -> Dict[str, float]:
+    """['HARINA 000=15', '*=-5'] -> {'HARINA 000': 15.0, '*': -5.0}"""
+    changes = {}
+    for item in items or []:
+        key, sep, value = item.rpartition('=')
+        if not sep:
+            raise ValueError(f"Expected KEY=PERCENT, got {item!r}")
+        changes[key.strip()] = float(value.rstrip('%'))
+    return changes
+
+
+def benchmark_scenarios(processed_dir: Path = PROCESSED_DIR, n_scenarios: int = 10_000,
+                        seed: int = 0) -> Dict[str, float]:
+    """Throughput of distinct random what-ifs (±20% price per product, ±30% freight per zone)"""
+    billing = read_clean_billing(processed_dir)
+    started = time.perf_counter()
+    engine = ScenarioEngine(billing)
+    load_seconds = time.perf_counter() - started
+    print(f"⏱️  Scenario benchmark: {n_scenarios:,} scenarios × {engine.n_cells:,} demand cells")
+
+    rng = np.random.default_rng(seed)
+    price_change = rng.uniform(-0.2, 0.2, (n_scenarios, len(engine.products)))
+    freight_change = rng.uniform(-0.3, 0.3, (n_scenarios, len(engine.zones)))
+    started = time.perf_counter()
+    engine.run(price_change, freight_change, seed)
+    run_seconds = time.perf_counter() - started
+
+    throughput = n_scenarios / run_seconds
+    print(f"\n📊 SCENARIO BENCHMARK ({engine.n_cells:,} cells, {len(engine.mills)} mills)")
+    print(f"   • Baseline load: {load_seconds:.2f}s")
+    print(f"   • {n_scenarios:,} scenarios in {run_seconds:.2f}s ({throughput:,.0f} scenarios/s)")
+    return {'load_s': load_seconds, 'run_s': run_seconds, 'scenarios_per_s': throughput}
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Simulate price and freight what-ifs per mill")
+    parser.add_argument('--price', action='append', metavar='PRODUCT=PCT',
+                        help="Price change of a product in percent ('*' for all), repeatable")
+    parser.add_argument('--freight', action='append', metavar='ZONE=PCT',
+                        help="Freight change in a zone in percent ('*' for all), repeatable")
+    parser.add_argument('--scenarios', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--processed-dir', type=Path, default=PROCESSED_DIR)
+    args = parser.parse_args(argv)
+
+    billing = read_clean_billing(args.processed_dir)
+    engine = ScenarioEngine(billing)
+    price_pct, freight_pct = _parse_changes(args.price), _parse_changes(args.freight)
+
+    started = time.perf_counter()
+    # Same seed for both runs: the change distribution isolates the what-if from the noise
+    reference = engine.simulate(n_scenarios=args.scenarios, seed=args.seed)
+    results = engine.simulate(price_pct, freight_pct, n_scenarios=args.scenarios, seed=args.seed)
+    seconds = time.perf_counter() - started
+
+    print(f"🎲 {2 * args.scenarios:,} scenarios over {engine.n_cells:,} demand cells in {seconds:.2f}s "
+          f"({2 * args.scenarios / seconds:,.0f} scenarios/s)")
+    print(engine.summarize(results, reference).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
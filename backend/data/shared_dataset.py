@@ -0,0 +1,205 @@
+"""
+Shared-memory dataset loader for Moli PWA API workers
+Publishes the cleaned billing data and feature tables once as Arrow IPC files
+in /dev/shm so every uvicorn worker maps the same pages read-only
+"""
+
+import os
+import time
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from paths import PROCESSED_DIR
+
+# Tables published from the processed directory (see process_data.main)
+SHARED_TABLES = [
+    'billing_data_clean',
+    'customer_features',
+    'product_features',
+    'zone_features',
+]
+
+DEFAULT_SHM_ROOT = "/dev/shm/moli"
+CURRENT_POINTER = "CURRENT"
+
+# A version collected between reading CURRENT and registering is retried this often
+ATTACH_RETRIES = 5
+
+
+def _pid_alive(pid: int) -> bool:
+    """Check whether a process holding a reference is still running"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def publish_dataset(processed_dir: str = str(PROCESSED_DIR),
+                    shm_root: str = DEFAULT_SHM_ROOT,
+                    version: Optional[str] = None) -> Path:
+    """Copy a pipeline run into shared memory and make it the current version"""
+    print("📤 Publishing dataset to shared memory...")
+
+    processed_path = Path(processed_dir)
+    root = Path(shm_root)
+    root.mkdir(parents=True, exist_ok=True)
+
+    now = time.time_ns()
+    version = version or time.strftime('%Y%m%d%H%M%S', time.localtime(now // 10**9)) + f".{now % 10**9:09d}"
+    # Publishing a name that is already there gets a counter suffix instead of replacing it
+    base, counter = version, 1
+    while (root / version).exists():
+        version, counter = f"{base}-{counter}", counter + 1
+    version_dir = root / version
+    staging_dir = root / f".{version}.tmp"
+    if staging_dir.exists():
+        shutil.rmtree(staging_dir)
+    (staging_dir / "refs").mkdir(parents=True)
+
+    for name in SHARED_TABLES:
+        source = processed_path / f"{name}.parquet"
+        if not source.exists():
+            print(f"   ⚠️  Skipping missing table: {source.name}")
+            continue
+
+        # Uncompressed IPC files can be memory-mapped without a decode step
+        table = pq.read_table(source)
+        with pa.OSFile(str(staging_dir / f"{name}.arrow"), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        print(f"   • {name}: {table.num_rows:,} rows, {table.nbytes:,} bytes")
+
+    # Rename the finished directory, then flip the pointer atomically
+    os.replace(staging_dir, version_dir)
+    pointer_tmp = root / f".{CURRENT_POINTER}.tmp"
+    pointer_tmp.write_text(version)
+    os.replace(pointer_tmp, root / CURRENT_POINTER)
+
+    print(f"✅ Published version {version} to {version_dir}")
+
+    collect_stale_versions(shm_root)
+    return version_dir
+
+
+def collect_stale_versions(shm_root: str = DEFAULT_SHM_ROOT) -> List[str]:
+    """Remove old versions that no live worker still references"""
+    root = Path(shm_root)
+    pointer = root / CURRENT_POINTER
+    if not pointer.exists():
+        return []
+
+    current = pointer.read_text().strip()
+    removed = []
+
+    for version_dir in root.iterdir():
+        if not version_dir.is_dir() or version_dir.name.startswith('.'):
+            continue
+        if version_dir.name == current:
+            continue
+
+        refs_dir = version_dir / "refs"
+        live_refs = []
+        for ref in refs_dir.glob("*") if refs_dir.exists() else []:
+            # Ref names are <pid>-<handle>, one per attached SharedDataset
+            pid = ref.name.split('-', 1)[0]
+            if pid.isdigit() and _pid_alive(int(pid)):
+                live_refs.append(ref)
+            else:
+                ref.unlink(missing_ok=True)
+
+        if not live_refs:
+            shutil.rmtree(version_dir, ignore_errors=True)
+            removed.append(version_dir.name)
+
+    if removed:
+        print(f"🧹 Removed stale versions: {removed}")
+    return removed
+
+
+class SharedDataset:
+    """Read-only, memory-mapped view of the current published dataset"""
+
+    def __init__(self, shm_root: str = DEFAULT_SHM_ROOT):
+        self.root = Path(shm_root)
+        self.version: Optional[str] = None
+        self.ref: Optional[Path] = None
+        self.tables: Dict[str, pa.Table] = {}
+
+    def _current_version(self) -> str:
+        pointer = self.root / CURRENT_POINTER
+        if not pointer.exists():
+            raise FileNotFoundError(f"No dataset published in {self.root}")
+        return pointer.read_text().strip()
+
+    def attach(self) -> 'SharedDataset':
+        """Map the current version and register this handle as a reader"""
+        for _ in range(ATTACH_RETRIES):
+            version = self._current_version()
+            version_dir = self.root / version
+            ref = version_dir / "refs" / f"{os.getpid()}-{id(self)}"
+            try:
+                # Register before mapping; a collector that got there first removed the
+                # directory, so the touch or the map fails and CURRENT is read again
+                ref.touch()
+                tables = {}
+                for path in version_dir.glob("*.arrow"):
+                    source = pa.memory_map(str(path), 'r')
+                    tables[path.stem] = pa.ipc.open_file(source).read_all()
+                if not ref.exists():
+                    raise FileNotFoundError(ref)
+            except FileNotFoundError:
+                continue
+
+            if self.ref is not None and self.ref != ref:
+                self.release()
+            self.version = version
+            self.ref = ref
+            self.tables = tables
+            return self
+        raise FileNotFoundError(f"Published versions in {self.root} kept disappearing while attaching")
+
+    def release(self):
+        """Drop this handle's reference to the mapped version"""
+        if self.ref is None:
+            return
+        self.ref.unlink(missing_ok=True)
+        self.version = None
+        self.ref = None
+        self.tables = {}
+
+    def refresh(self) -> bool:
+        """Swap to a newer published version if there is one"""
+        if self.version == self._current_version():
+            return False
+        previous = self.version
+        self.attach()
+        print(f"🔄 Swapped dataset {previous} → {self.version}")
+        collect_stale_versions(str(self.root))
+        return True
+
+    def table(self, name: str) -> pa.Table:
+        """Zero-copy Arrow table backed by shared memory"""
+        if self.version is None:
+            self.attach()
+        return self.tables[name]
+
+    def to_pandas(self, name: str):
+        """Materialize a table as a DataFrame (copies into worker memory)"""
+        return self.table(name).to_pandas()
+
+    def __enter__(self) -> 'SharedDataset':
+        return self.attach()
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+if __name__ == "__main__":
+    publish_dataset()
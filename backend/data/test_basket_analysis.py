@@ -0,0 +1,41 @@
+import pandas as pd
+
+from basket_analysis import generate_basket_analysis, incidence_matrix
+
+
+def _billing() -> pd.DataFrame:
+    # Invoice numbers restart per mill: (2, 1) is a different basket from (1, 1)
+    lines = [
+        (1, 1, 'A'), (1, 1, 'B'),
+        (1, 2, 'A'), (1, 2, 'B'), (1, 2, 'A'),
+        (1, 3, 'A'),
+        (1, 4, 'B'), (1, 4, 'C'),
+        (2, 1, 'A'), (2, 1, 'B'),
+        (2, 2, 'C'),
+    ]
+    return pd.DataFrame(lines, columns=['codigo_molino', 'comprobante', 'producto_limpio'])
+
+
+def test_incidence_counts_each_product_once_per_invoice():
+    incidence, products = incidence_matrix(_billing())
+    assert incidence.shape == (6, 3)
+    assert products.tolist() == ['A', 'B', 'C']
+    assert incidence.sum(axis=0).tolist() == [[4.0, 4.0, 2.0]]
+
+
+def test_hand_built_support_confidence_and_lift():
+    result = generate_basket_analysis(_billing(), min_count=1)
+    rules = result['product_associations'].set_index(['producto_limpio', 'associated_product'])
+
+    assert result['product_co_occurrence'].loc['A'].tolist() == [4, 3, 0]
+    assert rules.loc[('A', 'B'), ['co_occurrences', 'support', 'confidence', 'lift']].tolist() == [3, 0.5, 0.75, 1.125]
+    assert rules.loc[('B', 'C'), ['support', 'confidence', 'lift']].tolist() == [0.166667, 0.25, 0.75]
+    assert rules.loc[('C', 'B'), ['confidence', 'lift']].tolist() == [0.5, 0.75]
+    assert ('A', 'C') not in rules.index
+    # Within a product, rules rank by lift
+    assert rules.loc['B'].sort_values('rank').index.tolist() == ['A', 'C']
+
+
+def test_min_count_drops_rare_pairs():
+    rules = generate_basket_analysis(_billing(), min_count=2)['product_associations']
+    assert sorted(zip(rules['producto_limpio'], rules['associated_product'])) == [('A', 'B'), ('B', 'A')]
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bitmap_store import Bitmap, BitmapStore, _random_filters, mask_aggregate
+
+
+def _billing(n_rows: int = 3000, seed: int = 5) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'codigo_molino': rng.integers(1, 4, n_rows),
+        'razon_social': pd.Series(rng.integers(0, 300, n_rows)).map('PANADERIA {:03d}'.format),
+        'zona': rng.choice(['NORTE', 'SUR', 'CENTRO', 'OESTE'], n_rows, p=[0.6, 0.3, 0.08, 0.02]),
+        # 80 products: most bitmaps stay sparse, the molino ones are dense
+        'producto_limpio': pd.Series(rng.integers(0, 80, n_rows)).map('HARINA {:02d}'.format),
+        'flete': rng.choice(['Si', 'No'], n_rows),
+        'fecha': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, n_rows), unit='D'),
+        'total_kg': rng.choice([25.0, 50.0, 1000.0], n_rows),
+        'monto_ars': rng.uniform(1e3, 1e5, n_rows).round(2),
+    })
+
+
+def _assert_same(fast, slow):
+    assert fast['transactions'] == slow['transactions']
+    assert fast['customers'] == slow['customers']
+    assert fast['revenue'] == pytest.approx(slow['revenue'])
+    assert fast['volume_kg'] == pytest.approx(slow['volume_kg'])
+
+
+def test_random_dashboard_queries_match_pandas_masks():
+    df = _billing()
+    store = BitmapStore(df)
+    rng = np.random.default_rng(1)
+    for _ in range(100):
+        query = _random_filters(df, rng)
+        _assert_same(store.aggregate(**query), mask_aggregate(df, **query))
+
+
+@pytest.mark.parametrize('query', [
+    {},
+    {'start': '2024-03-10', 'end': '2024-03-10'},
+    {'zona': ['SUR', 'OESTE'], 'flete': 'Si'},
+    {'month': '2024-05', 'codigo_molino': [1, 3]},
+    {'producto_limpio': ['HARINA 07', 'HARINA 42'], 'start': '2024-02-03', 'end': '2024-11-27'},
+    {'codigo_molino': 2, 'zona': 'NORTE', 'start': '2024-06-01'},
+    {'zona': 'ATLANTIS'},
+])
+def test_explicit_queries_match_pandas_masks(query):
+    df = _billing()
+    _assert_same(BitmapStore(df).aggregate(**query), mask_aggregate(df, **query))
+
+
+def test_sparse_and_dense_bitmaps_combine_like_sets():
+    n = 1000
+    rng = np.random.default_rng(2)
+    dense_rows = np.sort(rng.choice(n, 400, replace=False))
+    sparse_rows = np.sort(rng.choice(n, 20, replace=False))
+    dense, sparse = Bitmap.from_rows(dense_rows, n), Bitmap.from_rows(sparse_rows, n)
+    assert dense.dense and not sparse.dense
+
+    expected_and = np.intersect1d(dense_rows, sparse_rows)
+    expected_or = np.union1d(dense_rows, sparse_rows)
+    assert (dense & sparse).to_rows().tolist() == (sparse & dense).to_rows().tolist() == expected_and.tolist()
+    assert (dense | sparse).to_rows().tolist() == (sparse | dense).to_rows().tolist() == expected_or.tolist()
+    clipped = dense.clip(70, 131).to_rows()
+    assert clipped.tolist() == dense_rows[(dense_rows >= 70) & (dense_rows < 131)].tolist()
+    assert dense.cardinality() == 400
+
+
+def test_unindexed_filter_is_rejected():
+    with pytest.raises(KeyError):
+        BitmapStore(_billing(50)).select(razon_social='PANADERIA 001')
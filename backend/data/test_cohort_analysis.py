@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cohort_analysis import build_cohort_matrices, compute_cohort_state, update_cohort_state
+
+
+def _billing() -> pd.DataFrame:
+    rows = [
+        ('PANADERIA SOL', '2024-01-03', 100.0),
+        ('PANADERIA SOL', '2024-01-20', 50.0),
+        ('PANADERIA LUNA', '2024-01-15', 80.0),
+        ('PANADERIA SOL', '2024-02-10', 70.0),
+        ('PANADERIA ESTRELLA', '2024-02-11', 30.0),
+        ('PANADERIA LUNA', '2024-03-05', 40.0),
+        ('PANADERIA ESTRELLA', '2024-03-09', 20.0),
+        ('PANADERIA AURORA', '2024-03-30', 10.0),
+    ]
+    df = pd.DataFrame(rows, columns=['razon_social', 'fecha', 'monto_ars'])
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    return df
+
+
+def test_hand_built_retention():
+    matrices = build_cohort_matrices(compute_cohort_state(_billing()))
+
+    assert matrices['cohort_retention'].index.tolist() == ['2024-01', '2024-02', '2024-03']
+    assert matrices['cohort_customers'].loc['2024-01'].tolist() == [2, 1, 1]
+    assert matrices['cohort_retention'].loc['2024-01'].tolist() == [1.0, 0.5, 0.5]
+    assert matrices['cohort_revenue'].loc['2024-01'].tolist() == [230.0, 70.0, 40.0]
+    # Months after the last billed month are unknown, not churned
+    assert matrices['cohort_retention'].loc['2024-02'].tolist()[:2] == [1.0, 1.0]
+    assert np.isnan(matrices['cohort_retention'].loc['2024-03', '1'])
+
+
+@pytest.mark.parametrize('cutoff', ['2024-02-01', '2024-03-01'])
+def test_incremental_matches_full_build(cutoff):
+    df = _billing()
+    history, latest = df[df['fecha'] < cutoff], df[df['fecha'] >= cutoff]
+
+    full = compute_cohort_state(df)
+    incremental = update_cohort_state(compute_cohort_state(history), latest)
+
+    pd.testing.assert_frame_equal(incremental['cohort_activity'], full['cohort_activity'])
+    for name, matrix in build_cohort_matrices(full).items():
+        pd.testing.assert_frame_equal(build_cohort_matrices(incremental)[name], matrix)
+    by_name = lambda cohorts: cohorts.sort_values('razon_social').reset_index(drop=True)
+    pd.testing.assert_frame_equal(by_name(incremental['customer_cohorts']), by_name(full['customer_cohorts']))
+
+
+def test_overlapping_batch_is_refused():
+    df = _billing()
+    state = compute_cohort_state(df[df['fecha'] < '2024-03-01'])
+    with pytest.raises(ValueError, match='rebuild'):
+        update_cohort_state(state, df[df['fecha'] >= '2024-02-10'])
@@ -0,0 +1,65 @@
+import pandas as pd
+
+from delta_export import DERIVED_COLUMNS, LocalDirectorySink, export_delta
+
+
+def _billing(n: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        'codigo_molino': 1,
+        'comprobante': range(n),
+        'fecha': pd.date_range('2024-01-01', periods=n, freq='D'),
+        'razon_social': 'PANADERIA A',
+        'monto_ars': 1000.0,
+        'precio_mediana': 500.0,
+        'precio_mad': 10.0,
+        'precio_z': 0.5,
+        'anomalia_precio': False,
+    })
+
+
+def _changes(sink_dir, batch: int) -> pd.DataFrame:
+    return pd.concat([pd.read_parquet(p) for p in sorted(sink_dir.glob(f"changes/*/batch_{batch:06d}.parquet"))],
+                     ignore_index=True)
+
+
+def test_shifted_price_statistics_are_not_updates(tmp_path):
+    sink = LocalDirectorySink(tmp_path)
+    export_delta(_billing(5), sink)
+    assert not set(DERIVED_COLUMNS) & set(_changes(tmp_path, 1).columns)
+
+    # A new batch moves the medians and z-scores of historic rows; they are not exported
+    billing = _billing(6)
+    billing[['precio_mediana', 'precio_z']] = [520.0, 4.0]
+    watermark = export_delta(billing, sink)
+    assert watermark['changes'] == {'insert': 1, 'update': 0, 'delete': 0, 'flag': 0}
+
+    billing.loc[0, 'monto_ars'] = 2000.0
+    assert export_delta(billing, sink)['changes'] == {'insert': 0, 'update': 1, 'delete': 0, 'flag': 0}
+
+
+def test_flag_flips_ship_as_flag_changes(tmp_path):
+    sink = LocalDirectorySink(tmp_path)
+    billing = _billing(5)
+    export_delta(billing, sink)
+
+    billing.loc[[1, 3], 'anomalia_precio'] = True
+    billing.loc[[1, 3], 'precio_z'] = 4.2
+    assert export_delta(billing, sink)['changes'] == {'insert': 0, 'update': 0, 'delete': 0, 'flag': 2}
+    flips = _changes(tmp_path, 2)
+    assert flips['comprobante'].tolist() == [1, 3]
+    assert flips['anomalia_precio'].tolist() == [True, True]
+    assert flips['_op'].tolist() == ['flag', 'flag']
+
+    # Unchanged flags are not shipped again; a real edit carries the current flag with the line
+    assert export_delta(billing, sink)['changes'] == {'insert': 0, 'update': 0, 'delete': 0, 'flag': 0}
+    billing.loc[1, ['monto_ars', 'anomalia_precio']] = [1500.0, False]
+    assert export_delta(billing, sink)['changes'] == {'insert': 0, 'update': 1, 'delete': 0, 'flag': 0}
+    assert not _changes(tmp_path, 4)['anomalia_precio'].iat[0]
+
+
+def test_snapshot_without_flag_hashes_resyncs_flags(tmp_path):
+    sink = LocalDirectorySink(tmp_path)
+    export_delta(_billing(3), sink)
+    snapshot = pd.read_parquet(tmp_path / "_state" / "snapshot.parquet").drop(columns='flag_hash')
+    snapshot.to_parquet(tmp_path / "_state" / "snapshot.parquet", index=False)
+    assert export_delta(_billing(3), sink)['changes'] == {'insert': 0, 'update': 0, 'delete': 0, 'flag': 3}
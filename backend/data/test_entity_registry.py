@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from entity_registry import EntityRegistry
+
+
+def _billing(customers, products=None) -> pd.DataFrame:
+    return pd.DataFrame({
+        'razon_social': customers,
+        'producto_limpio': products or ['HARINA 000'] * len(customers),
+        'zona': ['NORTE'] * len(customers),
+    })
+
+
+def test_customer_ids_survive_save_and_load(tmp_path):
+    registry = EntityRegistry(tmp_path)
+    first = registry.assign_ids(_billing(['PANADERIA SOL', 'PANADERIA LUNA', 'PANADERIA SOL']))
+    registry.save()
+
+    reloaded = EntityRegistry(tmp_path)
+    again = reloaded.assign_ids(_billing(['PANADERIA LUNA', 'PANADERIA SOL']))
+    assert reloaded.keys == registry.keys
+    assert first['customer_id'].tolist() == [1, 0, 1]
+    assert again['customer_id'].tolist() == [0, 1]
+
+
+def test_new_names_are_appended_without_renumbering(tmp_path):
+    registry = EntityRegistry(tmp_path)
+    registry.assign_ids(_billing(['PANADERIA SOL', 'PANADERIA LUNA']))
+    registry.save()
+
+    reloaded = EntityRegistry(tmp_path)
+    # 'PANADERIA AURORA' sorts first but still gets the next free ID
+    df = reloaded.assign_ids(_billing(['PANADERIA AURORA', 'PANADERIA SOL', 'PANADERIA LUNA']))
+    assert df['customer_id'].tolist() == [2, 1, 0]
+    assert reloaded.decode('customer', [0, 1, 2]).tolist() == ['PANADERIA LUNA', 'PANADERIA SOL', 'PANADERIA AURORA']
+    reloaded.save()
+    assert EntityRegistry(tmp_path).ids['customer'] == reloaded.ids['customer']
+
+
+def test_missing_values_get_minus_one(tmp_path):
+    registry = EntityRegistry(tmp_path)
+    ids = registry.encode('zone', pd.Series(['NORTE', None, np.nan, 'SUR']))
+    assert ids.tolist() == [0, -1, -1, 1]
+    assert registry.size('zone') == 2
+
+
+def test_interaction_matrix_covers_every_issued_id(tmp_path):
+    registry = EntityRegistry(tmp_path)
+    df = registry.assign_ids(_billing(['A', 'B', 'C'], ['X', 'Y', 'X']))
+    cells = pd.Series([5.0], index=pd.MultiIndex.from_tuples([(2, 0)]))
+    matrix = registry.interaction_matrix(cells, 'customer', 'product')
+    assert matrix.shape == (3, 2)
+    assert matrix.loc[2, '0'] == 5.0 and matrix.to_numpy().sum() == 5.0
+    assert df['product_id'].tolist() == [0, 1, 0]
+
+
+def test_non_dense_registry_is_refused(tmp_path):
+    pd.DataFrame({'id': np.array([0, 2], dtype='int32'), 'key': ['A', 'B']}).to_parquet(
+        tmp_path / 'customer_ids.parquet', index=False)
+    with pytest.raises(ValueError):
+        EntityRegistry(tmp_path)
@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+
+from entity_resolution import apply_canonical_names, normalize_names, resolve_customers, same_distinctive_tokens
+
+
+def _resolve(names, lines=None, **kwargs) -> pd.Series:
+    lines = lines or [1] * len(names)
+    df = pd.DataFrame({'razon_social': [n for n, k in zip(names, lines) for _ in range(k)]})
+    mapping = resolve_customers(df, **kwargs)
+    return mapping.set_index('razon_social')['razon_social_canonical']
+
+
+@pytest.mark.parametrize('names', [
+    ['PANADERIA MARIA', 'PANADERIA MARIO', 'PANADERIA MARTA'],
+    ['LA ROSA', 'LA ROSITA'],
+    ['SAN MARTIN', 'SAN MARTINA'],
+    ['DON JOSE', 'DON JOSEFA'],
+    ['LUNA', 'LUNAS'],
+    ['PANADERIA 12', 'PANADERIA 13'],
+    ['PANADERIA LA ROSA', 'CONFITERIA LA ROSA'],
+])
+def test_near_misses_stay_apart(names):
+    canonical = _resolve(names)
+    assert (canonical.index == canonical.to_numpy()).all()
+
+
+@pytest.mark.parametrize('variant', [
+    'PANADERIA MARIA S.A.', 'Panadería María', 'PANADERIA  MARIA', 'PANDERIA MARIA', 'PANADERIA MARIA SRL',
+])
+def test_spelling_variants_merge(variant):
+    canonical = _resolve(['PANADERIA MARIA', variant], lines=[3, 1])
+    assert canonical[variant] == 'PANADERIA MARIA'
+
+
+def test_dropped_letter_inside_a_long_token_merges():
+    assert same_distinctive_tokens('GONZALEZ', 'GONALEZ')
+    assert same_distinctive_tokens('BACODA FEGALI', 'BACODAFEGALI')
+    assert not same_distinctive_tokens('GONZALEZ', 'GONZALE')
+    assert not same_distinctive_tokens('ROSA', 'ROA')
+    assert not same_distinctive_tokens('MARIA', 'MARIO')
+
+
+def test_links_are_not_transitive():
+    # ROSRIO is one dropped letter from both ROSARIO and ROSRO, which are two apart
+    assert same_distinctive_tokens('ROSARIO', 'ROSRIO') and same_distinctive_tokens('ROSRIO', 'ROSRO')
+    canonical = _resolve(['PANADERIA ROSARIO', 'PANADERIA ROSRIO', 'PANADERIA ROSRO'], lines=[5, 2, 1])
+    assert canonical['PANADERIA ROSRIO'] == 'PANADERIA ROSARIO'
+    assert canonical['PANADERIA ROSRO'] == 'PANADERIA ROSRO'
+
+
+def test_registry_names_stay_canonical():
+    names, lines = ['PANADERIA GONZALEZ', 'PANADERIA GONALEZ'], [1, 10]
+    assert _resolve(names, lines)['PANADERIA GONZALEZ'] == 'PANADERIA GONALEZ'
+    known = _resolve(names, lines, known_names=['PANADERIA X', 'PANADERIA GONZALEZ'])
+    assert known['PANADERIA GONALEZ'] == 'PANADERIA GONZALEZ'
+
+
+def test_canonical_name_does_not_depend_on_row_order():
+    names = ['PANADERIA GONZALEZ', 'PANADERIA GONALEZ', 'PANADERIA GONZALEZ SA']
+    first = _resolve(names)
+    assert _resolve(names[::-1]).sort_index().equals(first.sort_index())
+
+
+def test_apply_keeps_the_original_spelling():
+    df = pd.DataFrame({'razon_social': ['PANADERIA MARIA', 'PANADERIA MARIA S.A.', None]})
+    resolved = apply_canonical_names(df, resolve_customers(df))
+    assert resolved['razon_social'].tolist()[:2] == ['PANADERIA MARIA'] * 2
+    assert resolved['razon_social_original'].tolist()[1] == 'PANADERIA MARIA S.A.'
+    assert normalize_names(pd.Series(['Panadería  María S.R.L.']))[0] == 'PANADERIA MARIA'
@@ -0,0 +1,70 @@
+import datetime as dt
+
+import pandas as pd
+import pytest
+
+openpyxl = pytest.importorskip('openpyxl')
+
+from excel_readers import READERS, available_engines, check_parity
+
+
+HEADER = ['Tipo', 'Comprobante', 'Fecha', 'Molino', 'Razon Social', 'Zona',
+          'Producto', 'Flete', 'Unidades', 'Kg', 'Kg', 'Monto']
+
+
+def _write_billing(path):
+    # Title rows above the header, blank rows inside the data, a repeated 'Kg' header
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(['Facturacion por molino'])
+    sheet.append([])
+    sheet.append(HEADER)
+    sheet.append(['FA', 1001, dt.datetime(2024, 1, 5), 1, 'PANADERIA SOL', 'NORTE', 'HARINA 000 ', 'Si', 10, 25, 250, 1000.0])
+    sheet.append([])
+    sheet.append(['FA', 'A-1002', dt.datetime(2024, 1, 6), 2, 'PANADERIA LUNA', 'SUR', 'HARINA 0000', 'No', 4, 50.0, 200.0, 1234.5])
+    sheet.append(['NC', 1003.0, dt.datetime(2024, 2, 1), 1, 'PANADERIA SOL', 'NORTE', 'SEMOLA', 'Si', 2, 25, 50, -300])
+    sheet.append(['Total', None, None, None, None, None, None, None, 16, None, 500, 1934.5])
+    sheet.append([])
+    workbook.save(path)
+
+
+@pytest.fixture
+def billing_dir(tmp_path):
+    _write_billing(tmp_path / 'Facturacion 2024.xlsx')
+    (tmp_path / 'Ventas Provincias.xlsx').touch()
+    return tmp_path
+
+
+@pytest.mark.parametrize('header', [2, None])
+def test_every_engine_reads_the_same_frame(billing_dir, header):
+    path = billing_dir / 'Facturacion 2024.xlsx'
+    frames = {name: READERS[name](path, header) for name in available_engines()}
+    reference = frames['openpyxl']
+
+    for name, frame in frames.items():
+        pd.testing.assert_frame_equal(frame, reference, obj=name)
+
+
+def test_readonly_mangles_repeated_headers(billing_dir):
+    frame = READERS['openpyxl_readonly'](billing_dir / 'Facturacion 2024.xlsx', 2)
+
+    assert list(frame.columns[-3:]) == ['Kg', 'Kg.1', 'Monto']
+
+
+def test_every_engine_yields_the_same_cleaned_billing(billing_dir):
+    from process_data import MoliDataProcessor
+
+    frames = {name: MoliDataProcessor(data_path=str(billing_dir), engine=name).process_billing_data()
+              for name in available_engines()}
+    reference = frames['openpyxl']
+
+    assert len(reference) == 3
+    for name, frame in frames.items():
+        pd.testing.assert_frame_equal(frame, reference, obj=name)
+
+
+def test_check_parity_passes_on_every_engine(billing_dir):
+    results = check_parity(str(billing_dir))
+
+    assert set(results) == set(available_engines())
+    assert all(results.values())
@@ -0,0 +1,63 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+import export_stage
+from export_stage import dictionary_columns, export_artifacts, write_parquet
+
+
+def _billing(n: int = 10) -> pd.DataFrame:
+    return pd.DataFrame({
+        'razon_social': ['PANADERIA SOL', 'PANADERIA LUNA'] * (n // 2),
+        'comprobante': [f'FA-{i:05d}' for i in range(n)],
+        'fecha': pd.date_range('2024-01-01', periods=n, freq='D'),
+        'monto_ars': np.arange(n, dtype='float64') * 100.5,
+    })
+
+
+def test_every_artifact_round_trips(tmp_path):
+    billing = _billing()
+
+    def write_extra():
+        (tmp_path / 'extra.txt').write_text('ok')
+        return tmp_path / 'extra.txt'
+
+    report = export_artifacts(
+        tmp_path,
+        frames={'billing_data_clean': billing},
+        documents={'business_insights': {'overview': {'total_revenue': 1.5, 'as_of': pd.Timestamp('2024-01-10')}}},
+        tasks={'extra.txt': write_extra},
+        workers=3,
+    )
+
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / 'billing_data_clean.parquet'), billing)
+    with open(tmp_path / 'business_insights.json') as f:
+        assert json.load(f) == {'overview': {'total_revenue': 1.5, 'as_of': '2024-01-10 00:00:00'}}
+    assert (tmp_path / 'extra.txt').read_text() == 'ok'
+    assert {row['artifact'] for row in report} == {'billing_data_clean.parquet', 'business_insights.json', 'extra.txt'}
+    assert next(row for row in report if row['artifact'] == 'extra.txt')['bytes'] == 2
+    assert json.loads((tmp_path / 'export_report.json').read_text())['artifacts'] == report
+    assert not list(tmp_path.glob('.*.tmp'))
+
+
+def test_billing_gets_smaller_row_groups(tmp_path, monkeypatch):
+    monkeypatch.setitem(export_stage.ROW_GROUP_ROWS, 'billing_data_clean', 4)
+    export_artifacts(tmp_path, frames={'billing_data_clean': _billing(), 'customer_features': _billing()}, workers=1)
+
+    assert pq.ParquetFile(tmp_path / 'billing_data_clean.parquet').num_row_groups == 3
+    assert pq.ParquetFile(tmp_path / 'customer_features.parquet').num_row_groups == 1
+
+
+def test_only_low_cardinality_strings_are_dictionary_encoded(tmp_path):
+    billing = _billing()
+    assert dictionary_columns(billing) == ['razon_social']
+
+    path = write_parquet(billing, tmp_path / 'billing.parquet', compression='none')
+    column_encodings = {
+        name: pq.ParquetFile(path).metadata.row_group(0).column(i).encodings
+        for i, name in enumerate(billing.columns)
+    }
+    assert any('DICTIONARY' in e for e in column_encodings['razon_social'])
+    assert not any('DICTIONARY' in e for e in column_encodings['comprobante'])
@@ -0,0 +1,31 @@
+import pandas as pd
+
+from feature_store import CURRENT_POINTER, FeatureTable, write_table
+
+
+def _features(revenue: float) -> pd.DataFrame:
+    return pd.DataFrame({'razon_social': ['PANADERIA A', 'PANADERIA B'], 'revenue': [revenue, 2 * revenue]})
+
+
+def test_empty_table_round_trips(tmp_path):
+    empty = pd.DataFrame({'razon_social': pd.Series([], dtype=object), 'revenue': pd.Series([], dtype=float)})
+    write_table(empty, 'razon_social', tmp_path / 'customer_features')
+    table = FeatureTable(tmp_path / 'customer_features')
+    assert table.get('PANADERIA A') is None
+    assert table.get_many(['PANADERIA A']).empty
+
+
+def test_back_to_back_publishes_do_not_collide(tmp_path):
+    table_dir = tmp_path / 'customer_features'
+    for revenue in [1.0, 2.0, 3.0]:
+        write_table(_features(revenue), 'razon_social', table_dir)
+    assert FeatureTable(table_dir).get('PANADERIA B')['revenue'] == 6.0
+
+
+def test_republishing_a_version_name_keeps_both(tmp_path):
+    table_dir = tmp_path / 'customer_features'
+    first = write_table(_features(1.0), 'razon_social', table_dir, version='20240101000000')
+    second = write_table(_features(5.0), 'razon_social', table_dir, version='20240101000000')
+    assert first != second and first.exists()
+    assert (table_dir / CURRENT_POINTER).read_text() == second.name
+    assert FeatureTable(table_dir).get('PANADERIA A')['revenue'] == 5.0
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from fixed_point import apply_exact_sums, group_sum, has_fixed_point, measure, sum_by, to_decimal, to_fixed_point
+
+
+def _billing() -> pd.DataFrame:
+    # 0.1 + 0.2 style amounts: float sums depend on the order they are added in
+    return pd.DataFrame({
+        'razon_social': ['PANADERIA A', 'PANADERIA B'] * 500,
+        'monto_ars': [0.1, 0.2, 0.7, 1e9 + 0.01] * 250,
+        'total_kg': [0.001, 25.0, 50.0, 0.333] * 250,
+    })
+
+
+def test_to_fixed_point_snaps_values_and_keeps_missing():
+    df = pd.DataFrame({'monto_ars': [10.004, np.nan, 3.0], 'total_kg': [1.0004, 2.0, np.nan]})
+    fixed = to_fixed_point(df)
+    assert has_fixed_point(fixed) and not has_fixed_point(df)
+    assert fixed['monto_centavos'].tolist() == [1000, 0, 300]
+    assert fixed['total_g'].tolist() == [1000, 2000, 0]
+    assert fixed['monto_ars'].isna().tolist() == [False, True, False]
+    assert fixed['total_kg'].tolist()[:2] == [1.0, 2.0]
+    assert measure(fixed, 'monto_ars').dtype == np.int64
+
+
+def test_sums_do_not_depend_on_row_order():
+    df = to_fixed_point(_billing())
+    shuffled = df.sample(frac=1, random_state=0)
+    assert sum_by(df, 'monto_ars') == sum_by(shuffled, 'monto_ars') == 250 * (1e9 + 1.01)
+    assert sum_by(df, 'total_kg') == sum_by(shuffled, 'total_kg') == 250 * 75.334
+    pd.testing.assert_series_equal(sum_by(df, 'monto_ars', 'razon_social'),
+                                   sum_by(shuffled, 'monto_ars', 'razon_social'), check_exact=True)
+
+
+def test_group_sum_stays_integer():
+    codes = np.array([0, 1, 0, 2])
+    values = np.array([2 ** 53, 1, 1, 5], dtype='int64')
+    totals = group_sum(codes, values, 3)
+    assert totals.dtype == np.int64
+    assert totals.tolist() == [2 ** 53 + 1, 1, 5]
+    assert to_decimal(totals[1:], 100).tolist() == [0.01, 0.05]
+
+
+def test_apply_exact_sums_overwrites_float_aggregates():
+    df = to_fixed_point(_billing())
+    stats = df.groupby('razon_social').agg({'monto_ars': ['sum', 'mean'], 'total_kg': ['sum']}).round(2)
+    stats.columns = ['_'.join(col) for col in stats.columns]
+    stats = apply_exact_sums(stats.reset_index(), df, 'razon_social')
+    expected = df.groupby('razon_social')['monto_centavos'].sum() / 100
+    assert stats['monto_ars_sum'].tolist() == expected.round(2).tolist()
+    assert stats['monto_ars_mean'].tolist() == (expected / 500).round(2).tolist()
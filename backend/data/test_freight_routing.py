@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from freight_routing import plan_day
+
+DAY = pd.Timestamp('2024-03-01')
+
+
+def _distances() -> pd.DataFrame:
+    zones = ['NORTE', 'SUR']
+    return pd.DataFrame([[0.0, 40.0], [40.0, 0.0]], index=pd.Index(zones, name='zona'), columns=zones)
+
+
+def _billing() -> pd.DataFrame:
+    return pd.DataFrame({
+        'codigo_molino': [1, 1, 1, 1, 2],
+        'comprobante': [10, 11, 12, 13, 20],
+        'fecha': DAY,
+        'flete': 'Si',
+        'zona': ['NORTE', np.nan, 'SUR', 'OESTE', 'SUR'],
+        'razon_social': ['PANADERIA A', 'PANADERIA B', 'PANADERIA C', 'PANADERIA D', 'PANADERIA E'],
+        'total_kg': [5_000.0, 2_000.0, 3_000.0, 1_000.0, 4_000.0],
+    })
+
+
+def test_orders_without_a_known_zone_are_reported_not_planned():
+    plan = plan_day(_billing(), _distances(), DAY)
+
+    assert sorted(plan['freight_assignments']['comprobante']) == [10, 12, 20]
+    unroutable = plan['freight_unroutable'].set_index('comprobante')
+    assert unroutable['reason'].to_dict() == {11: 'missing_zone', 13: 'unknown_zone'}
+    assert plan['freight_trucks']['total_kg'].sum() == 12_000.0
+
+
+def test_a_mill_with_only_unroutable_orders():
+    billing = _billing()
+    billing['zona'] = np.nan
+    plan = plan_day(billing, _distances(), DAY)
+    assert plan['freight_assignments'].empty and plan['freight_trucks'].empty
+    assert len(plan['freight_unroutable']) == 5
@@ -0,0 +1,68 @@
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+
+from geo_sales import UNASSIGNED, build_zone_lookup, generate_geo_sales, write_geo_sales
+
+
+def _geo() -> pd.DataFrame:
+    rows = [
+        ('Córdoba', '5000', 'Córdoba'),
+        ('Córdoba', '5001', 'Córdoba'),
+        ('Santa Fe', '2000', 'Rosario'),
+        ('Buenos Aires', '1650', 'San Martín'),
+        # San Martín is in two provinces; Mendoza has more postal codes for it
+        ('Mendoza', '5570', 'San Martín'),
+        ('Mendoza', '5571', 'San Martín'),
+    ]
+    return pd.DataFrame(rows, columns=['provincia', 'codigo_postal', 'ciudad'])
+
+
+def _billing() -> pd.DataFrame:
+    return pd.DataFrame({
+        'razon_social': ['SOL', 'SOL', 'LUNA', 'LUNA', 'AURORA', 'AURORA'],
+        'zona': ['CORDOBA', 'rosario.', 'SANTA FE', 'SAN MARTIN', 'ATLANTIS', np.nan],
+        'monto_ars': [100.0, 50.0, 30.0, 20.0, 7.0, 3.0],
+        'total_kg': [10.0, 5.0, 3.0, 2.0, 1.0, 1.0],
+    })
+
+
+def test_zones_match_city_then_province():
+    lookup = build_zone_lookup(_billing()['zona'], _geo()).set_index('zona')
+
+    assert lookup.loc['CORDOBA', ['provincia', 'ciudad', 'match']].tolist() == ['Córdoba', 'Córdoba', 'ciudad']
+    assert lookup.loc['rosario.', ['provincia', 'ciudad']].tolist() == ['Santa Fe', 'Rosario']
+    assert lookup.loc['SANTA FE', ['provincia', 'ciudad', 'match']].tolist() == ['Santa Fe', UNASSIGNED, 'provincia']
+    assert lookup.loc['SAN MARTIN', 'provincia'] == 'Mendoza'
+    assert lookup.loc['ATLANTIS', 'match'] == 'sin_asignar'
+    assert len(lookup) == 5
+
+
+def test_province_and_city_totals():
+    tables = generate_geo_sales(_billing(), _geo())
+    province = tables['geo_sales_province'].set_index('provincia')
+    city = tables['geo_sales_city'].set_index(['provincia', 'ciudad'])
+
+    assert province.index.tolist() == ['Córdoba', 'Santa Fe', 'Mendoza', UNASSIGNED]
+    assert province.loc['Santa Fe', ['revenue', 'volume_kg', 'transactions', 'customers']].tolist() == [80.0, 8.0, 2, 2]
+    # Unknown and missing zones both land in SIN ASIGNAR
+    assert province.loc[UNASSIGNED, ['revenue', 'transactions', 'customers']].tolist() == [10.0, 2, 1]
+    assert city.loc[('Santa Fe', 'Rosario'), 'revenue'] == 50.0
+    assert city.loc[('Santa Fe', UNASSIGNED), 'revenue'] == 30.0
+    assert province['revenue'].sum() == city['revenue'].sum() == _billing()['monto_ars'].sum()
+
+
+def test_written_payload_is_reproducible(tmp_path):
+    tables = generate_geo_sales(_billing(), _geo())
+    first_dir, second_dir = tmp_path / 'a', tmp_path / 'b'
+    first_dir.mkdir()
+    second_dir.mkdir()
+    json_path, gz_path = write_geo_sales(tables, first_dir)
+    write_geo_sales(tables, second_dir)
+
+    payload = json.loads(json_path.read_text())
+    assert payload['provinces']['Santa Fe']['cities']['Rosario'] == [50.0, 5.0, 1, 1]
+    assert gzip.decompress(gz_path.read_bytes()) == json_path.read_bytes()
+    assert gz_path.read_bytes() == (second_dir / 'geo_sales.json.gz').read_bytes()
@@ -0,0 +1,72 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from load_generator import HttpConnection, build_replay_schedule, replay
+
+
+def _billing(n_orders: int = 4) -> pd.DataFrame:
+    return pd.DataFrame({
+        'comprobante': range(n_orders),
+        'fecha': pd.Timestamp('2024-01-01'),
+        'razon_social': 'PANADERIA A',
+        'codigo_molino': 1,
+        'zona': 'SUR',
+        'total_kg': 50.0,
+        'monto_ars': 1000.0,
+        'producto_limpio': 'HARINA 000',
+    })
+
+
+async def _serve(handler):
+    server = await asyncio.start_server(handler, '127.0.0.1', 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def test_closed_keep_alive_connection_raises_connection_error():
+    async def run():
+        async def close_at_once(reader, writer):
+            await reader.readline()
+            writer.close()
+
+        server, port = await _serve(close_at_once)
+        conn = HttpConnection('127.0.0.1', port)
+        try:
+            with pytest.raises(ConnectionError):
+                await conn.request('GET', '/api/orders/1')
+        finally:
+            await conn.aclose()
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('response', [
+    b'',  # server hangs up without answering
+    b'HTTP/1.1 201 Created\r\nContent-Length: 3\r\n\r\nabc',  # 2xx with a non-JSON body
+])
+def test_failed_creates_do_not_stall_dependent_calls(response):
+    async def run():
+        async def answer_once(reader, writer):
+            while (await reader.readline()) not in (b'\r\n', b''):
+                pass
+            writer.write(response)
+            await writer.drain()
+            writer.close()
+
+        server, port = await _serve(answer_once)
+        schedule = build_replay_schedule(_billing(), speedup=1e9, edit_ratio=1.0)
+        try:
+            latencies, errors, _ = await asyncio.wait_for(
+                replay(schedule, f"http://127.0.0.1:{port}/api", concurrency=2), timeout=10)
+        finally:
+            server.close()
+            await server.wait_closed()
+        return errors
+
+    errors = asyncio.run(run())
+    assert errors['create'] == 4
+    assert errors['edit'] == 4
+    assert errors['status'] == 4
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fixed_point import to_fixed_point
+from mapreduce_pipeline import run_mapreduce
+from process_data import MoliDataProcessor
+
+
+@pytest.fixture
+def processor(tmp_path):
+    for name in ['Listado_de_Facturacion_de_Molinos.xlsx', 'Datos_Basicos_Ventas.xlsx']:
+        (tmp_path / name).touch()
+    return MoliDataProcessor(str(tmp_path))
+
+
+def _billing(n: int = 3_000, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    kg = rng.choice([25.0, 50.0, 500.0, 1000.0], n)
+    df = pd.DataFrame({
+        'fecha': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 120, n), unit='D'),
+        'codigo_molino': rng.integers(1, 6, n).astype('float64'),
+        'razon_social': pd.Series(rng.integers(0, 80, n)).map('PANADERIA {:02d}'.format),
+        'zona': pd.Series(rng.integers(0, 6, n)).map('ZONA {:02d}'.format),
+        'producto_limpio': pd.Series(rng.integers(0, 5, n)).map('HARINA {:02d}'.format),
+        'flete': rng.choice(['Si', 'No'], n),
+        'total_kg': kg,
+        'monto_ars': (kg * rng.normal(500, 30, n)).round(2),
+        'anomalia_precio': rng.random(n) < 0.02,
+    })
+    df['precio_por_kg'] = df['monto_ars'] / df['total_kg']
+    df['flete_binario'] = (df['flete'] == 'Si').astype(int)
+    return df
+
+
+@pytest.mark.parametrize('fixed', [False, True])
+@pytest.mark.parametrize('workers', [1, 2])
+@pytest.mark.parametrize('by', ['codigo_molino', 'razon_social'])
+def test_matches_the_serial_pipeline(processor, workers, by, fixed):
+    df = to_fixed_point(_billing()) if fixed else _billing()
+    clean = df[~df['anomalia_precio']]
+    results = run_mapreduce(clean, workers=workers, by=by)
+
+    serial = processor.generate_ml_features(clean)
+    for name, table in serial.items():
+        merged = results['ml_features'][name]
+        key = table.columns[0]
+        pd.testing.assert_frame_equal(merged.sort_values(key, ignore_index=True),
+                                      table[merged.columns].sort_values(key, ignore_index=True),
+                                      check_dtype=False, check_exact=fixed, atol=0.011)
+
+    matrices = processor.create_recommendation_matrices(clean)
+    for name, matrix in matrices.items():
+        pd.testing.assert_frame_equal(results['rec_matrices'][name], matrix.sort_index().sort_index(axis=1),
+                                      check_dtype=False, check_names=False, check_exact=fixed, rtol=1e-9)
+
+    insights = processor.generate_business_insights(clean)
+    overview = results['insights']['overview']
+    assert overview['total_transactions'] == insights['overview']['total_transactions']
+    assert overview['unique_customers'] == insights['overview']['unique_customers']
+    assert overview['date_range'] == insights['overview']['date_range']
+    if fixed:
+        assert overview['total_revenue'] == insights['overview']['total_revenue']
+        assert overview['total_volume_kg'] == insights['overview']['total_volume_kg']
+    else:
+        assert overview['total_revenue'] == pytest.approx(insights['overview']['total_revenue'], rel=1e-12)
+    assert results['insights']['monthly_trends'] == pytest.approx(insights['monthly_trends'], rel=1e-12)
+
+
+def test_flagged_rows_are_left_out_of_the_features():
+    df = _billing()
+    features = run_mapreduce(df, workers=1)['ml_features']['customer_features']
+    clean = run_mapreduce(df[~df['anomalia_precio']], workers=1)['ml_features']['customer_features']
+    pd.testing.assert_frame_equal(features, clean)
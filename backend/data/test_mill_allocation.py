@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.optimize import linprog
+
+from mill_allocation import COMMODITY_COLUMNS, UNASSIGNED, MillAllocator, mill_capacities, zone_cost_table
+
+PRODUCTS = ['HARINA 000', 'HARINA 0000', 'SEMOLA']
+
+
+def _instance(seed: int):
+    rng = np.random.default_rng(seed)
+    commodities = pd.MultiIndex.from_product([['NORTE', 'OESTE', 'SUR'], PRODUCTS], names=COMMODITY_COLUMNS)
+    cost = rng.uniform(100, 200, (len(commodities), 3))
+    cost[rng.random(cost.shape) < 0.2] = np.nan
+    costs = pd.DataFrame(cost, index=commodities, columns=pd.Index([1, 2, 3], name='codigo_molino'))
+
+    n = 40
+    orders = pd.DataFrame({
+        'zona': rng.choice(['NORTE', 'OESTE', 'SUR'], n),
+        'producto_limpio': rng.choice(PRODUCTS, n),
+        'total_kg': rng.choice([25.0, 50.0, 500.0, 1000.0], n),
+    })
+    # Credit notes bill back earlier deliveries
+    orders.loc[::7, 'total_kg'] *= -1
+    capacities = pd.Series([0.3, 0.2, 0.3], index=costs.columns) * orders['total_kg'].clip(lower=0).sum()
+    return costs, capacities, orders
+
+
+def _linprog_cost(costs: pd.DataFrame, capacities: pd.Series, orders: pd.DataFrame):
+    """Same network as an LP: kg per commodity × mill plus an unbounded overflow column"""
+    demand = orders[orders['total_kg'] > 0].groupby(COMMODITY_COLUMNS)['total_kg'].sum()
+    demand = demand.reindex(costs.index, fill_value=0.0).to_numpy()
+    n_c, n_m = costs.shape
+    cost = np.c_[costs.to_numpy(), np.zeros(n_c)]
+    allowed = ~np.isnan(cost)
+    # Overflow is minimised first, then the mill cost
+    overflow_first = np.where(allowed, np.nan_to_num(cost), 0.0)
+    overflow_first[:, -1] = 1e4
+
+    a_eq = np.kron(np.eye(n_c), np.ones(n_m + 1))
+    a_ub = np.kron(np.ones(n_c), np.c_[np.eye(n_m), np.zeros(n_m)])
+    bounds = [(0, None) if ok else (0, 0) for ok in allowed.ravel()]
+    result = linprog(overflow_first.ravel(), A_ub=a_ub, b_ub=capacities.to_numpy(), A_eq=a_eq, b_eq=demand,
+                     bounds=bounds, method='highs')
+    assert result.status == 0
+    flow = result.x.reshape(n_c, n_m + 1)
+    return float((flow[:, :-1] * np.nan_to_num(cost[:, :-1])).sum()), float(flow[:, -1].sum())
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_linprog_with_credit_notes(seed):
+    costs, capacities, orders = _instance(seed)
+    result = MillAllocator(costs, capacities).solve(orders)
+    expected_cost, expected_unassigned = _linprog_cost(costs, capacities, orders)
+
+    assert result['unassigned_kg'] == pytest.approx(expected_unassigned, abs=1e-6)
+    assert result['total_cost'] == pytest.approx(expected_cost, rel=1e-9)
+
+    # Credit notes are not assigned; every other order is covered exactly once
+    assignments = result['assignments']
+    positive = orders[orders['total_kg'] > 0]
+    assert set(assignments['order']) == set(positive.index)
+    assert (assignments['assigned_kg'] > 0).all()
+    covered = assignments.groupby('order')['assigned_kg'].sum()
+    np.testing.assert_allclose(covered.sort_index(), positive['total_kg'].sort_index())
+    load = assignments[assignments['mill'] != UNASSIGNED].groupby('mill')['assigned_kg'].sum()
+    assert (load <= capacities.reindex(load.index) + 1e-3).all()
+
+
+def test_credit_notes_do_not_shrink_capacity():
+    billing = pd.DataFrame({
+        'codigo_molino': [1, 1, 1, 1],
+        'fecha': pd.to_datetime(['2024-01-01', '2024-01-01', '2024-01-02', '2024-01-02']),
+        'total_kg': [1000.0, -900.0, 1000.0, 0.0],
+    })
+    assert mill_capacities(billing).tolist() == [1000.0]
+
+
+def test_price_flagged_rows_stay_out_of_costs_and_capacities():
+    billing = pd.DataFrame({
+        'codigo_molino': [1, 1, 1, 1],
+        'zona': 'SUR',
+        'producto_limpio': 'SEMOLA',
+        'flete': 'No',
+        'fecha': pd.to_datetime(['2024-01-01', '2024-01-01', '2024-01-02', '2024-01-03']),
+        'total_kg': [1000.0, 5000.0, 1000.0, 1000.0],
+        'precio_por_kg': [100.0, 9000.0, 100.0, 100.0],
+        'anomalia_precio': [False, True, False, False],
+    })
+    assert zone_cost_table(billing).iat[0, 0] == 100.0
+    assert mill_capacities(billing).tolist() == [1000.0]
+
+
+def test_orders_without_a_cost_row_are_unassigned():
+    costs, capacities, orders = _instance(0)
+    orders = orders[orders['total_kg'] > 0].reset_index(drop=True)
+    known = MillAllocator(costs, capacities).solve(orders)
+
+    extra = pd.DataFrame({'zona': [np.nan, 'ESTE', 'SUR'], 'producto_limpio': ['SEMOLA', 'SEMOLA', np.nan],
+                          'total_kg': [100.0, 200.0, 300.0]}, index=[100, 101, 102])
+    result = MillAllocator(costs, capacities).solve(pd.concat([orders, extra]))
+
+    assert result['total_cost'] == pytest.approx(known['total_cost'], rel=1e-12)
+    assert result['unassigned_kg'] == pytest.approx(known['unassigned_kg'] + 600.0)
+    assert result['unroutable']['reason'].to_dict() == {100: 'missing_zone', 101: 'unknown_commodity',
+                                                        102: 'missing_product'}
+    unassigned = result['assignments'].set_index('order').loc[[100, 101, 102]]
+    assert (unassigned['mill'] == UNASSIGNED).all()
+    assert unassigned['assigned_kg'].tolist() == [100.0, 200.0, 300.0]
+    assert result['mills']['assigned_kg'].iat[-1] == pytest.approx(known['mills']['assigned_kg'].iat[-1] + 600.0)
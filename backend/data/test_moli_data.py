@@ -0,0 +1,57 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+HERE = Path(__file__).resolve().parent
+
+
+def _run(*args, env=None):
+    env = {key: value for key, value in os.environ.items() if not key.startswith('MOLI_')} | (env or {})
+    return subprocess.run([sys.executable, str(HERE / 'moli_data.py'), *args], cwd=HERE,
+                          env=env, capture_output=True, text=True, timeout=60)
+
+
+def test_help_runs_without_the_data_directories():
+    result = _run('--help')
+    assert result.returncode == 0
+    assert 'moli-data' in result.stdout and 'process' in result.stdout
+
+
+def test_help_does_not_import_pandas():
+    code = ("import sys, moli_data\n"
+            "try:\n    moli_data.main(['--help'])\nexcept SystemExit:\n    pass\n"
+            "print('pandas' in sys.modules)")
+    result = subprocess.run([sys.executable, '-c', code], cwd=HERE, capture_output=True, text=True, timeout=60)
+    assert result.stdout.strip().splitlines()[-1] == 'False'
+
+
+def test_paths_follow_the_environment(tmp_path):
+    code = "from paths import RAW_DIR, PROCESSED_DIR; print(RAW_DIR); print(PROCESSED_DIR)"
+    env = {key: value for key, value in os.environ.items() if not key.startswith('MOLI_')}
+    env |= {'MOLI_RAW_DIR': str(tmp_path / 'raw'), 'MOLI_PROCESSED_DIR': str(tmp_path / 'processed')}
+    result = subprocess.run([sys.executable, '-c', code], cwd=HERE, env=env, capture_output=True, text=True, timeout=60)
+    assert result.stdout.split() == [str(tmp_path / 'raw'), str(tmp_path / 'processed')]
+
+
+def test_status_reports_missing_artifacts(tmp_path):
+    (tmp_path / 'billing_data_clean.parquet').write_bytes(b'PAR1')
+    result = _run('status', '--json', '--shm-root', str(tmp_path / 'shm'),
+                  env={'MOLI_PROCESSED_DIR': str(tmp_path)})
+    status = json.loads(result.stdout)
+
+    assert result.returncode == 1
+    assert status['processed_dir'] == str(tmp_path) and not status['ok']
+    assert status['artifacts']['billing_data_clean.parquet']['bytes'] == 4
+    assert status['artifacts']['cohort_retention.parquet'] is None
+    assert status['shared_memory_version'] is None
+
+
+@pytest.mark.parametrize('argv', [[], ['bench', 'unknown']])
+def test_bad_arguments_exit_with_usage(argv):
+    result = _run(*argv)
+    assert result.returncode == 2
+    assert 'usage: moli-data' in result.stderr
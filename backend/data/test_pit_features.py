@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pit_features import WINDOWS_DAYS, chunk_bounds, order_events, window_features, write_training_features
+
+
+def _lines(rows) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=['codigo_molino', 'comprobante', 'razon_social', 'fecha', 'flete',
+                                     'total_kg', 'monto_ars'])
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    return df
+
+
+def _random_billing(n_lines: int = 600, seed: int = 4) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'codigo_molino': rng.integers(1, 3, n_lines),
+        'comprobante': np.arange(n_lines) // 2,
+        'razon_social': pd.Series(rng.integers(0, 15, n_lines)).map('PANADERIA {:02d}'.format),
+        'fecha': pd.Timestamp('2023-06-01') + pd.to_timedelta(rng.integers(0, 500, n_lines), unit='D'),
+        'flete': rng.choice(['Si', 'No'], n_lines),
+        'total_kg': rng.choice([25.0, 50.0, 500.0], n_lines),
+        'monto_ars': rng.uniform(1e3, 1e5, n_lines).round(2),
+    })
+
+
+def test_windows_exclude_the_order_day_and_later():
+    df = _lines([
+        (1, 1, 'SOL', '2024-01-01', 'Si', 25.0, 100.0),
+        (1, 2, 'SOL', '2024-01-11', 'No', 50.0, 150.0),
+        (2, 2, 'SOL', '2024-01-11', 'Si', 25.0, 50.0),
+        (1, 3, 'SOL', '2024-02-10', 'No', 25.0, 300.0),
+        (1, 4, 'SOL', '2024-02-11', 'No', 25.0, 999.0),
+        (1, 5, 'LUNA', '2024-01-05', 'Si', 25.0, 7.0),
+    ])
+    features = window_features(order_events(df)).set_index(['razon_social', 'fecha'])
+    sol = features.loc['SOL']
+
+    assert sol['order_revenue'].tolist() == [100.0, 200.0, 300.0, 999.0]
+    assert sol['order_count'].tolist() == [1, 2, 1, 1]
+    # Windows are [t - w, t): nothing from the order's own day or after it
+    assert sol['revenue_30d'].tolist() == [0.0, 100.0, 200.0, 300.0]
+    assert sol['revenue_90d'].tolist() == [0.0, 100.0, 300.0, 600.0]
+    assert sol['orders_30d'].tolist() == [0, 1, 2, 1]
+    assert sol['freight_share_30d'].iloc[2] == 0.5
+    assert np.isnan(sol['freight_share_30d'].iloc[0])
+    assert sol['days_since_last_order'].tolist()[1:] == [10.0, 30.0, 1.0]
+    assert sol['prior_orders'].tolist() == [0, 1, 3, 4]
+    # Other customers never leak into the window
+    assert features.loc[('LUNA', pd.Timestamp('2024-01-05')), 'revenue_365d'] == 0.0
+
+
+def test_windows_match_a_per_row_filter():
+    events = order_events(_random_billing())
+    features = window_features(events)
+
+    for i in range(0, len(events), 7):
+        row = events.iloc[i]
+        history = events[events['razon_social'] == row['razon_social']]
+        for window in WINDOWS_DAYS:
+            past = history[(history['fecha'] < row['fecha'])
+                           & (history['fecha'] >= row['fecha'] - pd.Timedelta(days=window))]
+            assert features[f'revenue_{window}d'].iat[i] == pytest.approx(past['revenue'].sum(), abs=0.01)
+            assert features[f'orders_{window}d'].iat[i] == past['orders'].sum()
+
+
+def test_chunked_parts_match_one_pass(tmp_path):
+    df = _random_billing()
+    paths = write_training_features(df, tmp_path, chunk_rows=50)
+    chunked = pd.concat([pd.read_parquet(p) for p in paths], ignore_index=True)
+
+    assert len(paths) > 1
+    bounds = chunk_bounds(order_events(df)['customer_code'].to_numpy(), 50)
+    customers = order_events(df)['customer_code'].to_numpy()
+    assert all(customers[b - 1] != customers[b] for b in bounds[1:-1])
+    pd.testing.assert_frame_equal(chunked, window_features(order_events(df)))
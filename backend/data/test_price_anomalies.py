@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from price_anomalies import (MIN_GROUP_SIZE, OnlinePriceScorer, detect_price_anomalies, drop_flagged,
+                             read_clean_billing)
+
+
+def _group(prices, producto='HARINA 000', zona='SUR') -> pd.DataFrame:
+    return pd.DataFrame({
+        'producto_limpio': producto,
+        'zona': zona,
+        'fecha': pd.date_range('2024-01-01', periods=len(prices), freq='D'),
+        'precio_por_kg': prices,
+    })
+
+
+def _flags(df: pd.DataFrame) -> list:
+    return detect_price_anomalies(df)['anomalia_precio'].tolist()
+
+
+def test_outlier_in_a_spread_group():
+    prices = [100.0, 102.0, 98.0, 101.0, 99.0, 103.0, 97.0, 250.0]
+    assert _flags(_group(prices)) == [False] * 7 + [True]
+
+
+def test_list_price_group_with_zero_mad():
+    # More than half the lines at the list price: MAD is 0 but a 10x price is still an outlier
+    prices = [100.0] * 6 + [101.0, 1000.0]
+    scored = detect_price_anomalies(_group(prices))
+    assert scored['precio_mad'].eq(0).all()
+    assert scored['anomalia_precio'].tolist() == [False] * 7 + [True]
+    assert _flags(_group([100.0] * 6)) == [False] * 6
+
+
+def test_small_groups_only_check_invalid_prices():
+    prices = [100.0, 1000.0, 0.0, -5.0][:MIN_GROUP_SIZE - 1]
+    assert _flags(_group(prices)) == [False, False, True, True]
+
+
+def test_missing_and_infinite_prices_are_flagged_without_moving_the_median():
+    prices = [100.0, 102.0, 98.0, 101.0, 99.0, np.nan, np.inf]
+    scored = detect_price_anomalies(_group(prices))
+    assert scored['anomalia_precio'].tolist() == [False] * 5 + [True, True]
+    assert scored['precio_mediana'].iloc[0] == 100.0
+    assert scored['precio_z'].iloc[5:].tolist() == [0.0, 0.0]
+
+
+def test_groups_are_scored_separately():
+    df = pd.concat([_group([100.0, 101.0, 99.0, 100.5, 99.5]), _group([300.0, 301.0, 299.0, 300.5, 99.5], zona='NORTE')])
+    assert _flags(df) == [False] * 9 + [True]
+
+
+@pytest.mark.parametrize('history', [
+    [100.0, 102.0, 98.0, 101.0, 99.0, 103.0, 97.0, 100.0],
+    [100.0] * 6 + [101.0, 102.0],
+])
+@pytest.mark.parametrize('price', [99.0, 104.0, 112.0, 150.0, 40.0, np.nan, 0.0])
+def test_online_scoring_matches_the_batch_statistics(history, price):
+    batch = detect_price_anomalies(_group(history))
+    scorer = OnlinePriceScorer.from_history(batch, window=50)
+    is_anomaly, z = scorer.score({'producto_limpio': 'HARINA 000', 'zona': 'SUR', 'precio_por_kg': price})
+
+    # The new price scored against the history's median and spread, as the batch path scores
+    # a row of a group that contains it
+    rescored = detect_price_anomalies(pd.concat([_group(history), _group([price])], ignore_index=True))
+    if not np.isfinite(price) or price <= 0:
+        assert is_anomaly and rescored['anomalia_precio'].iat[-1]
+        return
+    median, mad = batch['precio_mediana'].iat[0], batch['precio_mad'].iat[0]
+    spread = mad / 0.6745 if mad > 0 else max(1.253314 * np.abs(np.array(history) - median).mean(), 0.02 * median)
+    assert z == pytest.approx((price - median) / spread)
+    assert is_anomaly == rescored['anomalia_precio'].iat[-1]
+
+
+def test_online_scorer_keeps_outliers_out_of_its_window():
+    scorer = OnlinePriceScorer(refresh_every=1)
+    for price in [100.0, 101.0, 99.0, 100.5, 99.5, 100.0]:
+        assert not scorer.score({'producto_limpio': 'HARINA 000', 'zona': 'SUR', 'precio_por_kg': price})[0]
+    assert scorer.score({'producto_limpio': 'HARINA 000', 'zona': 'SUR', 'precio_por_kg': 500.0})[0]
+    assert 500.0 not in scorer.history[('HARINA 000', 'SUR')]
+    assert len(scorer.quarantine) == 1
+
+
+def test_clean_billing_readers_drop_flagged_rows(tmp_path):
+    scored = detect_price_anomalies(_group([100.0, 102.0, 98.0, 101.0, 99.0, 103.0, 97.0, 250.0]))
+    scored.to_parquet(tmp_path / "billing_data_clean.parquet")
+    assert read_clean_billing(tmp_path)['precio_por_kg'].max() == 103.0
+    unscored = _group([1.0, 2.0])
+    assert drop_flagged(unscored) is unscored
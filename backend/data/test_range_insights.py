@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from range_insights import RangeInsights, build_prefix_sums, save_prefix_sums
+
+
+def _billing() -> pd.DataFrame:
+    days = pd.date_range('2024-01-01', periods=10, freq='D')
+    return pd.DataFrame({
+        'fecha': np.repeat(days, 2),
+        'razon_social': ['PANADERIA A', 'PANADERIA B'] * 10,
+        'producto_limpio': 'HARINA 000',
+        'zona': 'SUR',
+        'flete': ['Si', 'No'] * 10,
+        'monto_ars': 100.0,
+        'total_kg': 25.0,
+    })
+
+
+def test_window_matches_filter():
+    df = _billing()
+    insights = RangeInsights(prefix=build_prefix_sums(df))
+    overview = insights.overview('2024-01-03', '2024-01-05')
+    window = df[(df['fecha'] >= '2024-01-03') & (df['fecha'] <= '2024-01-05')]
+    assert overview['total_revenue'] == window['monto_ars'].sum()
+    assert overview['total_transactions'] == len(window)
+
+
+def test_windows_outside_the_data_are_empty():
+    insights = RangeInsights(prefix=build_prefix_sums(_billing()))
+    for start, end in [('2024-03-01', '2024-03-10'), ('2024-03-01', None), ('2023-01-01', '2023-01-31')]:
+        overview = insights.overview(start, end)
+        assert overview['total_revenue'] == 0
+        assert overview['total_transactions'] == 0
+    assert insights.entity('customer', 'PANADERIA A', '2024-03-01')['total_revenue'] == 0
+
+
+def test_saved_arrays_are_memory_mapped(tmp_path):
+    prefix = build_prefix_sums(_billing())
+    save_prefix_sums(prefix, tmp_path)
+    insights = RangeInsights(tmp_path)
+    assert all(isinstance(insights.prefix[name], np.memmap) for name in ['global', 'customer', 'product', 'zone'])
+    assert insights.window_insights() == RangeInsights(prefix=prefix).window_insights()
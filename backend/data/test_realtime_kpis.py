@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fixed_point import to_fixed_point
+from realtime_kpis import MISSING_VALUE, SNAPSHOT_FILE, RealtimeKPIs
+
+
+def _events() -> pd.DataFrame:
+    return pd.DataFrame({
+        'fecha': pd.Timestamp('2024-03-01 08:00') + pd.to_timedelta([0, 5, 30, 50, 55, 130], unit='min'),
+        'codigo_molino': [1.0, 2.0, 1.0, np.nan, 2.0, 1.0],
+        'zona': ['NORTE', np.nan, 'SUR', 'NORTE', np.nan, 'SUR'],
+        'producto_limpio': ['HARINA 000', 'SEMOLA', 'HARINA 000', 'SEMOLA', 'SEMOLA', 'HARINA 000'],
+        'monto_ars': [250.0, 100.5, np.nan, 300.25, 80.0, 120.0],
+        'total_kg': [25.0, 10.0, 5.0, np.nan, 8.0, 12.0],
+    })
+
+
+def _streamed(events: pd.DataFrame) -> RealtimeKPIs:
+    kpis = RealtimeKPIs()
+    for event in events.to_dict('records'):
+        kpis.record(event)
+    return kpis
+
+
+def _batched(events: pd.DataFrame) -> RealtimeKPIs:
+    kpis = RealtimeKPIs()
+    kpis.record_frame(events)
+    return kpis
+
+
+def test_record_and_record_frame_agree_with_missing_values():
+    streamed, batched = _streamed(_events()), _batched(_events())
+    pd.testing.assert_frame_equal(streamed.table(), batched.table())
+    assert batched.read('codigo_molino', 1.0) == batched.read('codigo_molino', '1.0')
+    # The fixed-point frame path gives the same totals
+    pd.testing.assert_frame_equal(_batched(to_fixed_point(_events())).table(), batched.table())
+
+
+def test_missing_dimensions_get_their_own_key():
+    kpis = _batched(_events())
+    assert kpis.read('zona', 'NORTE')['week'] == {'revenue': 550.25, 'kg': 25.0, 'lines': 2, 'price_per_kg': 22.01}
+    assert kpis.read('zona', np.nan)['week']['lines'] == 2
+    assert kpis.read('zona', MISSING_VALUE)['week']['revenue'] == 180.5
+    assert kpis.read('total', '*')['week']['revenue'] == 850.75
+
+
+@pytest.mark.parametrize('ingest', [_streamed, _batched])
+def test_an_all_missing_dimension(ingest):
+    events = _events().assign(zona=np.nan)
+    kpis = ingest(events)
+    assert kpis.read('zona', MISSING_VALUE)['week']['lines'] == len(events)
+
+
+def test_windows_slide(tmp_path):
+    kpis = _batched(_events())
+    # The last line is over an hour after the others: only it is in the hour window
+    assert kpis.read('total', '*')['hour']['lines'] == 1
+    assert kpis.read('total', '*')['day']['lines'] == 6
+
+    kpis.snapshot(tmp_path / SNAPSHOT_FILE)
+    pd.testing.assert_frame_equal(RealtimeKPIs.restore(tmp_path / SNAPSHOT_FILE).table(), kpis.table())
+
+
+def test_load_without_billing(tmp_path):
+    assert RealtimeKPIs.load(tmp_path).read('total', '*')['week']['lines'] == 0
+
+    _batched(_events()).snapshot(tmp_path / SNAPSHOT_FILE)
+    assert RealtimeKPIs.load(tmp_path).read('total', '*')['week']['lines'] == 6
+
+
+def test_rebuild_leaves_price_flagged_rows_out(tmp_path):
+    billing = _events().assign(anomalia_precio=[False, False, False, False, False, True])
+    billing.to_parquet(tmp_path / "billing_data_clean.parquet")
+    assert RealtimeKPIs.load(tmp_path).read('total', '*')['week']['lines'] == 5
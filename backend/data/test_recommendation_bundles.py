@@ -0,0 +1,119 @@
+import json
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from recommendation_bundles import (build_recommendation_bundles, current_bundle_dir, read_bundle,
+                                    save_recommendation_bundles)
+
+
+def _billing() -> pd.DataFrame:
+    return pd.DataFrame({
+        'customer_id': [0, 0, 1, 2],
+        'product_id': [0, 1, 1, 2],
+        'producto_limpio': ['HARINA 000', 'HARINA 0000', 'HARINA 0000', 'SEMOLA'],
+        'monto_ars': [300.0, 100.0, 500.0, 200.0],
+    })
+
+
+def _predictions() -> pd.DataFrame:
+    return pd.DataFrame({
+        'customer_id': pd.Series([0], dtype='int64'),
+        'product_id': pd.Series([0], dtype='int64'),
+        'status': ['due'],
+        'days_until': [3.0],
+        'typical_kg': [50.0],
+        'last_purchase': pd.to_datetime(['2024-03-01']),
+    })
+
+
+def _associations() -> pd.DataFrame:
+    return pd.DataFrame({'producto_limpio': ['HARINA 0000'], 'associated_product': ['SEMOLA'],
+                         'confidence': [0.5], 'lift': [2.0]})
+
+
+def test_empty_billing_builds_an_empty_bundle(tmp_path):
+    bundles = build_recommendation_bundles(_billing().iloc[:0], _predictions().iloc[:0],
+                                           _associations().iloc[:0], workers=1)
+    assert len(bundles['entries']) == 0
+    assert bundles['offsets'].tolist() == [0]
+    assert bundles['meta']['customers'] == 0 and bundles['meta']['as_of'] is None
+
+    save_recommendation_bundles(bundles, tmp_path)
+    assert read_bundle(tmp_path, 0).empty
+
+
+def test_round_trip(tmp_path):
+    save_recommendation_bundles(build_recommendation_bundles(_billing(), _predictions(), _associations(),
+                                                             workers=1), tmp_path)
+    bundle = read_bundle(tmp_path, 0)
+    assert bundle['producto_limpio'].tolist() == ['HARINA 000', 'HARINA 0000', 'SEMOLA']
+    assert bundle['hint'].tolist() == ['due', 'none', 'none']
+    assert bundle['days_until'].iloc[0] == 3
+    # Customer 1 buys HARINA 0000 only, so SEMOLA comes in as a cross-sell
+    assert read_bundle(tmp_path, 1)['producto_limpio'].tolist() == ['HARINA 0000', 'SEMOLA']
+
+
+def test_failed_meta_write_keeps_the_previous_bundle(tmp_path):
+    bundles = build_recommendation_bundles(_billing(), _predictions(), _associations(), workers=1)
+    paths = save_recommendation_bundles(bundles, tmp_path)
+    previous = {path.name: path.read_bytes() for path in paths}
+
+    broken = {**bundles, 'entries': bundles['entries'][:1], 'offsets': bundles['offsets'][:2],
+              'meta': {**bundles['meta'], 'as_of': np.datetime64('2024-03-01')}}
+    with pytest.raises(TypeError):
+        save_recommendation_bundles(broken, tmp_path)
+
+    # index, entries and meta all still come from the first save
+    version_dir = current_bundle_dir(tmp_path)
+    assert {path.name: path.read_bytes() for path in paths} == previous
+    assert version_dir == paths[0].parent
+    assert json.loads((version_dir / "meta.json").read_text())['customers'] == 3
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith('.')] == []
+    assert read_bundle(tmp_path, 1)['producto_limpio'].tolist() == ['HARINA 0000', 'SEMOLA']
+
+
+def test_resave_switches_every_file_together(tmp_path):
+    first = save_recommendation_bundles(build_recommendation_bundles(_billing(), _predictions(),
+                                                                     _associations(), workers=1), tmp_path)
+    second = save_recommendation_bundles(build_recommendation_bundles(_billing().iloc[:2], _predictions(),
+                                                                      _associations(), workers=1), tmp_path)
+
+    assert first[0].parent != second[0].parent
+    assert current_bundle_dir(tmp_path) == second[0].parent
+    assert read_bundle(tmp_path, 1).empty
+    # The previous version is kept for readers that resolved CURRENT before the flip
+    assert first[0].exists()
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_forked_workers_match_the_serial_build():
+    rng = np.random.default_rng(7)
+    n_lines = 600
+    customer = rng.integers(0, 40, n_lines)
+    product = rng.integers(0, 9, n_lines)
+    df = pd.DataFrame({
+        'customer_id': customer,
+        'product_id': product,
+        'producto_limpio': pd.Series(product).map('PRODUCTO {:02d}'.format),
+        'monto_ars': rng.uniform(100, 1000, n_lines).round(2),
+    })
+    predictions = pd.DataFrame({
+        'customer_id': np.arange(40), 'product_id': np.arange(40) % 9,
+        'status': ['due', 'scheduled', 'lapsed', 'insufficient_history'] * 10,
+        'days_until': np.where(np.arange(40) % 4 == 3, np.nan, np.arange(40) - 20.0),
+        'typical_kg': np.full(40, 25.0),
+        'last_purchase': pd.Timestamp('2024-03-01'),
+    })
+    associations = pd.DataFrame({'producto_limpio': ['PRODUCTO 01', 'PRODUCTO 02'],
+                                 'associated_product': ['PRODUCTO 05', 'PRODUCTO 08'],
+                                 'confidence': [0.4, 0.7], 'lift': [1.5, 3.0]})
+
+    serial = build_recommendation_bundles(df, predictions, associations, workers=1)
+    forked = build_recommendation_bundles(df, predictions, associations, workers=2, shards_per_worker=3)
+
+    assert serial['entries'].tobytes() == forked['entries'].tobytes()
+    assert serial['offsets'].tobytes() == forked['offsets'].tobytes()
+    assert serial['meta'] == forked['meta']
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from reorder_prediction import compute_reorder_state, predict_reorders, update_reorder_state
+
+
+def _lines(rows) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=['razon_social', 'producto_limpio', 'fecha', 'total_kg'])
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    return df
+
+
+def _random_billing(n_lines: int = 400, seed: int = 3) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'razon_social': pd.Series(rng.integers(0, 12, n_lines)).map('PANADERIA {:02d}'.format),
+        'producto_limpio': pd.Series(rng.integers(0, 4, n_lines)).map('HARINA {:02d}'.format),
+        'fecha': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 120, n_lines), unit='D'),
+        'total_kg': rng.choice([25.0, 50.0, 500.0], n_lines),
+    })
+    return df.sort_values('fecha', kind='stable', ignore_index=True)
+
+
+def _by_pair(state: pd.DataFrame) -> pd.DataFrame:
+    return state.sort_values(['razon_social', 'producto_limpio'], ignore_index=True)
+
+
+@pytest.mark.parametrize('split', [0.3, 0.5, 0.9])
+def test_incremental_matches_full_build(split):
+    df = _random_billing()
+    # Splitting by row puts some purchase days on both sides of the batch boundary
+    cut = int(len(df) * split)
+    incremental = update_reorder_state(compute_reorder_state(df.iloc[:cut]), df.iloc[cut:])
+    full = compute_reorder_state(df)
+
+    pd.testing.assert_frame_equal(_by_pair(incremental), _by_pair(full))
+    as_of = df['fecha'].max()
+    pd.testing.assert_frame_equal(
+        _by_pair(predict_reorders(incremental, as_of)['reorder_predictions']),
+        _by_pair(predict_reorders(full, as_of)['reorder_predictions']),
+    )
+
+
+def test_hand_built_intervals_and_status():
+    df = _lines([
+        ('SOL', 'HARINA 000', '2024-01-01', 50.0),
+        ('SOL', 'HARINA 000', '2024-01-11', 30.0),
+        ('SOL', 'HARINA 000', '2024-01-11', 20.0),
+        ('SOL', 'HARINA 000', '2024-01-21', 50.0),
+        ('LUNA', 'HARINA 000', '2024-01-01', 25.0),
+        ('LUNA', 'HARINA 000', '2024-01-05', 25.0),
+        ('ESTRELLA', 'SEMOLA', '2023-10-01', 10.0),
+        ('ESTRELLA', 'SEMOLA', '2023-10-03', 10.0),
+        ('ESTRELLA', 'SEMOLA', '2023-10-05', 10.0),
+    ])
+    predictions = predict_reorders(compute_reorder_state(df), as_of=pd.Timestamp('2024-01-30'))
+    table = predictions['reorder_predictions'].set_index('razon_social')
+
+    # Two lines on one day are one order; gaps of 10 and 10 days
+    assert table.loc['SOL', ['orders', 'mean_gap_days', 'gap_std_days', 'typical_kg']].tolist() == [3, 10.0, 0.0, 50.0]
+    assert table.loc['SOL', 'expected_next'] == pd.Timestamp('2024-01-31')
+    assert table.loc['SOL', 'days_until'] == 1
+    assert table['status'].to_dict() == {'SOL': 'due', 'LUNA': 'insufficient_history', 'ESTRELLA': 'lapsed'}
+    assert predictions['reorder_due']['razon_social'].tolist() == ['SOL']
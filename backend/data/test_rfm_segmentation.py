@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fixed_point import to_fixed_point
+from rfm_segmentation import compute_rfm_state, generate_rfm_features, update_rfm_state
+
+
+def _billing() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    invoices = np.repeat(np.arange(40), 3)
+    return pd.DataFrame({
+        'codigo_molino': 1,
+        'razon_social': (invoices % 4).astype(str),
+        'comprobante': invoices,
+        'fecha': pd.Timestamp('2024-01-01') + pd.to_timedelta(invoices, unit='D'),
+        'monto_ars': rng.uniform(100, 1000, len(invoices)).round(2),
+        'total_kg': 25.0,
+    })
+
+
+@pytest.mark.parametrize('fixed', [False, True])
+@pytest.mark.parametrize('split', [30, 31, 32, 60, 61])
+def test_incremental_matches_full_build_when_an_invoice_straddles_batches(split, fixed):
+    df = to_fixed_point(_billing()) if fixed else _billing()
+    full = compute_rfm_state(df).set_index('razon_social').sort_index()
+    incremental = update_rfm_state(compute_rfm_state(df.iloc[:split]), df.iloc[split:])
+    incremental = incremental.set_index('razon_social').sort_index()
+
+    assert incremental['frequency'].tolist() == full['frequency'].tolist() == [10] * 4
+    pd.testing.assert_frame_equal(incremental, full, check_dtype=False)
+
+
+def test_empty_batch_keeps_the_state():
+    state = compute_rfm_state(_billing())
+    assert update_rfm_state(state, _billing().iloc[:0]) is state
+    assert generate_rfm_features(_billing().iloc[:0], previous_state=state)['customer_rfm_state'] is state
+
+
+def test_scores_do_not_expose_the_carried_invoice():
+    rfm = generate_rfm_features(_billing())['customer_rfm']
+    assert not {'last_molino', 'last_invoice'} & set(rfm.columns)
+
+
+def test_invoice_numbers_restart_per_mill():
+    df = _billing()
+    # Mill 2 reuses mill 1's invoice numbers for the same customers
+    df = pd.concat([df, df.assign(codigo_molino=2, fecha=df['fecha'] + pd.Timedelta(days=1))], ignore_index=True)
+    state = compute_rfm_state(df)
+    assert state['frequency'].tolist() == [20] * 4
+
+    # Split between the mills: mill 2's invoice 39 continues nothing from mill 1's invoice 39
+    incremental = update_rfm_state(compute_rfm_state(df.iloc[:120]), df.iloc[120:])
+    assert incremental['frequency'].tolist() == [20] * 4
+    # Split inside mill 2's first invoice
+    assert update_rfm_state(compute_rfm_state(df.iloc[:121]), df.iloc[121:])['frequency'].tolist() == [20] * 4
+
+
+def test_empty_billing_scores_nothing():
+    features = generate_rfm_features(_billing().iloc[:0])
+    assert features['customer_rfm_state'].empty and features['customer_rfm'].empty
+    assert 'segment' in features['customer_rfm'].columns
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scenario_simulator import ScenarioEngine
+
+
+def _billing() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    n = 60
+    df = pd.DataFrame({
+        'codigo_molino': rng.choice([1.0, 2.0], n),
+        'razon_social': rng.choice(['PANADERIA A', 'PANADERIA B', 'PANADERIA C'], n),
+        'producto_limpio': rng.choice(['HARINA 000', 'SEMOLA'], n),
+        'zona': rng.choice(['SUR', 'NORTE'], n),
+        'flete': rng.choice(['Si', 'No'], n),
+        'total_kg': 50.0,
+    })
+    df['monto_ars'] = df['total_kg'] * rng.uniform(400, 600, n)
+    df['precio_por_kg'] = df['monto_ars'] / df['total_kg']
+    return df
+
+
+@pytest.mark.parametrize('column', ['codigo_molino', 'producto_limpio', 'zona'])
+def test_missing_dimensions_are_left_out(column):
+    df = _billing()
+    df.loc[:4, column] = np.nan
+
+    engine = ScenarioEngine(df)
+    assert list(engine.mills) == [1.0, 2.0]
+    assert list(engine.products) == ['HARINA 000', 'SEMOLA']
+    assert list(engine.zones) == ['NORTE', 'SUR']
+    assert engine.kg.sum() == df.loc[df[column].notna(), 'total_kg'].sum()
+
+    results = engine.simulate({'SEMOLA': 10}, {'SUR': -20}, n_scenarios=8)
+    assert results['revenue'].shape == (8, 2)
+    assert np.isfinite(results['revenue']).all()
+    # Every remaining cell has a real lever, so a SEMOLA-only change leaves HARINA cells alone
+    levers = engine.levers({'SEMOLA': 0.1}, engine.products)[engine.product_codes]
+    assert (engine.product_codes >= 0).all() and (engine.zone_codes >= 0).all()
+    assert set(levers) <= {0.0, 0.1}
+
+
+def test_price_flagged_rows_stay_out_of_the_baseline():
+    df = _billing()
+    df['anomalia_precio'] = False
+    df.loc[:9, 'anomalia_precio'] = True
+    df.loc[:9, 'monto_ars'] *= 100
+
+    engine = ScenarioEngine(df)
+    assert engine.kg.sum() == df.loc[10:, 'total_kg'].sum()
+    assert engine.kg.sum() == ScenarioEngine(df.loc[10:].drop(columns='anomalia_precio')).kg.sum()
@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+from shared_dataset import CURRENT_POINTER, SharedDataset, collect_stale_versions, publish_dataset
+
+
+@pytest.fixture
+def processed_dir(tmp_path):
+    processed = tmp_path / 'processed'
+    processed.mkdir()
+    pd.DataFrame({'razon_social': ['PANADERIA A'], 'monto_ars': [100.0]}).to_parquet(
+        processed / 'billing_data_clean.parquet')
+    return processed
+
+
+def test_handles_in_one_process_hold_separate_references(processed_dir, tmp_path):
+    shm = str(tmp_path / 'shm')
+    first = publish_dataset(str(processed_dir), shm)
+    a, b = SharedDataset(shm).attach(), SharedDataset(shm).attach()
+    publish_dataset(str(processed_dir), shm)
+
+    a.release()
+    collect_stale_versions(shm)
+    assert first.exists()
+    assert b.to_pandas('billing_data_clean')['monto_ars'].tolist() == [100.0]
+
+    b.release()
+    collect_stale_versions(shm)
+    assert not first.exists()
+
+
+def test_attach_rereads_current_when_the_version_was_collected(processed_dir, tmp_path, monkeypatch):
+    shm = str(tmp_path / 'shm')
+    published = publish_dataset(str(processed_dir), shm)
+    versions = iter(['20000101000000', published.name])
+    monkeypatch.setattr(SharedDataset, '_current_version', lambda self: next(versions))
+
+    dataset = SharedDataset(shm).attach()
+    assert dataset.version == published.name
+    assert dataset.table('billing_data_clean').num_rows == 1
+
+
+def test_attach_gives_up_when_versions_keep_disappearing(tmp_path, monkeypatch):
+    monkeypatch.setattr(SharedDataset, '_current_version', lambda self: 'gone')
+    with pytest.raises(FileNotFoundError):
+        SharedDataset(str(tmp_path)).attach()
+
+
+def test_publishing_an_existing_version_name(processed_dir, tmp_path):
+    shm = str(tmp_path / 'shm')
+    first = publish_dataset(str(processed_dir), shm, version='20240101000000')
+    dataset = SharedDataset(shm).attach()
+    second = publish_dataset(str(processed_dir), shm, version='20240101000000')
+    assert first != second and first.exists()
+    assert (tmp_path / 'shm' / CURRENT_POINTER).read_text() == second.name
+    dataset.release()